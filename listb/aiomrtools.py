@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+""" Coroutines for accessing MathSciNet from asyncio applications
+
+The functions mirror those of :mod:`listb.mrtools`. Requests are run in an
+executor using the connection pool of :func:`listb.mrtools.session`, and the
+HTML is parsed in an executor as well, so the event loop is never blocked.
+Every coroutine accepts a ``timeout`` in seconds and can be cancelled.
+A cancelled request is abandoned, its thread finishes once the request
+returns or times out.
+
+    >>> import asyncio
+    >>> msn = '''<div class="headlineText">
+    ...            <a class="mrnum" title="Full MathSciNet Item"
+    ...             href="[...]"><strong>MR3549381</strong></a>
+    ...          </div>'''
+    >>> asyncio.run(msn_to_mrnumbers(msn))
+    ['3549381']
+"""
+
+import asyncio
+import functools
+
+from . import mrtools
+
+async def run_in_executor(func, *args, executor=None, timeout=None):
+    """ Runs a blocking function in an executor
+
+    Args:
+        func (function):    blocking function
+        args (List[Any]):   positional arguments of ``func``
+        executor (Optional[concurrent.futures.Executor]):
+            executor, defaults to the default executor of the event loop
+        timeout (Optional[float]):
+            timeout in seconds
+
+    Returns:
+        Any: return value of ``func``
+
+    Raises:
+        asyncio.TimeoutError: if ``func`` did not return in time
+    """
+    loop = asyncio.get_running_loop()
+    future = loop.run_in_executor(executor, functools.partial(func, *args))
+    return await asyncio.wait_for(future, timeout)
+
+async def fetch(url, params=None, timeout=None, executor=None):
+    """ Fetches the source code of a page (see :func:`listb.mrtools.fetch`)
+
+    Args:
+        url (str):                  URL of the page
+        params (Optional[dict]):    query parameters
+        timeout (Optional[float]):  timeout in seconds
+        executor (Optional[concurrent.futures.Executor]):
+            executor running the request
+
+    Returns:
+        str: source code of the page
+    """
+    return await run_in_executor(mrtools.fetch, url, params, timeout,
+                                 executor=executor, timeout=timeout)
+
+async def msn_to_mrnumbers(msn, executor=None):
+    """ Retrieves MR-numbers from the source code of a search page
+
+    Args:
+        msn (str):  source code of the search result
+        executor (Optional[concurrent.futures.Executor]):
+            executor parsing the page
+
+    Returns:
+        List[str]:  List of MR-numbers found on page
+    """
+    return await run_in_executor(mrtools.msn_to_mrnumbers, msn,
+                                 executor=executor)
+
+async def get_bibtex_from_msn(mrnumbers, timeout=None, executor=None):
+    """ Fetches BibTeX file from MathSciNet server using the MR-numbers
+
+    Args:
+        mrnumbers (List[str]):
+            the BibTeX entries for these MR-numbers are retrieved
+        timeout (Optional[float]):
+            timeout of the request in seconds
+        executor (Optional[concurrent.futures.Executor]):
+            executor running the request and parsing the page
+
+    Returns:
+        Optional[str]:  BibTeX file as string or ``None`` if the MathSciNet
+                        did not return BibTeX
+    """
+    msn = await fetch(mrtools.BIBTEX_URL, mrtools.bibtex_params(mrnumbers),
+                      timeout=timeout, executor=executor)
+    return await run_in_executor(mrtools.msn_to_bibtex, msn,
+                                 executor=executor)
+
+async def crawl(url, timeout=None, executor=None):
+    """ Crawls specified URL on MathSciNet
+
+    Args:
+        url (str):                  URL pointing to a search page on
+                                    MathSciNet
+        timeout (Optional[float]):  timeout of each request in seconds
+        executor (Optional[concurrent.futures.Executor]):
+            executor running the requests and parsing the pages
+
+    Yields:
+        (str, str): URL and source code of each page
+    """
+    while url:
+        site = await fetch(url, timeout=timeout, executor=executor)
+        yield url, site
+        link = await run_in_executor(mrtools.next_link, site,
+                                     executor=executor)
+        # Links on MathSciNet are relative
+        url = mrtools.BASE_URL % link if link else None
+
+async def mrnumbers(url, all_pages=True, timeout=None, executor=None):
+    """ Retrieves the MR-numbers of a search result
+
+    Args:
+        url (str):                  URL pointing to a search page on
+                                    MathSciNet
+        all_pages (Optional[bool]): Do you want the MR-numbers of all
+                                    succeeding pages as well?
+        timeout (Optional[float]):  timeout of each request in seconds
+        executor (Optional[concurrent.futures.Executor]):
+            executor running the requests and parsing the pages
+
+    Yields:
+        str: MR-number
+    """
+    async for _, site in crawl(url, timeout=timeout, executor=executor):
+        for mrnumber in await msn_to_mrnumbers(site, executor=executor):
+            yield mrnumber
+        if not all_pages:
+            break
+
+async def bibtex(mrnumbers, size=20, concurrency=4, timeout=None,
+                 executor=None):
+    """ Fetches BibTeX for many MR-numbers with concurrent requests
+
+    Args:
+        mrnumbers (List[str]):          MR-numbers
+        size (Optional[int]):           MR-numbers per request
+        concurrency (Optional[int]):    maximal number of parallel requests
+        timeout (Optional[float]):      timeout of each request in seconds
+        executor (Optional[concurrent.futures.Executor]):
+            executor running the requests and parsing the pages
+
+    Yields:
+        (List[str], Optional[str]):
+            chunk of MR-numbers and BibTeX as returned by
+            :func:`get_bibtex_from_msn` in the order of ``mrnumbers``
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def get(chunk):
+        async with semaphore:
+            return await get_bibtex_from_msn(chunk, timeout=timeout,
+                                             executor=executor)
+
+    chunks = [mrnumbers[i:i + size] for i in range(0, len(mrnumbers), size)]
+    tasks = [asyncio.ensure_future(get(c)) for c in chunks]
+    try:
+        for chunk, task in zip(chunks, tasks):
+            yield chunk, await task
+    finally:
+        for task in tasks:
+            task.cancel()
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod(optionflags=doctest.NORMALIZE_WHITESPACE)
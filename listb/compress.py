@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+""" Opening compressed files transparently
+
+The compression of a file is chosen by its last extension (see
+:const:`CODECS`), the format of its content by the extension in front of
+it, as in ``msn.bib.gz``. Files without one of these extensions are opened
+as usual. The data is (de)compressed while it is read or written, so
+compressed files are never inflated in memory as a whole.
+
+Compression with zstandard (``.zst``) requires the package ``zstandard`` and
+uses all CPUs.
+
+    >>> import os.path, tempfile
+    >>> tmp = tempfile.TemporaryDirectory()
+    >>> path = os.path.join(tmp.name, 'in.bib.gz')
+    >>> with open(path, 'w') as handle:
+    ...     _ = handle.write('@article{a1, title = {T}}')
+    >>> with builtins.open(path, 'rb') as handle:
+    ...     handle.read(2)
+    b'\\x1f\\x8b'
+    >>> with open(path) as handle:
+    ...     handle.read()
+    '@article{a1, title = {T}}'
+    >>> extension(path)
+    'bib'
+    >>> tmp.cleanup()
+"""
+
+import builtins
+import io
+import os.path
+
+def _gzip(path, mode):
+    import gzip
+    return gzip.open(path, mode)
+
+def _bz2(path, mode):
+    import bz2
+    return bz2.open(path, mode)
+
+def _xz(path, mode):
+    import lzma
+    return lzma.open(path, mode)
+
+def _zstd(path, mode):
+    try:
+        import zstandard
+    except ImportError:
+        raise RuntimeError('Reading and writing %s requires the package '
+                           'zstandard.' % path)
+    if 'r' in mode:
+        return zstandard.open(path, mode)
+    cctx = zstandard.ZstdCompressor(threads=-1)
+    return zstandard.open(path, mode, cctx=cctx)
+
+CODECS = {'.gz': _gzip,
+          '.bz2': _bz2,
+          '.xz': _xz,
+          '.zst': _zstd
+         }
+""" Functions opening compressed files in binary mode by extension
+"""
+
+class _TextFile(io.TextIOWrapper):
+    # Unlike the one of io.TextIOWrapper, the name does not depend on the
+    # binary stream, which may not have one
+    name = None
+
+def compression(path):
+    """ Returns the extension of a compressed file
+
+    Args:
+        path (str): path to the file
+
+    Returns:
+        str: extension in :const:`CODECS` or ``''``
+
+    Example:
+        >>> compression('msn.bib.GZ'), compression('msn.bib')
+        ('.gz', '')
+    """
+    ext = os.path.splitext(path)[1].lower()
+    return ext if ext in CODECS else ''
+
+def strip(path):
+    """ Removes the extension of a compressed file from its path
+
+    Args:
+        path (str): path to the file
+
+    Returns:
+        str: path without the extension in :const:`CODECS`
+
+    Example:
+        >>> strip('files/msn.bib.xz'), strip('files/msn.bib')
+        ('files/msn.bib', 'files/msn.bib')
+    """
+    ext = compression(path)
+    return path[:-len(ext)] if ext else path
+
+def extension(path):
+    """ Returns the extension naming the format of the content of a file
+
+    Args:
+        path (str): path to the file
+
+    Returns:
+        str: extension without the leading dot
+
+    Example:
+        >>> extension('msn.yaml.zst'), extension('msn.bib')
+        ('yaml', 'bib')
+    """
+    return os.path.splitext(strip(path))[1].replace('.', '')
+
+def open(path, mode='r', encoding=None, errors=None, newline=None):
+    """ Opens a file, compressed or not
+
+    Args:
+        path (str):                 path to the file
+        mode (Optional[str]):       mode as in :func:`open`, one of "r", "w",
+                                    "a" or "x" optionally followed by "b" or
+                                    "t"
+        encoding (Optional[str]):   as in :func:`open`, for text mode
+        errors (Optional[str]):     as in :func:`open`, for text mode
+        newline (Optional[str]):    as in :func:`open`, for text mode
+
+    Returns:
+        handle: file handle
+
+    Raises:
+        RuntimeError: if a ``.zst`` file is opened without ``zstandard``
+    """
+    ext = compression(path)
+    if not ext:
+        return builtins.open(path, mode, encoding=encoding, errors=errors,
+                             newline=newline)
+
+    binary = CODECS[ext](path, mode.replace('t', '').replace('b', '') + 'b')
+    if 'b' in mode:
+        return binary
+    handle = _TextFile(binary, encoding=encoding, errors=errors,
+                       newline=newline)
+    handle.name = path
+    return handle
+
+def click_file(mode='r'):
+    """ Creates a parameter type for ``click`` opening files with :func:`open`
+
+    Apart from compressed files, the parameter type behaves like
+    ``click.File``.
+
+    Args:
+        mode (Optional[str]):   mode the files are opened in
+
+    Returns:
+        click.File: parameter type
+    """
+    import click
+
+    class CompressedFile(click.File):
+
+        def convert(self, value, param, ctx):
+            if not isinstance(value, str) or not compression(value):
+                return click.File.convert(self, value, param, ctx)
+            try:
+                handle = open(value, self.mode, encoding=self.encoding,
+                              errors=self.errors)
+            except (OSError, RuntimeError) as err:
+                self.fail('Could not open file: %s: %s' % (value, err),
+                          param, ctx)
+            if ctx is not None:
+                ctx.call_on_close(handle.close)
+            return handle
+
+    return CompressedFile(mode)
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod(optionflags=doctest.NORMALIZE_WHITESPACE)
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+""" Serving a command line interface from a long-running process
+
+A :class:`Server` listens on a Unix socket and runs the command lines it
+receives with a ``click`` command group in its own process. Modules stay
+imported and caches stay warm between the commands, so a thin client
+(see :func:`request`) gets the results without paying the start up cost.
+
+Each request is a single line of JSON ``{"args": [...], "cwd": "..."}``,
+the answer is a single line of JSON ``{"code": 0, "stdout": "...",
+"stderr": "..."}``. A request with ``"args": null`` stops the server.
+
+The commands are run one after another, since they change the working
+directory and redirect the standard streams of the whole process.
+"""
+
+import contextlib
+import io
+import json
+import os
+import socket
+import socketserver
+import threading
+import traceback
+
+def run(cli, args, cwd=None, prog_name=None):
+    """ Runs a command line in this process
+
+    Args:
+        cli (click.Command):        command (group) to run
+        args (List[str]):           command line arguments
+        cwd (Optional[str]):        working directory of the command
+        prog_name (Optional[str]):  program name shown in messages
+
+    Returns:
+        (int, str, str): exit code, standard output and standard error
+
+    Example:
+        >>> import click
+        >>> @click.command()
+        ... @click.argument('name')
+        ... def hello(name):
+        ...     click.echo('Hello %s!' % name)
+        >>> run(hello, ['World'])
+        (0, 'Hello World!\\n', '')
+        >>> run(hello, [])[0]
+        2
+    """
+    out = io.StringIO()
+    err = io.StringIO()
+    old_cwd = os.getcwd()
+    code = 0
+    try:
+        if cwd:
+            os.chdir(cwd)
+        with contextlib.redirect_stdout(out), contextlib.redirect_stderr(err):
+            try:
+                cli.main(args=list(args), prog_name=prog_name)
+            except SystemExit as exc:
+                code = exc.code
+            except Exception:
+                traceback.print_exc()
+                code = 1
+    finally:
+        os.chdir(old_cwd)
+
+    if code is None:
+        code = 0
+    elif not isinstance(code, int):
+        err.write('%s\n' % code)
+        code = 1
+    return code, out.getvalue(), err.getvalue()
+
+class _Handler(socketserver.StreamRequestHandler):
+
+    def handle(self):
+        req = json.loads(self.rfile.readline().decode('utf-8'))
+        if req.get('args') is None:
+            answer = {'code': 0, 'stdout': '', 'stderr': ''}
+            # shutdown waits for serve_forever, hence for this handler
+            threading.Thread(target=self.server.shutdown).start()
+        else:
+            code, out, err = run(self.server.cli, req['args'], req.get('cwd'),
+                                 self.server.prog_name)
+            answer = {'code': code, 'stdout': out, 'stderr': err}
+        self.wfile.write(json.dumps(answer).encode('utf-8') + b'\n')
+
+class Server(socketserver.UnixStreamServer):
+    """ Serves a command line interface on a Unix socket
+
+    Args:
+        path (str):                 path of the socket
+        cli (click.Command):        command (group) to serve
+        prog_name (Optional[str]):  program name shown in messages
+
+    Raises:
+        RuntimeError: if another server is listening on ``path``
+    """
+
+    def __init__(self, path, cli, prog_name=None):
+        if os.path.exists(path):
+            try:
+                with socket.socket(socket.AF_UNIX) as sock:
+                    sock.connect(path)
+            except OSError:
+                os.remove(path) # left over by a server that died
+            else:
+                raise RuntimeError('A server is already listening on %s.'
+                                   % path)
+        self.cli = cli
+        self.prog_name = prog_name
+        socketserver.UnixStreamServer.__init__(self, path, _Handler)
+
+    def server_close(self):
+        socketserver.UnixStreamServer.server_close(self)
+        if os.path.exists(self.server_address):
+            os.remove(self.server_address)
+
+def serve(path, cli, prog_name=None):
+    """ Serves a command line interface until a client stops the server
+
+    Args:
+        path (str):                 path of the socket
+        cli (click.Command):        command (group) to serve
+        prog_name (Optional[str]):  program name shown in messages
+    """
+    server = Server(path, cli, prog_name)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+
+def request(path, args, cwd=None):
+    """ Sends a command line to a server
+
+    Args:
+        path (str):                     path of the socket
+        args (Optional[List[str]]):     command line arguments, ``None``
+                                        stops the server
+        cwd (Optional[str]):            working directory of the command,
+                                        defaults to the current one
+
+    Returns:
+        (int, str, str): exit code, standard output and standard error
+    """
+    req = {'args': args, 'cwd': cwd or os.getcwd()}
+    with socket.socket(socket.AF_UNIX) as sock:
+        sock.connect(path)
+        sock.sendall(json.dumps(req).encode('utf-8') + b'\n')
+        sock.shutdown(socket.SHUT_WR)
+        with sock.makefile('rb') as handle:
+            answer = json.loads(handle.readline().decode('utf-8'))
+    return answer['code'], answer['stdout'], answer['stderr']
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod(optionflags=doctest.NORMALIZE_WHITESPACE)
@@ -0,0 +1,550 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+""" Functions for processing bibliographies that do not fit into memory
+
+The entries of the input files are streamed and partitioned by a stable hash
+of their merge key into temporary shard files. Entries sharing a merge key
+always end up in the same shard, hence the shards can be merged one after
+another and only one shard has to be held in memory at a time.
+
+    >>> import io
+    >>> left = io.StringIO('''
+    ... @article{a1, title = {A}, KEY = {ka}}
+    ... @article{a2, title = {B}, KEY = {kb}}
+    ... ''')
+    >>> right = io.StringIO('''
+    ... @book{b1, title = {A}, year = {2000}, KEY = {ka}}
+    ... ''')
+    >>> out = io.StringIO()
+    >>> external_merge([left, right], 'bib', 'yaml', out, union=False)
+    >>> print(out.getvalue().strip())
+    - ENTRYTYPE: article
+      ID: a2
+      title: B
+    - ENTRYTYPE: article
+      ID: a1
+      title: A
+      year: '2000'
+
+Note that the entries are ordered by shards.
+
+The same partitioning is available as :func:`split`, which writes the shards
+in one of the formats of :class:`listb.pybibtools.Bibliography`, so they can
+be processed independently, and :func:`gather`, which joins them again.
+"""
+
+from functools import reduce
+import hashlib
+import io
+import json
+import operator
+import os.path
+import re
+import tempfile
+
+from . import compress
+from .pybibtools import Bibliography, KeySpec, bibtex_load_list
+from .pybibtools import diff_entries, entry_hash, match, msnbib_load_list
+from .pybibtools import split_bibtex
+
+def split_yaml(handle):
+    """ Splits a YAML list of entries into the source code of its items
+
+    The list must be written in block style, i.e., every item starts with
+    "- " in the first column as done by the YAML writer of
+    :class:`listb.pybibtools.Bibliography`.
+
+    Args:
+        handle (handle): file handle of a YAML list
+
+    Yields:
+        str: source code of an item
+    """
+    chunk = []
+    for line in handle:
+        if line.startswith('-') and chunk:
+            yield ''.join(chunk)
+            chunk = []
+        if chunk or line.startswith('-'):
+            chunk.append(line)
+    if chunk:
+        yield ''.join(chunk)
+
+def iter_bibtex(handle, batch=1000):
+    """ Streams the entries of a BibTeX file
+
+    Strings defined with ``@string`` are available to all later batches.
+
+    Args:
+        handle (handle):        file handle of bibliography
+        batch (Optional[int]):  number of items parsed at once
+
+    Yields:
+        dict: bibliographic entry
+    """
+    for source in _bibtex_batches(handle, batch):
+        for entry in bibtex_load_list(io.StringIO(source)):
+            yield entry
+
+def iter_msnbib(handle, batch=1000):
+    """ Streams the entries of a BibTeX file exported from MathSciNet
+
+    Args:
+        handle (handle):        file handle of bibliography
+        batch (Optional[int]):  number of items parsed at once
+
+    Yields:
+        dict: bibliographic entry
+    """
+    for source in _bibtex_batches(handle, batch):
+        for entry in msnbib_load_list(io.StringIO(source)):
+            yield entry
+
+def iter_yaml(handle, batch=1000):
+    """ Streams the entries of a YAML list (see :func:`split_yaml`)
+
+    Args:
+        handle (handle):        file handle of bibliography
+        batch (Optional[int]):  number of items parsed at once
+
+    Yields:
+        dict: bibliographic entry
+    """
+    import yaml
+    for chunk in _batches(split_yaml(handle), batch):
+        for entry in yaml.safe_load(''.join(chunk)):
+            yield entry
+
+def iter_jsonl(handle):
+    """ Streams the entries of a file containing one JSON object per line
+
+    Args:
+        handle (handle): file handle
+
+    Yields:
+        dict: bibliographic entry
+    """
+    for line in handle:
+        if line.strip():
+            yield json.loads(line)
+
+def _batches(iterable, n):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) >= n:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def _bibtex_batches(handle, n):
+    # Prepends the @string items of the preceding batches to every batch
+    strings = []
+    for chunk in _batches(split_bibtex(handle), n):
+        yield ''.join(strings + chunk)
+        strings.extend(item for item in chunk
+                       if _bibtex_batches.STRING.match(item))
+_bibtex_batches.STRING = re.compile(r'@\s*string\s*[{(]', re.IGNORECASE)
+
+STREAM_READERS = {'bib': iter_bibtex,
+                  'jsonl': iter_jsonl,
+                  'msnbib': iter_msnbib,
+                  'yaml': iter_yaml
+                 }
+""" Streaming readers corresponding to
+:const:`listb.pybibtools.Bibliography.READERS`
+"""
+
+SEPARATORS = {'bib': '\n',
+              'jsonl': '',
+              'yaml': ''
+             }
+""" Separators between consecutive chunks written by the writers in
+:const:`listb.pybibtools.Bibliography.WRITERS`
+"""
+
+def shard_index(key, shards):
+    """ Assigns a key to a shard using a hash that is stable across runs
+
+    Args:
+        key (str):      merge key
+        shards (int):   number of shards
+
+    Returns:
+        int: number of the shard
+
+    Example:
+        >>> shard_index('MR3395349', 16)
+        15
+    """
+    digest = hashlib.md5(key.encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big') % shards
+
+def partition(entries, key, paths):
+    """ Writes entries into shard files by the hash of their key
+
+    Args:
+        entries (Iterable[dict]):   bibliographic entries
+        key (str or KeySpec):       name of the field used for sharding or
+                                    specification of the key
+        paths (List[str]):          paths to the shard files
+    """
+    if not callable(key):
+        key = operator.itemgetter(key)
+    handles = [open(p, 'w') for p in paths]
+    try:
+        for entry in entries:
+            shard = handles[shard_index(key(entry), len(handles))]
+            shard.write(json.dumps(entry, ensure_ascii=False) + '\n')
+    finally:
+        for h in handles:
+            h.close()
+
+def external_merge(files, reader, writer, out, union=True, keep_key=False,
+                   key=None, shards=16, tmpdir=None):
+    """ Merges bibliographies shard by shard with bounded memory
+
+    The result is the same as reducing the bibliographies with
+    :func:`listb.pybibtools.Bibliography.merge` up to the order of the
+    entries.
+
+    Args:
+        files (List[str or handle]):
+            paths to or handles of the input files, possibly compressed
+            (see :mod:`listb.compress`)
+        reader (str):
+            name of reader (see :const:`STREAM_READERS`)
+        writer (str):
+            name of writer (see :const:`listb.pybibtools.Bibliography.WRITERS`)
+        out (handle):
+            handle the result is written to
+        union (Optional[bool]):
+            see :func:`listb.pybibtools.Bibliography.merge`
+        keep_key (Optional[bool]):
+            see :func:`listb.pybibtools.Bibliography.merge`
+        key (Optional[str or KeySpec]):
+            name of the field to merge on. If it is not the merge key
+            :const:`listb.pybibtools.Bibliography.MERGEKEY`, the merge
+            key is created from it as in
+            :func:`listb.pybibtools.Bibliography.union`. A
+            :class:`listb.pybibtools.KeySpec` computes the merge key on
+            the fly.
+        shards (Optional[int]):
+            number of shards
+        tmpdir (Optional[str]):
+            directory for the temporary shard files
+
+    Raises:
+        RuntimeError: if the merged bibliography contains duplicate ID-s
+    """
+    if not key:
+        key = Bibliography.MERGEKEY
+    spec = key if isinstance(key, KeySpec) else None
+
+    with tempfile.TemporaryDirectory(dir=tmpdir) as tmp:
+        paths = [[os.path.join(tmp, '%d-%d.jsonl' % (i, s))
+                  for s in range(shards)] for i in range(len(files))]
+
+        for fil, shard_paths in zip(files, paths):
+            if isinstance(fil, str):
+                with compress.open(fil, 'r') as handle:
+                    partition(STREAM_READERS[reader](handle), key,
+                              shard_paths)
+            else:
+                partition(STREAM_READERS[reader](fil), key, shard_paths)
+
+        ids = set()
+        first = True
+        for s in range(shards):
+            bibs = []
+            for shard_paths in paths:
+                with open(shard_paths[s], 'r') as handle:
+                    bib = Bibliography(list(iter_jsonl(handle)))
+                if spec is None and key != Bibliography.MERGEKEY:
+                    bib.make_key(key)
+                bibs.append(bib)
+
+            f = lambda b1, b2: b1.merge(b2, union=union, keep_key=True,
+                                        key=spec)
+            bib = reduce(f, bibs)
+            if not bib.data:
+                continue
+
+            duplicates = ids.intersection(e['ID'] for e in bib)
+            if duplicates:
+                raise RuntimeError('Your bibliography contains duplicate '
+                                   'ID-s: %s' % sorted(duplicates))
+            ids.update(e['ID'] for e in bib)
+
+            if not keep_key:
+                bib.del_fields(Bibliography.MERGEKEY)
+            if not first:
+                out.write(SEPARATORS[writer])
+            out.write(bib.dump(writer=writer))
+            first = False
+
+def select(files, reader, writer, out, criteria, batch=1000):
+    """ Streams the entries meeting some criteria to a file
+
+    Only ``batch`` entries are held in memory at a time.
+
+    Args:
+        files (List[str or handle]):
+            paths to or handles of the input files, possibly compressed
+            (see :mod:`listb.compress`)
+        reader (str):
+            name of reader (see :const:`STREAM_READERS`)
+        writer (str):
+            name of writer (see :const:`listb.pybibtools.Bibliography.WRITERS`)
+        out (handle):
+            handle the matching entries are written to
+        criteria (Dict[str, Any]):
+            criteria as in :func:`listb.pybibtools.Bibliography.select`
+        batch (Optional[int]):
+            number of entries written at once
+
+    Example:
+        >>> import io
+        >>> bib = io.StringIO('''
+        ... @article{a1, year = {1989}}
+        ... @article{a2, year = {1995}}
+        ... ''')
+        >>> out = io.StringIO()
+        >>> select([bib], 'bib', 'yaml', out, {'year': ('1990', '2000')})
+        >>> print(out.getvalue().strip())
+        - ENTRYTYPE: article
+          ID: a2
+          year: '1995'
+    """
+    matching = (e for e in _entries(files, reader) if match(e, **criteria))
+    _write(matching, writer, out, batch)
+
+def split(files, reader, writer, paths, key, batch=1000):
+    """ Streams entries into shard files by a stable hash of their key
+
+    Entries with the same key end up in the same shard, no matter which
+    file they come from. Hence bibliographies split with the same key and
+    number of shards can be merged shard by shard, for example on different
+    machines, and the results joined with :func:`gather`.
+
+    Args:
+        files (List[str or handle]):
+            paths to or handles of the input files, possibly compressed
+            (see :mod:`listb.compress`)
+        reader (str):
+            name of reader (see :const:`STREAM_READERS`)
+        writer (str):
+            name of writer (see :const:`listb.pybibtools.Bibliography.WRITERS`)
+        paths (List[str]):
+            paths to the shard files, one per shard, possibly compressed
+        key (str or KeySpec):
+            name of the field to shard by or specification of the key
+        batch (Optional[int]):
+            number of entries held in memory per shard
+
+    Example:
+        >>> import os.path, tempfile
+        >>> tmp = tempfile.TemporaryDirectory()
+        >>> paths = [os.path.join(tmp.name, '%d.bib' % i) for i in range(2)]
+        >>> bib = io.StringIO(''.join('@article{a%d, year = {%d}}\\n'
+        ...                           % (i, 1983 + i % 2) for i in range(6)))
+        >>> split([bib], 'bib', 'bib', paths, KeySpec('year'))
+        >>> for path in paths:
+        ...     with open(path) as handle:
+        ...         print(sorted(e['year'] for e in iter_bibtex(handle)))
+        ['1984', '1984', '1984']
+        ['1983', '1983', '1983']
+        >>> tmp.cleanup()
+    """
+    if not callable(key):
+        key = operator.itemgetter(key)
+    buffers = [[] for _ in paths]
+    written = [False] * len(paths)
+    handles = [compress.open(p, 'w') for p in paths]
+    try:
+        def flush(shard):
+            if written[shard]:
+                handles[shard].write(SEPARATORS[writer])
+            handles[shard].write(
+                Bibliography(buffers[shard]).dump(writer=writer))
+            written[shard] = True
+            buffers[shard] = []
+
+        for entry in _entries(files, reader):
+            shard = shard_index(key(entry), len(paths))
+            buffers[shard].append(entry)
+            if len(buffers[shard]) >= batch:
+                flush(shard)
+        for shard, buf in enumerate(buffers):
+            if buf:
+                flush(shard)
+    finally:
+        for h in handles:
+            h.close()
+
+def gather(files, reader, writer, out, batch=1000):
+    """ Streams shard files into a single file
+
+    Only the ID-s of the entries and ``batch`` entries are held in memory.
+
+    Args:
+        files (List[str or handle]):
+            paths to or handles of the shard files, possibly compressed
+        reader (str):
+            name of reader (see :const:`STREAM_READERS`)
+        writer (str):
+            name of writer (see :const:`listb.pybibtools.Bibliography.WRITERS`)
+        out (handle):
+            handle the entries are written to
+        batch (Optional[int]):
+            number of entries written at once
+
+    Raises:
+        RuntimeError: if the shards contain duplicate ID-s
+
+    Example:
+        >>> shards = [io.StringIO('@article{a1, year = {1990}}'),
+        ...           io.StringIO('@article{a2, year = {1991}}')]
+        >>> out = io.StringIO()
+        >>> gather(shards, 'bib', 'yaml', out)
+        >>> print(out.getvalue().strip())
+        - ENTRYTYPE: article
+          ID: a1
+          year: '1990'
+        - ENTRYTYPE: article
+          ID: a2
+          year: '1991'
+    """
+    ids = set()
+    def unique(entries):
+        for entry in entries:
+            if entry['ID'] in ids:
+                raise RuntimeError('Your bibliography contains duplicate '
+                                   'ID-s: %s' % [entry['ID']])
+            ids.add(entry['ID'])
+            yield entry
+
+    _write(unique(_entries(files, reader)), writer, out, batch)
+
+def shard_digests(entries, key, shards, paths=None):
+    """ Computes digests of the shards of entries
+
+    The digest of a shard depends on the contents of its entries (see
+    :func:`listb.pybibtools.entry_hash`) but not on their order.
+
+    Args:
+        entries (Iterable[dict]):
+            bibliographic entries
+        key (str or KeySpec):
+            name of the field to shard by or specification of the key
+        shards (int):
+            number of shards
+        paths (Optional[List[str]]):
+            paths to files the shards are written to as in
+            :func:`partition`
+
+    Returns:
+        List[str]: hexadecimal digests of the shards
+
+    Example:
+        >>> entries = [{'ID': 'a', 'year': '1981'}, {'ID': 'b'}]
+        >>> shard_digests(entries, 'ID', 2) == shard_digests(
+        ...     entries[::-1], 'ID', 2)
+        True
+    """
+    if not callable(key):
+        key = operator.itemgetter(key)
+    sums = [0] * shards
+    handles = [open(p, 'w') for p in paths or []]
+    try:
+        for entry in entries:
+            shard = shard_index(key(entry), shards)
+            sums[shard] += int(entry_hash(entry), 16)
+            if handles:
+                handles[shard].write(json.dumps(entry, ensure_ascii=False)
+                                     + '\n')
+    finally:
+        for h in handles:
+            h.close()
+    return ['%040x' % (s % 2**160) for s in sums]
+
+def diff(old_files, new_files, reader, key='ID', shards=16, tmpdir=None):
+    """ Compares two versions of a bibliography shard by shard
+
+    Both versions are partitioned into temporary shard files and the
+    digests of the shards are computed on the way (see
+    :func:`shard_digests`). Only shards with different digests are
+    compared, and only one shard of the old version is held in memory at a
+    time.
+
+    Args:
+        old_files (List[str or handle]):
+            paths to or handles of the files of the previous version
+        new_files (List[str or handle]):
+            paths to or handles of the files of the current version
+        reader (str):
+            name of reader (see :const:`STREAM_READERS`)
+        key (Optional[str or KeySpec]):
+            name of the field identifying the entries or specification of
+            the key, defaults to "ID"
+        shards (Optional[int]):
+            number of shards
+        tmpdir (Optional[str]):
+            directory for the temporary shard files
+
+    Yields:
+        dict:
+            change of an entry as in
+            :func:`listb.pybibtools.diff_entries`, ordered by shards
+
+    Raises:
+        RuntimeError: if the keys of a version are not unique
+
+    Example:
+        >>> old = io.StringIO('@article{a1, year = {1981}}')
+        >>> new = io.StringIO('@article{a1, year = {1982}}')
+        >>> list(diff([old], [new], 'bib'))
+        [{'change': 'changed', 'key': 'a1', 'fields': {'year': ('1981',
+        '1982')}}]
+    """
+    if not isinstance(key, KeySpec):
+        key = KeySpec(key)
+
+    with tempfile.TemporaryDirectory(dir=tmpdir) as tmp:
+        paths = []
+        digests = []
+        for i, files in enumerate((old_files, new_files)):
+            paths.append([os.path.join(tmp, '%d-%d.jsonl' % (i, s))
+                          for s in range(shards)])
+            digests.append(shard_digests(_entries(files, reader), key,
+                                         shards, paths[-1]))
+
+        for s in range(shards):
+            if digests[0][s] == digests[1][s]:
+                continue
+            with open(paths[0][s], 'r') as handle:
+                old = list(iter_jsonl(handle))
+            with open(paths[1][s], 'r') as handle:
+                for change in diff_entries(old, iter_jsonl(handle), key):
+                    yield change
+
+def _entries(files, reader):
+    for fil in files:
+        if isinstance(fil, str):
+            with compress.open(fil, 'r') as handle:
+                for entry in STREAM_READERS[reader](handle):
+                    yield entry
+        else:
+            for entry in STREAM_READERS[reader](fil):
+                yield entry
+
+def _write(entries, writer, out, batch):
+    for i, chunk in enumerate(_batches(entries, batch)):
+        if i:
+            out.write(SEPARATORS[writer])
+        out.write(Bibliography(chunk).dump(writer=writer))
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod(optionflags=doctest.NORMALIZE_WHITESPACE)
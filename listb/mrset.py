@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+""" Compact files of sets of MR-numbers
+
+A set of MR-numbers is stored as its sorted numbers, where each number is
+replaced by its difference to the preceding one. The differences are small
+for dense sets and written as variable length integers (7 bits per byte, the
+high bit marks that another byte follows). A file starts with
+:const:`MAGIC` and the size of the set.
+
+The MR-numbers are handled as integers. :func:`to_str` turns them back into
+the strings with seven digits used by MathSciNet.
+
+    >>> import io
+    >>> handle = io.BytesIO()
+    >>> dump(['3549381', '0241312', 'MR3549381'], handle)
+    >>> len(handle.getvalue())
+    14
+    >>> _ = handle.seek(0)
+    >>> [to_str(n) for n in load(handle)]
+    ['0241312', '3549381']
+"""
+
+import re
+
+MAGIC = b'MRSET\x01'
+""" Beginning of a file storing a set of MR-numbers
+"""
+
+def to_int(mrnumber):
+    """ Parses an MR-number
+
+    Args:
+        mrnumber (str or int):  MR-number with or without the prefix "MR"
+
+    Returns:
+        int: MR-number
+
+    Raises:
+        ValueError: if ``mrnumber`` is not an MR-number
+
+    Attributes:
+        PAT (_sre.SRE_Pattern):
+            precompiled pattern matching an MR-number
+
+    Example:
+        >>> to_int('MR0241312'), to_int(' 3549381 ')
+        (241312, 3549381)
+    """
+    if isinstance(mrnumber, int):
+        return mrnumber
+    match = to_int.PAT.fullmatch(mrnumber.strip())
+    if not match:
+        raise ValueError('%r is not an MR-number.' % mrnumber)
+    return int(match.group(1))
+to_int.PAT = re.compile(r'(?:MR)?(\d+)', re.IGNORECASE)
+
+def to_str(number):
+    """ Formats an MR-number as done by MathSciNet
+
+    Args:
+        number (int): MR-number
+
+    Returns:
+        str: MR-number with at least seven digits
+
+    Example:
+        >>> to_str(241312)
+        '0241312'
+    """
+    return '%07d' % number
+
+def encode(numbers):
+    """ Encodes a set of MR-numbers
+
+    Args:
+        numbers (Iterable[int or str]): MR-numbers, may contain duplicates
+
+    Returns:
+        bytes: content of a file storing the set
+    """
+    numbers = sorted(set(map(to_int, numbers)))
+    data = bytearray(MAGIC)
+    _varint(data, len(numbers))
+    previous = 0
+    for n in numbers:
+        _varint(data, n - previous)
+        previous = n
+    return bytes(data)
+
+def decode(data):
+    """ Decodes a set of MR-numbers
+
+    Args:
+        data (bytes): content of a file storing a set (see :func:`encode`)
+
+    Returns:
+        List[int]: sorted MR-numbers
+
+    Raises:
+        ValueError: if ``data`` does not store a set of MR-numbers
+    """
+    if not data.startswith(MAGIC):
+        raise ValueError('The data does not store a set of MR-numbers.')
+    values = []
+    value = shift = 0
+    for byte in data[len(MAGIC):]:
+        value |= (byte & 0x7f) << shift
+        if byte & 0x80:
+            shift += 7
+        else:
+            values.append(value)
+            value = shift = 0
+    if shift or not values or len(values) != values[0] + 1:
+        raise ValueError('The set of MR-numbers is truncated.')
+
+    numbers = values[1:]
+    total = 0
+    for i, delta in enumerate(numbers):
+        total += delta
+        numbers[i] = total
+    return numbers
+
+def dump(numbers, handle):
+    """ Writes a set of MR-numbers to a binary file
+
+    Args:
+        numbers (Iterable[int or str]): MR-numbers, may contain duplicates
+        handle (handle):                binary file handle
+    """
+    handle.write(encode(numbers))
+
+def load(handle):
+    """ Reads MR-numbers from a binary file
+
+    Besides files written by :func:`dump`, lists of MR-numbers written by
+    :func:`listb.mrtools.yaml_dumps` and plain text files containing one
+    MR-number per line are accepted. Only the MR-number at the beginning of
+    a line is read, anything following it is ignored.
+
+    Args:
+        handle (handle): binary file handle
+
+    Returns:
+        List[int]:
+            MR-numbers, sorted for sets and in the order of the file
+            otherwise
+
+    Attributes:
+        PAT (_sre.SRE_Pattern):
+            precompiled pattern matching the MR-number at the beginning of
+            a line of a text file
+
+    Example:
+        >>> import io
+        >>> load(io.BytesIO(b"- '3549381'\\n- '0241312'\\n"))
+        [3549381, 241312]
+        >>> load(io.BytesIO(b"MR3549381 (2017a:03001)\\n\\n0241312\\n"))
+        [3549381, 241312]
+    """
+    data = handle.read()
+    if data.startswith(MAGIC):
+        return decode(data)
+    return [int(n) for n in load.PAT.findall(data.decode('utf-8'))]
+load.PAT = re.compile(r'^[ \t]*(?:-[ \t]*)?[\'"]?(?:MR)?(\d+)',
+                      re.IGNORECASE | re.MULTILINE)
+
+def from_entries(entries, field='mrnumber'):
+    """ Collects the MR-numbers of bibliographic entries
+
+    Entries without the field are skipped.
+
+    Args:
+        entries (Iterable[dict]):   bibliographic entries
+        field (Optional[str]):      name of the field storing the MR-number
+
+    Returns:
+        Set[int]: MR-numbers
+
+    Example:
+        >>> sorted(from_entries([{'mrnumber': '0241312'}, {'ID': 'x'},
+        ...                      {'mrnumber': 'MR3549381 (2017a:03001)'}]))
+        [241312, 3549381]
+    """
+    numbers = set()
+    for entry in entries:
+        match = from_entries.PAT.match(entry.get(field, ''))
+        if match:
+            numbers.add(int(match.group(1)))
+    return numbers
+from_entries.PAT = re.compile(r'\s*(?:MR)?(\d+)', re.IGNORECASE)
+
+def _varint(data, n):
+    while n > 0x7f:
+        data.append(n & 0x7f | 0x80)
+        n >>= 7
+    data.append(n)
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod(optionflags=doctest.NORMALIZE_WHITESPACE)
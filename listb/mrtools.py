@@ -4,11 +4,15 @@
 downloading BibTeX bibliographies associated to the results
 """
 
+import glob
+import hashlib
+import json
+import os
+import os.path
 import re
-import requests
-import yaml
+from concurrent.futures import ProcessPoolExecutor
 
-from bs4 import BeautifulSoup
+from . import compress
 
 def yaml_dump(data, path):
     """ Dumps data into yaml file at `path`
@@ -27,6 +31,7 @@ def yaml_dumps(data, handle):
         data (Dict[Any], etc.): data to be dumped
         handle (handle):        handle the data should be dumped into
     """
+    import yaml
     yaml.dump(data, handle,
               default_flow_style=False,
               allow_unicode=True)
@@ -69,6 +74,7 @@ def msn_to_mrnumbers(msn, outfile=None):
         >>> msn_to_mrnumbers(msn)
         ['3549381']
     """
+    from bs4 import BeautifulSoup
     msn_soup = BeautifulSoup(msn, 'html.parser')
 
     docs = msn_soup.find_all('div', class_='headlineText')
@@ -78,34 +84,156 @@ def msn_to_mrnumbers(msn, outfile=None):
         yaml_dump(mrnumbers, outfile)
     return mrnumbers
 
-def get_bibtex_from_msn(mrnumbers, outfile=None):
-    """ Fetches BibTeX file from MathSciNet server using the MR-numbers
+def saved_pages(paths):
+    """ Finds saved search pages
 
     Args:
-        mrnumbers (List[str]):
-            the BibTeX entries for these MR-numbers are retrieved
-        outfile (Opitonal[str]):
-            path to output file
+        paths (List[str]):
+            paths to pages, directories or glob patterns. Directories
+            stand for the HTML files in them, possibly compressed (see
+            :mod:`listb.compress`).
 
     Returns:
-        str:    BibTeX file as string
+        List[str]: paths to the pages, sorted per argument
 
-    Note:
-        To use this fuction you need to have access to MathSciNet.
+    Raises:
+        ValueError: if an argument matches no page
+    """
+    pages = []
+    for path in paths:
+        if os.path.isdir(path):
+            found = [os.path.join(path, name) for name in os.listdir(path)
+                     if compress.extension(name).lower() in ('html', 'htm')]
+        elif os.path.exists(path):
+            found = [path]
+        else:
+            found = [p for p in glob.glob(path) if os.path.isfile(p)]
+        if not found:
+            raise ValueError('There are no saved pages at %s.' % path)
+        pages.extend(sorted(found))
+    return pages
 
-    Example:
-        >>> print(get_bibtex_from_msn(['0241312'])) # doctest: +SKIP
-        @article {MR0241312,
-            AUTHOR = {Shelah, Saharon},
-             TITLE = {Note on a min-max problem of {L}eo {M}oser},
-           JOURNAL = {J. Combinatorial Theory},
-            VOLUME = {6},
-              YEAR = {1969},
-             PAGES = {298--300},
-           MRCLASS = {05.04},
-          MRNUMBER = {0241312},
-        MRREVIEWER = {G. F. Clements},
-        }
+def page_mrnumbers(path):
+    """ Retrieves MR-numbers from a saved search page
+
+    Args:
+        path (str): path to the page, possibly compressed
+
+    Returns:
+        List[str]: List of MR-numbers found on page
+    """
+    with compress.open(path, 'r', encoding='utf-8', errors='replace') as fin:
+        return msn_to_mrnumbers(fin.read())
+
+def pages_to_mrnumbers(paths, jobs=None):
+    """ Retrieves the MR-numbers from saved search pages in parallel
+
+    The pages are parsed in a process pool. The MR-numbers are yielded as
+    soon as the pages in front of them are parsed, each one only when it is
+    seen for the first time.
+
+    Args:
+        paths (List[str]):      paths to the pages, see :func:`page_mrnumbers`
+        jobs (Optional[int]):   number of processes, defaults to the number
+                                of CPUs
+
+    Yields:
+        str: MR-number
+    """
+    jobs = min(jobs or os.cpu_count() or 1, len(paths))
+    seen = set()
+    if jobs <= 1:
+        results = map(page_mrnumbers, paths)
+        pool = None
+    else:
+        pool = ProcessPoolExecutor(max_workers=jobs)
+        results = pool.map(page_mrnumbers, paths)
+    try:
+        for mrnumbers in results:
+            for n in mrnumbers:
+                if n not in seen:
+                    seen.add(n)
+                    yield n
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+
+BIBTEX_URL = 'http://www.ams.org/mathscinet/search/publications.html'
+""" URL of the search page returning BibTeX for MR-numbers
+"""
+
+BASE_URL = 'http://www.ams.org/%s'
+""" Pattern for absolute URLs from relative links on MathSciNet
+"""
+
+def session():
+    """ Returns the session shared by all requests to MathSciNet
+
+    The session keeps a pool of connections that is reused by subsequent
+    requests from any thread.
+
+    Returns:
+        requests.Session: the shared session
+
+    Attributes:
+        POOLSIZE (int):
+            maximal number of connections kept per host
+    """
+    if session.SESSION is None:
+        import requests.adapters
+        sess = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_maxsize=session.POOLSIZE)
+        sess.mount('http://', adapter)
+        sess.mount('https://', adapter)
+        session.SESSION = sess
+    return session.SESSION
+session.SESSION = None
+session.POOLSIZE = 10
+
+def client():
+    """ Returns the HTTP client shared by all requests to MathSciNet
+
+    The client uses the shared :func:`session` and retries failed requests.
+    Its circuit breaker pauses all threads if the server is overloaded.
+    Assign a :class:`listb.msnhttp.Client` to ``client.CLIENT`` for other
+    timeouts or retry settings.
+
+    Returns:
+        listb.msnhttp.Client: the shared client
+    """
+    if client.CLIENT is None:
+        from . import msnhttp
+        client.CLIENT = msnhttp.Client(session())
+    return client.CLIENT
+client.CLIENT = None
+
+def fetch(url, params=None, timeout=None):
+    """ Fetches the source code of a page using the shared :func:`client`
+
+    Args:
+        url (str):                  URL of the page
+        params (Optional[dict]):    query parameters
+        timeout (Optional[float]):  timeout in seconds overriding the
+                                    timeouts of the client
+
+    Returns:
+        str: source code of the page
+
+    Raises:
+        requests.RequestException:
+            if the request still failed after all retries
+    """
+    req = client().get(url, params=params, timeout=timeout)
+    return req.text
+
+def bibtex_params(mrnumbers):
+    """ Builds the query parameters for requesting BibTeX for MR-numbers
+
+    Args:
+        mrnumbers (List[str]):  MR-numbers
+
+    Returns:
+        dict: query parameters for :const:`BIBTEX_URL`
     """
     params = dict(
         bdl="",
@@ -137,16 +265,92 @@ def get_bibtex_from_msn(mrnumbers, outfile=None):
         agg_author_160185="160185"
     )
     params['b'] = mrnumbers
-    req = requests.get('http://www.ams.org/mathscinet/search/publications.html',
-                       params=params)
-    dirty_bib = req.text
-    soup = BeautifulSoup(dirty_bib, 'html.parser')
+    return params
+
+def msn_to_bibtex(msn):
+    """ Extracts the BibTeX entries from the source code of a page
+
+    Args:
+        msn (str):  source code of a page requested with
+                    :func:`bibtex_params`
+
+    Returns:
+        Optional[str]:  BibTeX file as string or ``None`` if the page does
+                        not contain any BibTeX
+
+    Example:
+        >>> msn = '''<div class="doc"><pre>@book {MR1,
+        ...     TITLE = {T},
+        ... }</pre></div>'''
+        >>> print(msn_to_bibtex(msn))
+        @book {MR1,
+            TITLE = {T},
+        }
+    """
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(msn, 'html.parser')
     pre_bib = soup.find('div', class_='doc')
     if not pre_bib:
         return
 
     entries = pre_bib.find_all('pre')
-    bib = '\n'.join([str(e.string) for e in entries])
+    return '\n'.join([str(e.string) for e in entries])
+
+def next_link(msn):
+    """ Extracts the link to the next page of a search result
+
+    Args:
+        msn (str):  source code of a search page
+
+    Returns:
+        Optional[str]:  relative link to the next page or ``None`` if it is
+                        the last page
+
+    Example:
+        >>> next_link('<a href="mathscinet/search?pg=2">Next</a>')
+        'mathscinet/search?pg=2'
+    """
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(msn, 'html.parser')
+    a = soup.find('a', string='Next')
+    if not a:
+        return
+    return a['href']
+
+def get_bibtex_from_msn(mrnumbers, outfile=None, timeout=None):
+    """ Fetches BibTeX file from MathSciNet server using the MR-numbers
+
+    Args:
+        mrnumbers (List[str]):
+            the BibTeX entries for these MR-numbers are retrieved
+        outfile (Opitonal[str]):
+            path to output file
+        timeout (Optional[float]):
+            timeout of the request in seconds
+
+    Returns:
+        str:    BibTeX file as string
+
+    Note:
+        To use this fuction you need to have access to MathSciNet.
+
+    Example:
+        >>> print(get_bibtex_from_msn(['0241312'])) # doctest: +SKIP
+        @article {MR0241312,
+            AUTHOR = {Shelah, Saharon},
+             TITLE = {Note on a min-max problem of {L}eo {M}oser},
+           JOURNAL = {J. Combinatorial Theory},
+            VOLUME = {6},
+              YEAR = {1969},
+             PAGES = {298--300},
+           MRCLASS = {05.04},
+          MRNUMBER = {0241312},
+        MRREVIEWER = {G. F. Clements},
+        }
+    """
+    bib = msn_to_bibtex(fetch(BIBTEX_URL, bibtex_params(mrnumbers), timeout))
+    if bib is None:
+        return
 
     if outfile:
         with open(outfile, 'w') as msn_bib:
@@ -154,15 +358,180 @@ def get_bibtex_from_msn(mrnumbers, outfile=None):
 
     return bib
 
-def crawl(url):
+def result_count(msn):
+    """ Extracts the number of matches reported on a search page
+
+    Args:
+        msn (str):  source code of a search page
+
+    Returns:
+        Optional[int]:  number of matches or ``None`` if it is not reported
+
+    Example:
+        >>> result_count('<div class="matches">Matches: <b>1234</b></div>')
+        1234
+
+    Attributes:
+        PAT (_sre.SRE_Pattern):
+            precompiled pattern for extracting the number of matches
+    """
+    from bs4 import BeautifulSoup
+    text = BeautifulSoup(msn, 'html.parser').get_text()
+    grp = result_count.PAT.search(text)
+    if not grp:
+        return
+    return int(grp.group(1).replace(',', ''))
+result_count.PAT = re.compile(r'Matches:\s*([\d,]+)', re.IGNORECASE)
+
+class PageCache(object):
+    """ Validators and source codes of crawled pages
+
+    For every URL the "ETag" and "Last-Modified" headers, a hash of the
+    source code, the number of matches, the link to the next page and the
+    source code itself are stored. :func:`crawl` uses them for conditional
+    requests.
+
+    Args:
+        pages (Optional[Dict[str, dict]]): cached pages by URL
+
+    Example:
+        >>> cache = PageCache()
+        >>> cache.update('http://a.b', 'source', {'ETag': '"x"'})
+        False
+        >>> cache.headers('http://a.b')
+        {'If-None-Match': '"x"'}
+        >>> cache.update('http://a.b', 'source', {})
+        True
+    """
+
+    def __init__(self, pages=None):
+        self.pages = pages or {}
+
+    def headers(self, url):
+        """ Builds the headers of a conditional request
+
+        Args:
+            url (str): URL of the page
+
+        Returns:
+            dict: headers for revalidating the cached page
+        """
+        page = self.pages.get(url, {})
+        headers = {}
+        if page.get('etag'):
+            headers['If-None-Match'] = page['etag']
+        if page.get('last_modified'):
+            headers['If-Modified-Since'] = page['last_modified']
+        return headers
+
+    def update(self, url, site, headers):
+        """ Stores a fetched page
+
+        Args:
+            url (str):      URL of the page
+            site (str):     source code of the page
+            headers (dict): headers of the response
+
+        Returns:
+            bool: ``True`` if the source code did not change
+        """
+        digest = hashlib.sha1(site.encode('utf-8')).hexdigest()
+        old = self.pages.get(url, {})
+        self.pages[url] = {'etag': headers.get('ETag'),
+                           'last_modified': headers.get('Last-Modified'),
+                           'hash': digest,
+                           'count': result_count(site),
+                           'next': next_link(site),
+                           'site': site}
+        return old.get('hash') == digest
+
+    def site(self, url):
+        """ Returns the cached source code of a page
+
+        Args:
+            url (str): URL of the page
+
+        Returns:
+            Optional[str]: source code or ``None`` if the page is not cached
+        """
+        return self.pages.get(url, {}).get('site')
+
+    def chain(self, url):
+        """ Follows the cached links to the next pages
+
+        Args:
+            url (str): URL of the first page
+
+        Returns:
+            Optional[(List[str], List[str])]:
+                cached source codes and URLs as returned by :func:`crawl` or
+                ``None`` if not all pages are cached
+        """
+        sites = []
+        urls = [url]
+        while True:
+            if url not in self.pages:
+                return
+            page = self.pages[url]
+            sites.append(page['site'])
+            if not page['next']:
+                return sites, urls
+            urls.append(page['next'])
+            url = BASE_URL % page['next']
+            if len(urls) > len(self.pages):
+                return # links form a cycle
+
+    def load(self, handle):
+        """ Loads the cache from handle
+
+        Args:
+            handle (handle): file handle of a cache created by :func:`dump`
+        """
+        self.pages = json.load(handle)
+
+    def dump(self):
+        """ Serializes the cache
+
+        Returns:
+            str: JSON representation of the cache
+        """
+        return json.dumps(self.pages)
+
+def fetch_conditional(url, cache, timeout=None):
+    """ Fetches a page using a conditional request
+
+    Args:
+        url (str):                  URL of the page
+        cache (PageCache):          cache of the validators, gets updated
+        timeout (Optional[float]):  timeout in seconds
+
+    Returns:
+        (str, bool):    source code of the page and whether it is unchanged
+    """
+    req = client().get(url, timeout=timeout, headers=cache.headers(url))
+    if req.status_code == 304 and cache.site(url) is not None:
+        return cache.site(url), True
+
+    site = req.text
+    return site, cache.update(url, site, req.headers)
+
+def crawl(url, timeout=None, cache=None):
     """ Crawls specified URL on MathSciNet
 
     If the search result is split into 5 pages and the URL to page
     3 is passed then the source codes and URLs of pages 3, 4, and 5
     are returned.
 
+    If a :class:`PageCache` is passed, pages are revalidated using
+    conditional requests. If the first page is unchanged and reports the
+    same number of matches as before, the cached pages are returned without
+    requesting the succeeding pages.
+
     Args:
-        url (str):  URL pointing to a search page on MathSciNet
+        url (str):                  URL pointing to a search page on
+                                    MathSciNet
+        timeout (Optional[float]):  timeout of each request in seconds
+        cache (Optional[PageCache]): cache of the crawled pages, gets updated
 
     Returns:
         (List[str], List[str]): List of page source codes and list of URLs
@@ -170,19 +539,28 @@ def crawl(url):
     Note:
         To use this fuction you need to have access to MathSciNet.
     """
+    if cache is None:
+        get = lambda url: fetch(url, timeout=timeout)
+        site = get(url)
+    else:
+        get = lambda url: fetch_conditional(url, cache, timeout)[0]
+        count = cache.pages.get(url, {}).get('count')
+        chain = cache.chain(url)
+        site, unchanged = fetch_conditional(url, cache, timeout)
+        if unchanged and chain and count == result_count(site):
+            return chain
+
     sites = []
     urls = [url]
     while True:
-        req = requests.get(url)
-        site = req.text
         sites.append(site)
-        soup = BeautifulSoup(site, 'html.parser')
-        a = soup.find('a', string='Next')
-        if not a:
+        link = next_link(site)
+        if not link:
             break
-        urls.append(a['href'])
+        urls.append(link)
         # Links on MathSciNet are relative
-        url = 'http://www.ams.org/%s' % a['href']
+        url = BASE_URL % link
+        site = get(url)
     return sites, urls
 
 if __name__ == '__main__':
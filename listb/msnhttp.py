@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+""" HTTP layer for requests to MathSciNet
+
+:class:`Client` adds connect and read timeouts, retries with exponential
+backoff and jitter and a :class:`CircuitBreaker` to a ``requests`` session.
+Failed requests are retried if the connection failed or timed out, or if the
+server answered with one of the status codes in
+:const:`Client.RETRY_STATUS`. A "Retry-After" header sent by the server is
+honored, and pauses all threads sharing the client.
+"""
+
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+import random
+import threading
+import time
+
+import requests
+
+def retry_after(response):
+    """ Reads the "Retry-After" header of a response
+
+    Args:
+        response (requests.Response): response of the server
+
+    Returns:
+        Optional[float]: seconds to wait or ``None`` if the header is
+                         missing or invalid
+
+    Example:
+        >>> response = requests.Response()
+        >>> response.headers['Retry-After'] = '120'
+        >>> retry_after(response)
+        120.0
+        >>> response.headers['Retry-After'] = 'Wed, 21 Oct 2015 07:28:00 GMT'
+        >>> retry_after(response)
+        0.0
+    """
+    value = response.headers.get('Retry-After')
+    if value is None:
+        return None
+
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+
+    try:
+        date = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if date.tzinfo is None:
+        date = date.replace(tzinfo=timezone.utc)
+    delay = (date - datetime.now(timezone.utc)).total_seconds()
+    return max(delay, 0.0)
+
+class CircuitBreaker(object):
+    """ Pauses all threads once the server seems to be overloaded
+
+    After ``threshold`` consecutive failures the breaker opens for
+    ``cooldown`` seconds. While it is open, :func:`wait` blocks every thread
+    sharing the breaker. A successful request closes it again.
+
+    Args:
+        threshold (Optional[int]):      consecutive failures opening the
+                                        breaker
+        cooldown (Optional[float]):     seconds the breaker stays open
+        clock (Optional[function]):     returns the current time in seconds
+        sleep (Optional[function]):     sleeps for the given seconds
+
+    Example:
+        >>> breaker = CircuitBreaker(threshold=2, cooldown=10,
+        ...                          clock=lambda: 0)
+        >>> breaker.failure()
+        >>> breaker.is_open()
+        False
+        >>> breaker.failure()
+        >>> breaker.is_open()
+        True
+        >>> breaker.success()
+        >>> breaker.is_open()
+        False
+    """
+
+    def __init__(self, threshold=5, cooldown=30.0, clock=time.monotonic,
+                 sleep=time.sleep):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.clock = clock
+        self.sleep = sleep
+        self.failures = 0
+        self.opened_until = None
+        self._lock = threading.Lock()
+
+    def is_open(self):
+        """ Checks whether requests are paused
+
+        Returns:
+            bool: ``True`` if the breaker is open
+        """
+        with self._lock:
+            return (self.opened_until is not None
+                    and self.clock() < self.opened_until)
+
+    def wait(self):
+        """ Blocks until the breaker is closed
+        """
+        while True:
+            with self._lock:
+                if self.opened_until is None:
+                    return
+                remaining = self.opened_until - self.clock()
+            if remaining <= 0:
+                return
+            self.sleep(remaining)
+
+    def success(self):
+        """ Records a successful request and closes the breaker
+        """
+        with self._lock:
+            self.failures = 0
+            self.opened_until = None
+
+    def failure(self, pause=None):
+        """ Records a failed request
+
+        Args:
+            pause (Optional[float]):
+                seconds requested by the server to pause. If given, the
+                breaker opens at least for that long regardless of the
+                number of failures.
+        """
+        with self._lock:
+            self.failures += 1
+            until = None
+            if pause is not None:
+                until = self.clock() + pause
+            if self.failures >= self.threshold:
+                until = max(until or 0, self.clock() + self.cooldown)
+            if until is not None:
+                self.opened_until = max(self.opened_until or 0, until)
+
+class Client(object):
+    """ HTTP client with timeouts, retries and a circuit breaker
+
+    Args:
+        session (Optional[requests.Session]):
+            session used for the requests
+        timeout (Optional[(float, float)]):
+            connect and read timeout in seconds
+        retries (Optional[int]):
+            maximal number of retries of a request
+        backoff (Optional[float]):
+            base of the exponential backoff in seconds
+        max_backoff (Optional[float]):
+            maximal backoff in seconds
+        breaker (Optional[CircuitBreaker]):
+            circuit breaker shared by all requests of the client
+        sleep (Optional[function]):
+            sleeps for the given seconds
+    """
+
+    RETRY_STATUS = {429, 500, 502, 503, 504}
+    """ Status codes of responses that are retried
+    """
+
+    def __init__(self, session=None, timeout=(10.0, 60.0), retries=5,
+                 backoff=1.0, max_backoff=60.0, breaker=None,
+                 sleep=time.sleep):
+        self.session = session or requests.Session()
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.breaker = breaker or CircuitBreaker(sleep=sleep)
+        self.sleep = sleep
+
+    def delay(self, attempt):
+        """ Computes the backoff before a retry ("full jitter")
+
+        Args:
+            attempt (int): number of the failed attempt starting at 0
+
+        Returns:
+            float: seconds to wait
+
+        Example:
+            >>> client = Client(backoff=1, max_backoff=10)
+            >>> all(0 <= client.delay(a) <= min(10, 2 ** a)
+            ...     for a in range(8))
+            True
+        """
+        return random.uniform(0, min(self.max_backoff,
+                                     self.backoff * 2 ** attempt))
+
+    def get(self, url, params=None, timeout=None, headers=None):
+        """ Sends a GET request and retries it on transient failures
+
+        Args:
+            url (str):                  URL
+            params (Optional[dict]):    query parameters
+            timeout (Optional[float or (float, float)]):
+                timeout overriding the one of the client
+            headers (Optional[dict]):   additional headers
+
+        Returns:
+            requests.Response: response of the server
+
+        Raises:
+            requests.RequestException:
+                if the request still failed after all retries
+        """
+        if timeout is None:
+            timeout = self.timeout
+
+        for attempt in range(self.retries + 1):
+            self.breaker.wait()
+            pause = None
+            try:
+                response = self.session.get(url, params=params,
+                                            timeout=timeout, headers=headers)
+            except (requests.ConnectionError, requests.Timeout) as err:
+                error = err
+            else:
+                if response.status_code not in self.RETRY_STATUS:
+                    self.breaker.success()
+                    return response
+                error = requests.HTTPError('%d Server Error for url: %s'
+                                           % (response.status_code,
+                                              response.url),
+                                           response=response)
+                pause = retry_after(response)
+
+            self.breaker.failure(pause)
+            if attempt == self.retries:
+                break
+            self.sleep(pause if pause is not None else self.delay(attempt))
+
+        raise error
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod(optionflags=doctest.NORMALIZE_WHITESPACE)
@@ -4,13 +4,11 @@
 """
 
 
+import functools
 import re
 import string
 import unicodedata
 
-import bibtexparser.customization as bc
-from bibtexparser.latexenc import latex_to_unicode
-
 def latex_to_ascii(tex):
     r""" Transforms LaTeX strings to ascii text ignoring accents
 
@@ -28,10 +26,17 @@ def latex_to_ascii(tex):
         >>> latex_to_ascii(r"Bartoszy\'nski Ros\l anowski")
         'Bartoszynski Rosl anowski'
     """
-    for pat, sub in latex_to_ascii.dict.items():
-        tex = tex.replace(pat, sub)
-
-    uni = latex_to_unicode(tex)
+    if '\\' not in tex and '{' not in tex:
+        # Without commands latex_to_unicode merely drops closing braces
+        uni = tex.replace('}', '')
+        if uni.isascii():
+            return uni
+    else:
+        for pat, sub in latex_to_ascii.dict.items():
+            tex = tex.replace(pat, sub)
+
+        from bibtexparser.latexenc import latex_to_unicode
+        uni = latex_to_unicode(tex)
     asc = unicodedata.normalize('NFD', uni)
     asc = asc.encode('ascii', 'ignore').decode('utf-8')
     return asc
@@ -79,13 +84,107 @@ def norm_author(record):
         ...              'Ihoda (Haim Judah), Jaime'})
         'Avraham Ihoda'
     """
-    authors = record['author'].split(' and ')
-    authors = bc.getnames(authors) # Correct "Name, Surname"-format
-    authors = [a.split(',')[0] for a in authors]
-    authors = list(map(_norm_author, authors))
+    authors = [_norm_last_name(a) for a in record['author'].split(' and ')]
+    authors = [a for a in authors if a is not None]
     authors.sort()
     return ' '.join(authors)
 
+def last_name(name):
+    """ Extracts the last name of a person
+
+    The result is the part in front of the first comma of the name as
+    formatted by ``bibtexparser.customization.getnames``, including its
+    handling of braces, "jr" and particles like "van".
+
+    Args:
+        name (str): name as "Last, First" or "First Last"
+
+    Returns:
+        str: last name
+
+    Raises:
+        IndexError: if ``getnames`` fails on the name, e.g. for "jr"
+
+    Examples:
+        >>> last_name('Shelah, Saharon')
+        'Shelah'
+        >>> last_name('Uwe Ludwig Horn')
+        'Horn'
+        >>> last_name('{Uwe Ludwig} Horn')
+        'Horn'
+        >>> last_name('Ludwig van Beethoven')
+        'van Beethoven'
+        >>> last_name('Jean de la Fontaine')
+        'la Fontaine'
+    """
+    name = name.strip()
+    if ',' in name:
+        last, firsts = name.split(',', 1)
+        last = last.strip()
+        firsts = firsts.split()
+    else:
+        if '{' in name and '}' in name:
+            words = _split_braced(name)
+            if words is None:
+                return name
+        else:
+            words = name.split()
+        last = words.pop()
+        firsts = [w.replace('.', '. ').strip() for w in words]
+
+    if last in ('jnr', 'jr', 'junior'):
+        last = firsts.pop()
+    # pops from the end while iterating just like getnames
+    for item in firsts:
+        if item in last_name.PARTICLES:
+            last = firsts.pop() + ' ' + last
+    return last.split(',')[0]
+last_name.PARTICLES = frozenset(['ben', 'van', 'der', 'de', 'la', 'le'])
+
+def _split_braced(name):
+    """ Splits a name at spaces outside of braces like ``getnames``,
+    returns ``None`` if the braces do not match
+    """
+    opening = [m.start() for m in _split_braced.OPEN.finditer(name)]
+    closing = [-m.start() for m in _split_braced.CLOSE.finditer(name)]
+    if len(opening) != len(closing):
+        # checked first, as a closing brace at 0 would pass for an opening
+        return None
+
+    brackets = {}
+    stack = []
+    positions = sorted(opening + closing, key=abs)
+    for i in positions:
+        if i >= 0:
+            stack.append(i)
+        elif not stack:
+            return None
+        else:
+            brackets[stack.pop()] = -i
+    if stack:
+        return None
+
+    words = []
+    start = 0
+    i = 0
+    while True:
+        i = brackets[i] if i in brackets else i + 1
+        if i >= len(name):
+            break
+        if name[i] == ' ':
+            words.append(name[start:i])
+            start = i + 1
+        elif i == len(name) - 1:
+            words.append(name[start:])
+    return words
+_split_braced.OPEN = re.compile(r'(?<!\\)\{')
+_split_braced.CLOSE = re.compile(r'(?<!\\)\}')
+
+@functools.lru_cache(maxsize=2**16)
+def _norm_last_name(name):
+    if not name.strip():
+        return None
+    return _norm_author(last_name(name))
 
 def _norm_author(author):
     author = latex_to_ascii(author)
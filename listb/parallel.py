@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+""" Parsing a single large BibTeX file in parallel
+
+The file is memory-mapped and cut into chunks in front of lines starting with
+"@" outside of braces, the same boundaries :func:`listb.pybibtools.split_bibtex`
+uses. The chunks are parsed in a process pool and their entry lists are
+concatenated in the order of the file, so the result is the same as the one
+of the serial readers. Files defining strings with ``@string`` are parsed
+serially, since the definitions affect all following entries.
+
+The file has to be in an encoding compatible with ASCII, like UTF-8.
+
+    >>> import os.path, tempfile
+    >>> tmp = tempfile.TemporaryDirectory()
+    >>> path = os.path.join(tmp.name, 'in.bib')
+    >>> with open(path, 'w') as handle:
+    ...     _ = handle.write(''.join('@article{a%d, title = {T}}\\n' % i
+    ...                              for i in range(100)))
+    >>> entries = load_list(path, jobs=2, min_chunk=100)
+    >>> [e['ID'] for e in entries[:3]], len(entries)
+    (['a0', 'a1', 'a2'], 100)
+    >>> tmp.cleanup()
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+import io
+import locale
+import mmap
+import os
+import re
+
+from . import compress
+from .pybibtools import Bibliography
+
+READERS = {'bib', 'msnbib'}
+""" Readers that can parse the chunks of a file independently
+"""
+
+def chunk_bounds(buf, size):
+    """ Finds boundaries of top-level items about ``size`` bytes apart
+
+    A boundary is the start of a line beginning with "@" where the braces
+    in front of it are balanced.
+
+    Args:
+        buf (bytes or mmap.mmap):   content of a BibTeX file
+        size (int):                 desired size of the chunks in bytes
+
+    Returns:
+        List[(int, int, int)]: start, end and first line number of each chunk
+
+    Attributes:
+        ITEM (_sre.SRE_Pattern):
+            precompiled pattern matching the beginning of a line that
+            starts with "@"
+
+    Example:
+        >>> chunk_bounds(b'@a{x, t = {\\n@b}}\\n@c{y}\\n@d{z}\\n', 1)
+        [(0, 17, 1), (17, 23, 3), (23, 29, 4)]
+    """
+    bounds = []
+    start = last = 0
+    depth = 0
+    line = first = 1
+    pos = size
+    while pos < len(buf):
+        match = chunk_bounds.ITEM.search(buf, pos - 1)
+        if not match:
+            break
+        cut = match.start() + 1
+        segment = buf[last:cut]
+        depth += segment.count(b'{') - segment.count(b'}')
+        line += segment.count(b'\n')
+        last = cut
+        if depth == 0:
+            bounds.append((start, cut, first))
+            start, first = cut, line
+            pos = cut + size
+        else:
+            pos = cut + 1
+    bounds.append((start, len(buf), first))
+    return bounds
+chunk_bounds.ITEM = re.compile(rb'\n[ \t]*@')
+
+def load_list(path, reader='bib', jobs=None, min_chunk=2**16):
+    """ Loads a BibTeX file parsing chunks of it in parallel
+
+    Compressed files (see :mod:`listb.compress`) are parsed serially.
+    Exceptions raised while parsing a chunk are passed on. In Python 3.11
+    and later they carry a note naming the lines of the chunk. Note that
+    bibtexparser skips malformed entries silently, as it does when parsing
+    the whole file.
+
+    Args:
+        path (str):
+            path to the BibTeX file
+        reader (Optional[str]):
+            name of reader (see :const:`READERS`)
+        jobs (Optional[int]):
+            number of processes, defaults to the number of CPUs
+        min_chunk (Optional[int]):
+            minimal size of a chunk in bytes
+
+    Returns:
+        List[dict]: entry list of bibliography
+    """
+    if reader not in READERS:
+        raise ValueError('The %s reader cannot parse in parallel.' % reader)
+    if compress.compression(path):
+        # compressed files cannot be mapped into memory
+        with compress.open(path, 'r') as handle:
+            return Bibliography.READERS[reader](handle)
+    jobs = jobs or os.cpu_count() or 1
+
+    with open(path, 'rb') as handle:
+        size = os.fstat(handle.fileno()).st_size
+        bounds = [(0, size, 1)]
+        if jobs > 1 and size > min_chunk:
+            with mmap.mmap(handle.fileno(), 0,
+                           access=mmap.ACCESS_READ) as buf:
+                if not load_list.STRING.search(buf):
+                    chunk = max(min_chunk, size // (4 * jobs))
+                    bounds = chunk_bounds(buf, chunk)
+
+    encoding = locale.getpreferredencoding(False)
+    if len(bounds) == 1:
+        return _parse(path, reader, encoding, *bounds[0])
+
+    entry_list = []
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = [pool.submit(_parse, path, reader, encoding, *b)
+                   for b in bounds]
+        for i, future in enumerate(futures):
+            try:
+                entry_list.extend(future.result())
+            except Exception as err:
+                if hasattr(err, 'add_note'):
+                    lines = '%d-' % bounds[i][2]
+                    if i + 1 < len(bounds):
+                        lines += '%d' % (bounds[i + 1][2] - 1)
+                    err.add_note('while parsing lines %s of %s'
+                                 % (lines, path))
+                for f in futures:
+                    f.cancel()
+                raise
+    return entry_list
+load_list.STRING = re.compile(rb'@\s*string\s*[{(]', re.IGNORECASE)
+
+def _parse(path, reader, encoding, start, stop, line):
+    with open(path, 'rb') as handle:
+        handle.seek(start)
+        text = handle.read(stop - start).decode(encoding)
+    # universal newlines as in text mode
+    text = text.replace('\r\n', '\n').replace('\r', '\n')
+    return Bibliography.READERS[reader](io.StringIO(text))
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod(optionflags=doctest.NORMALIZE_WHITESPACE)
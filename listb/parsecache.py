@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+""" Cache of parsed bibliographies on disk
+
+Parsing BibTeX is slow, so :class:`ParseCache` stores the parsed entry lists
+of input files as pickles in a cache directory. The pickles are named after
+the SHA-1 hash of the content of the file and the reader, hence a file is
+only parsed again once its content changes. The hash of a file is
+remembered together with its path, modification time and size, so an
+unchanged file is not even read.
+
+The cache directory is bounded in size. If it gets too large, the least
+recently used pickles are deleted.
+
+Since pickles can execute code when they are loaded, the cache directory
+must not be writable by others.
+
+    >>> import os.path, tempfile
+    >>> tmp = tempfile.TemporaryDirectory()
+    >>> path = os.path.join(tmp.name, 'in.bib')
+    >>> with open(path, 'w') as handle:
+    ...     _ = handle.write('@article{a1, title = {T}}')
+    >>> cache = ParseCache(os.path.join(tmp.name, 'cache'))
+    >>> [e['ID'] for e in cache.load(path, 'bib')]
+    ['a1']
+    >>> cache.hits, cache.misses
+    (0, 1)
+    >>> [e['ID'] for e in cache.load(path, 'bib')]
+    ['a1']
+    >>> cache.hits, cache.misses
+    (1, 1)
+    >>> tmp.cleanup()
+"""
+
+import hashlib
+import json
+import os
+import os.path
+import pickle
+import tempfile
+
+from . import compress
+from .pybibtools import Bibliography
+
+class ParseCache(object):
+    """ Cache of parsed bibliographies in a directory
+
+    Args:
+        directory (str):            path to the cache directory, it is
+                                    created if necessary
+        max_size (Optional[int]):   maximal size of the cached pickles in
+                                    bytes
+
+    Attributes:
+        hits (int):     number of entry lists read from the cache
+        misses (int):   number of files parsed
+    """
+
+    VERSION = 1
+    """ Version of the format of the cache, part of the names of the pickles
+    """
+
+    INDEX = 'index.json'
+    """ Name of the file storing path, modification time, size and hash of
+    the files seen so far
+    """
+
+    def __init__(self, directory, max_size=256 * 2**20):
+        self.directory = directory
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._index = None
+        os.makedirs(directory, exist_ok=True)
+
+    def index(self):
+        """ Returns the index of the files seen so far
+
+        Returns:
+            Dict[str, List]:
+                modification time in nanoseconds, size and hash of the
+                content by absolute path
+        """
+        if self._index is None:
+            try:
+                with open(self._path(self.INDEX), 'r') as handle:
+                    self._index = json.load(handle)
+            except (OSError, ValueError):
+                self._index = {}
+        return self._index
+
+    def digest(self, path):
+        """ Computes the hash of the content of a file
+
+        The hash is taken from the index if modification time and size of
+        the file did not change.
+
+        Args:
+            path (str): path to the file
+
+        Returns:
+            str: hexadecimal SHA-1 digest of the content
+        """
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        version = [stat.st_mtime_ns, stat.st_size]
+        known = self.index().get(path)
+        if known and known[:2] == version:
+            return known[2]
+
+        sha1 = hashlib.sha1()
+        with open(path, 'rb') as handle:
+            for block in iter(lambda: handle.read(2**20), b''):
+                sha1.update(block)
+        digest = sha1.hexdigest()
+
+        self.index()[path] = version + [digest]
+        self._write(self.INDEX, json.dumps(self.index()).encode('utf-8'))
+        return digest
+
+    def load(self, path, reader='yaml', parse=None):
+        """ Loads a bibliography from the cache or parses it
+
+        Args:
+            path (str):             path to the bibliography
+            reader (Optional[str]):
+                name of reader (see
+                :const:`listb.pybibtools.Bibliography.READERS`)
+            parse (Optional[function]):
+                called with ``path`` and ``reader`` to parse the file,
+                defaults to reading it with ``reader``
+
+        Returns:
+            List[dict]: entry list of the bibliography
+        """
+        name = '%s-%s-%d.pickle' % (self.digest(path), reader, self.VERSION)
+        try:
+            with open(self._path(name), 'rb') as handle:
+                data = pickle.load(handle)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            pass
+        else:
+            self.hits += 1
+            try:
+                os.utime(self._path(name)) # marks the pickle as recently used
+            except OSError:
+                pass # evicted by another process
+            return data
+
+        self.misses += 1
+        if parse is not None:
+            data = parse(path, reader)
+        else:
+            with compress.open(path, 'r') as handle:
+                data = Bibliography.READERS[reader](handle)
+        self._write(name, pickle.dumps(data, pickle.HIGHEST_PROTOCOL))
+        self.evict()
+        return data
+
+    def evict(self):
+        """ Deletes the least recently used pickles until the size of the
+        cache does not exceed :attr:`max_size`
+        """
+        pickles = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.pickle'):
+                stat = entry.stat()
+                pickles.append((stat.st_mtime_ns, stat.st_size, entry.path))
+
+        size = sum(s for _, s, _ in pickles)
+        for _, s, path in sorted(pickles):
+            if size <= self.max_size:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass # removed by another process
+            size -= s
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def _write(self, name, data):
+        # Other processes never see partially written files
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as handle:
+                handle.write(data)
+            os.replace(tmp, self._path(name))
+        except BaseException:
+            os.remove(tmp)
+            raise
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod(optionflags=doctest.NORMALIZE_WHITESPACE)
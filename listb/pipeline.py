@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+""" Streaming pipeline from a MathSciNet search to a merged bibliography
+
+The stages run concurrently and are connected by bounded queues:
+
+1. a crawler thread fetches the search pages one after another and passes
+   the MR-numbers of each page on in chunks,
+2. several fetcher threads request the BibTeX of the chunks and parse it,
+3. the calling thread normalizes the fetched entries and merges them into the
+   target bibliography as they arrive.
+
+Since the queues are bounded, a slow stage slows down the stages in front of
+it instead of piling up data.
+"""
+
+import copy
+import io
+import queue
+import threading
+
+from . import mrtools
+from .pybibtools import Bibliography, KeySpec, msnbib_load_list
+
+DERIVED = KeySpec.DERIVED
+""" Fields computed for the merge key if they are named in the key
+"""
+
+_DONE = object()
+
+class PipelineError(RuntimeError):
+    """ Raised if MathSciNet did not return BibTeX for some MR-numbers
+
+    Attributes:
+        bib (Bibliography):         the bibliography merged so far
+        chunks (List[List[str]]):   chunks of MR-numbers without BibTeX
+    """
+
+    def __init__(self, bib, chunks):
+        RuntimeError.__init__(self, 'There seems to be something wrong with '
+                              'at least one of the following MR-numbers.'
+                              '\n\n%s' % '\n'.join(', '.join(c)
+                                                   for c in chunks))
+        self.bib = bib
+        self.chunks = chunks
+
+def make_key(entry, keys):
+    """ Computes the merge key of an entry
+
+    Fields in :const:`DERIVED` are computed on the fly, see
+    :class:`listb.pybibtools.KeySpec`.
+
+    Args:
+        entry (dict):       bibliographic entry
+        keys (List[str]):   names of the fields forming the key
+
+    Returns:
+        str: merge key
+
+    Example:
+        >>> make_key({'author': 'Shelah, Saharon', 'year': '1969'},
+        ...          ['normauthor', 'year'])
+        'Shelah-1969'
+    """
+    return KeySpec(*keys)(entry)
+
+def _put(q, item, stop):
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            pass
+    return False
+
+def _get(q, stop):
+    while not stop.is_set():
+        try:
+            return q.get(timeout=0.1)
+        except queue.Empty:
+            pass
+    return _DONE
+
+def _crawl(url, all_pages, size, chunks, entries, workers, stop):
+    seen = set()
+    try:
+        while url:
+            site = mrtools.fetch(url)
+            mrnumbers = [n for n in mrtools.msn_to_mrnumbers(site)
+                         if n not in seen]
+            seen.update(mrnumbers)
+            for i in range(0, len(mrnumbers), size):
+                if not _put(chunks, mrnumbers[i:i + size], stop):
+                    return
+            link = mrtools.next_link(site) if all_pages else None
+            # Links on MathSciNet are relative
+            url = mrtools.BASE_URL % link if link else None
+    except Exception as err:
+        _put(entries, err, stop)
+    finally:
+        for _ in range(workers):
+            _put(chunks, _DONE, stop)
+
+def _fetch(chunks, entries, stop):
+    try:
+        while True:
+            chunk = _get(chunks, stop)
+            if chunk is _DONE:
+                return
+            bib = mrtools.get_bibtex_from_msn(chunk)
+            if bib is not None:
+                bib = msnbib_load_list(io.StringIO(bib))
+            if not _put(entries, (chunk, bib), stop):
+                return
+    except Exception as err:
+        _put(entries, err, stop)
+    finally:
+        _put(entries, _DONE, stop)
+
+def pipeline(url, target=None, keys=('normauthor', 'year', 'normtitle'),
+             union=True, keep_key=False, all_pages=True, size=20, workers=4,
+             queue_size=16):
+    """ Merges the BibTeX entries of a MathSciNet search into a bibliography
+
+    The merge follows the rules of :func:`Bibliography.merge` with
+    ``target`` as the left bibliography, ``target`` itself is not changed.
+    Entries are merged in the order their BibTeX arrives, so entries sharing
+    a merge key are merged into the first one of them.
+
+    Args:
+        url (str):
+            URL pointing to a search page on MathSciNet
+        target (Optional[Bibliography]):
+            the bibliography the entries are merged into
+        keys (Optional[List[str]]):
+            names of the fields forming the merge key, see :func:`make_key`
+        union (Optional[bool]):
+            Do you want to add entries that are not in ``target``?
+        keep_key (Optional[bool]):
+            Do you want to keep the merge key?
+        all_pages (Optional[bool]):
+            Do you want to crawl the succeeding pages as well?
+        size (Optional[int]):
+            number of MR-numbers per request
+        workers (Optional[int]):
+            number of parallel requests for BibTeX
+        queue_size (Optional[int]):
+            maximal number of chunks waiting in each queue
+
+    Returns:
+        Bibliography: the merged bibliography
+
+    Raises:
+        RuntimeError:
+            if the merge keys of ``target`` are not unique, before anything
+            is requested
+        PipelineError:
+            if MathSciNet did not return BibTeX for some MR-numbers
+    """
+    key = Bibliography.MERGEKEY
+    spec = KeySpec(*keys)
+    data = copy.deepcopy(target.data) if target else []
+    by_key = spec.index(data)
+    for k, entry in by_key.items():
+        entry[key] = k
+
+    chunks = queue.Queue(queue_size)
+    entries = queue.Queue(queue_size)
+    stop = threading.Event()
+
+    crawler = threading.Thread(target=_crawl,
+                               args=(url, all_pages, size, chunks, entries,
+                                     workers, stop))
+    fetchers = [threading.Thread(target=_fetch,
+                                 args=(chunks, entries, stop))
+                for _ in range(workers)]
+    for thread in [crawler] + fetchers:
+        thread.daemon = True
+        thread.start()
+
+    failed = []
+    running = workers
+    try:
+        while running:
+            item = entries.get()
+            if item is _DONE:
+                running -= 1
+                continue
+            if isinstance(item, BaseException):
+                raise item
+            chunk, new = item
+            if new is None:
+                failed.append(chunk)
+                continue
+            for entry in new:
+                entry[key] = spec(entry)
+                old = by_key.get(entry[key])
+                if old is not None:
+                    # Fields of the target take precedence
+                    for field, value in entry.items():
+                        old.setdefault(field, value)
+                elif union:
+                    by_key[entry[key]] = entry
+                    data.append(entry)
+    finally:
+        stop.set()
+
+    bib = Bibliography(data)
+    if not keep_key:
+        bib.del_fields(key)
+
+    if failed:
+        raise PipelineError(bib, failed)
+    return bib
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod(optionflags=doctest.NORMALIZE_WHITESPACE)
@@ -90,15 +90,137 @@ the field "url" from the second database is present.
 
 """
 
+import bisect
+import collections
 import copy
-import yaml
-
-import bibtexparser
-from bibtexparser.bwriter import BibTexWriter
-from bibtexparser.bibdatabase import BibDatabase
+import hashlib
+import io
+import json
+import re
 
 from . import normalizetex
 
+class BibTexDumper(object):
+    """ Reusable writer turning entries into BibTeX
+
+    The output is the same as the one of :class:`BibTexWriter` from
+    ``bibtexparser`` with the same settings. The order of the fields is
+    computed once per set of field names and reused for all entries sharing
+    it. Entries are written one by one, so :func:`dump` can be used for
+    writing chunks of large data straight to a file.
+
+    Args:
+        display_order (Optional[List[str]]):
+            fields written first and in this order. All other fields follow
+            in alphabetical order.
+        preserve_order (Optional[bool]):
+            Do you want to write the entries in the given order? Otherwise
+            they are sorted by their ID. Defaults to ``False``
+        indent (Optional[str]):
+            indentation of the fields
+
+    Example:
+        >>> data = [{'ENTRYTYPE': 'book', 'ID': 'b', 'year': '2016',
+        ...          'title': 'Rigidity'},
+        ...         {'ENTRYTYPE': 'article', 'ID': 'a', 'title': 'Forcing'}]
+        >>> dumper = BibTexDumper(display_order=['title'],
+        ...                       preserve_order=True)
+        >>> print(dumper.dumps(data))
+        @book{b,
+         title = {Rigidity},
+         year = {2016}
+        }
+        <BLANKLINE>
+        @article{a,
+         title = {Forcing}
+        }
+    """
+
+    def __init__(self, display_order=None, preserve_order=False, indent=' '):
+        self.display_order = list(display_order or [])
+        self.preserve_order = preserve_order
+        self.indent = indent
+        self._orders = {}
+
+    def field_order(self, entry):
+        """ Returns the fields of an entry in the order they are written
+
+        Args:
+            entry (dict): bibliographic entry
+
+        Returns:
+            List[str]: names of the fields excluding "ENTRYTYPE" and "ID"
+        """
+        fields = tuple(entry)
+        try:
+            return self._orders[fields]
+        except KeyError:
+            pass
+
+        order = [f for f in self.display_order if f in entry]
+        order += sorted(f for f in entry if f not in self.display_order)
+        order = [f for f in order if f not in ('ENTRYTYPE', 'ID')]
+        self._orders[fields] = order
+        return order
+
+    def entry_to_bibtex(self, entry):
+        """ Turns a single entry into BibTeX
+
+        Args:
+            entry (dict): bibliographic entry
+
+        Returns:
+            str: BibTeX representation of the entry
+
+        Raises:
+            TypeError: if a value is not a string
+        """
+        entry = materialize(entry)
+        lines = ['@%s{%s' % (entry['ENTRYTYPE'], entry['ID'])]
+        for field in self.field_order(entry):
+            value = entry[field]
+            if not isinstance(value, str):
+                raise TypeError('The field %s in entry %s must be a string'
+                                % (field, entry['ID']))
+            lines.append('%s%s = {%s}' % (self.indent, field, value))
+        return ',\n'.join(lines) + '\n}\n'
+
+    def sort(self, data):
+        """ Orders the entries as they are written
+
+        Args:
+            data (List[dict]): bibliographic entries
+
+        Returns:
+            List[dict]: ``data`` itself or a sorted copy of it
+        """
+        if self.preserve_order:
+            return data
+        return sorted(data, key=lambda e: str(e.get('ID', '')).lower())
+
+    def dump(self, data, handle):
+        """ Writes entries as BibTeX to handle
+
+        Args:
+            data (List[dict]):  data to be written
+            handle (handle):    handle the data is written to
+        """
+        for i, entry in enumerate(self.sort(data)):
+            if i:
+                handle.write('\n')
+            handle.write(self.entry_to_bibtex(entry))
+
+    def dumps(self, data):
+        """ Turns entries into a BibTeX string
+
+        Args:
+            data (List[dict]): data to be transformed
+
+        Returns:
+            str: BibTeX representation of data
+        """
+        return '\n'.join(map(self.entry_to_bibtex, self.sort(data)))
+
 def bibtex_dump(data):
     r""" Turns dict into BibTex string
     Args:
@@ -131,11 +253,13 @@ def bibtex_dump(data):
          volume = {80},
          year = {2015}
         }
+
+    Attributes:
+        DUMPER (BibTexDumper):
+            writer shared by all calls
     """
-    db = BibDatabase()
-    db.entries = data
-    writer = BibTexWriter()
-    return writer.write(db)
+    return bibtex_dump.DUMPER.dumps(data)
+bibtex_dump.DUMPER = BibTexDumper()
 
 def bibtex_load_list(handle):
     """ Loads bibtex data from handle
@@ -144,6 +268,7 @@ def bibtex_load_list(handle):
     Returns:
         List[dict]: entry list of bibliography
     """
+    import bibtexparser
     entry_list = bibtexparser.load(handle).get_entry_list()
 
     for entry in entry_list:
@@ -154,18 +279,578 @@ def bibtex_load_list(handle):
 
     return entry_list
 
+def yaml_load(handle):
+    """ Loads YAML data from handle
+
+    Args:
+        handle (handle): file handle of bibliography
+
+    Returns:
+        List[dict]: entry list of bibliography
+    """
+    import yaml
+    return yaml.load(handle)
+
+def yaml_dump(data):
+    """ Dumps bibliographic data as YAML
+
+    Args:
+        data (List[dict]): entry list of bibliography
+
+    Returns:
+        str: YAML representation of ``data``
+    """
+    import yaml
+    return yaml.dump([materialize(e) for e in data])
+
+def jsonl_load(handle):
+    """ Loads data with one JSON object per line from handle
+
+    Args:
+        handle (handle): file handle of bibliography
+
+    Returns:
+        List[dict]: entry list of bibliography
+    """
+    return [json.loads(line) for line in handle if line.strip()]
+
+def jsonl_dump(data):
+    """ Dumps bibliographic data with one JSON object per line
+
+    Args:
+        data (List[dict]): entry list of bibliography
+
+    Returns:
+        str: JSON lines representation of ``data``
+
+    Example:
+        >>> print(jsonl_dump([{'ENTRYTYPE': 'article', 'ID': 'a1'}]))
+        {"ENTRYTYPE": "article", "ID": "a1"}
+        <BLANKLINE>
+    """
+    return ''.join(json.dumps(materialize(e), ensure_ascii=False) + '\n'
+                   for e in data)
+
+def split_bibtex(handle):
+    """ Splits a BibTeX file into the source code of its top-level items
+
+    A new item starts at every line beginning with "@" outside of braces.
+    Text in front of the first item is dropped.
+
+    Args:
+        handle (handle): file handle of bibliography
+
+    Yields:
+        str: source code of an item
+
+    Example:
+        >>> import io
+        >>> bib = io.StringIO('''% comment
+        ... @article{a, title = {A
+        ...     @ B}}
+        ... @book{b}
+        ... ''')
+        >>> list(split_bibtex(bib))
+        ['@article{a, title = {A\\n    @ B}}\\n', '@book{b}\\n']
+    """
+    chunk = []
+    depth = 0
+    for line in handle:
+        if depth <= 0 and line.lstrip().startswith('@'):
+            if chunk:
+                yield ''.join(chunk)
+            chunk = []
+            depth = 0
+        if chunk or line.lstrip().startswith('@'):
+            chunk.append(line)
+            depth += line.count('{') - line.count('}')
+    if chunk:
+        yield ''.join(chunk)
+
+def msnbib_load_list(handle):
+    """ Loads BibTeX data exported from MathSciNet from handle
+
+    Entries in the layout used by MathSciNet, i.e., one field with an
+    uppercase name and a braced value per line, are read by a fast
+    tokenizer. All other items are passed to the general parser, so the
+    result is the same as the one of :func:`bibtex_load_list`. This includes
+    entries without fields, entries containing tabs, which the general
+    parser expands, and values written as ``{{}}``.
+
+    Args:
+        handle (handle): file handle of bibliography
+
+    Returns:
+        List[dict]: entry list of bibliography
+
+    Example:
+        >>> import io
+        >>> bib = io.StringIO('''@article {MR0241312,
+        ...     AUTHOR = {Shelah, Saharon},
+        ...      TITLE = {Note on a min-max problem of {L}eo {M}oser},
+        ...       YEAR = {1969},
+        ... }
+        ... @book{test, title = {Irregular}}
+        ... ''')
+        >>> msnbib_load_list(bib) == [
+        ...     {'ENTRYTYPE': 'article', 'ID': 'MR0241312',
+        ...      'author': 'Shelah, Saharon', 'year': '1969',
+        ...      'title': 'Note on a min-max problem of {L}eo {M}oser'},
+        ...     {'ENTRYTYPE': 'book', 'ID': 'test', 'title': 'Irregular'}]
+        True
+    """
+    text = handle.read()
+    if '@string' in text.lower():
+        # String definitions affect all following entries
+        return bibtex_load_list(io.StringIO(text))
+
+    entry_list = []
+    irregular = []
+    for chunk in split_bibtex(io.StringIO(text)):
+        entry = _msnbib_entry(chunk)
+        if entry is None:
+            irregular.append(chunk)
+            continue
+        if irregular:
+            irregular = io.StringIO(''.join(irregular))
+            entry_list.extend(bibtex_load_list(irregular))
+            irregular = []
+        entry_list.append(entry)
+    if irregular:
+        entry_list.extend(bibtex_load_list(io.StringIO(''.join(irregular))))
+
+    return entry_list
+
+def _msnbib_entry(chunk):
+    if '\t' in chunk:
+        return None
+    lines = chunk.splitlines()
+    head = _msnbib_entry.HEAD.match(lines[0])
+    if not head or head.group(1).lower() not in _msnbib_entry.TYPES:
+        return None
+
+    fields = []
+    for i, line in enumerate(lines[1:], 1):
+        field = _msnbib_entry.FIELD.match(line)
+        if field:
+            name, value = field.groups()
+            if value == '{}' or not _balanced(value):
+                return None
+            fields.append((name.lower(), value))
+        elif _msnbib_entry.END.match(line):
+            if any(l.strip() for l in lines[i + 1:]):
+                return None
+            break
+        else:
+            return None
+    else:
+        return None
+
+    names = [name for name, _ in fields]
+    if not names or len(names) > len(set(names)):
+        return None
+
+    # Same order of the fields as produced by bibtexparser
+    entry = dict(reversed(fields))
+    entry['ENTRYTYPE'] = head.group(1).lower()
+    entry['ID'] = head.group(2)
+    if Bibliography.MERGEKEY.lower() in entry:
+        entry[Bibliography.MERGEKEY] = entry.pop(Bibliography.MERGEKEY.lower())
+    return entry
+_msnbib_entry.HEAD = re.compile(r'@(\w+)\s*\{\s*([^,\s{}]+)\s*,\s*$')
+_msnbib_entry.FIELD = re.compile(r'\s*([A-Z]+)\s*=\s*\{(.*)\},?\s*$')
+_msnbib_entry.END = re.compile(r'\s*\}\s*$')
+_msnbib_entry.TYPES = {'article', 'book', 'booklet', 'conference', 'inbook',
+                       'incollection', 'inproceedings', 'manual',
+                       'mastersthesis', 'misc', 'phdthesis', 'proceedings',
+                       'techreport', 'unpublished'}
+
+def _balanced(value):
+    depth = 0
+    for char in value:
+        if char == '{':
+            depth += 1
+        elif char == '}':
+            depth -= 1
+            if depth < 0:
+                return False
+    return depth == 0
+
+def entry_hash(entry):
+    """ Computes a content hash of an entry
+
+    The hash does not depend on the order of the fields.
+
+    Args:
+        entry (dict): bibliographic entry
+
+    Returns:
+        str: hexadecimal SHA-1 digest of the canonicalized entry
+
+    Example:
+        >>> e1 = {'ENTRYTYPE': 'article', 'ID': 'test', 'year': '2016'}
+        >>> e2 = {'year': '2016', 'ID': 'test', 'ENTRYTYPE': 'article'}
+        >>> entry_hash(e1) == entry_hash(e2)
+        True
+        >>> entry_hash(e1) == entry_hash(dict(e1, year='2017'))
+        False
+    """
+    canon = json.dumps(materialize(entry), sort_keys=True,
+                       ensure_ascii=False)
+    return hashlib.sha1(canon.encode('utf-8')).hexdigest()
+
+def author_tokens(entry):
+    """ Splits the normalized author field of an entry into last names
+
+    Args:
+        entry (dict): bibliographic entry
+
+    Returns:
+        Set[str]: normalized last names, empty if there is no author field
+
+    Example:
+        >>> sorted(author_tokens({'author': 'Sageev, G. and Shelah, S.'}))
+        ['Sageev', 'Shelah']
+    """
+    try:
+        return set(normalizetex.norm_author(entry).split())
+    except KeyError:
+        return set()
+
+def sort_value(value):
+    """ Makes field values comparable in ranges
+
+    Numbers are compared as numbers and precede all other values, which are
+    compared as strings.
+
+    Args:
+        value (str): value of a field
+
+    Returns:
+        tuple: comparable value
+
+    Example:
+        >>> sorted(['10', '9', 'xi'], key=sort_value)
+        ['9', '10', 'xi']
+    """
+    value = value.strip()
+    if value.isdigit():
+        return (0, int(value), '')
+    return (1, 0, value)
+
+def match(entry, **criteria):
+    """ Checks whether an entry meets criteria of :func:`Bibliography.select`
+
+    Args:
+        entry (dict):                bibliographic entry
+        criteria (Dict[str, Any]):   see :func:`Bibliography.select`
+
+    Returns:
+        bool: ``True`` if the entry meets all criteria
+
+    Example:
+        >>> entry = {'author': 'Shelah, Saharon', 'year': '1981'}
+        >>> match(entry, normauthor='Shelah', year=('1980', None))
+        True
+        >>> match(entry, year='1980')
+        False
+    """
+    for field, value in criteria.items():
+        if field == 'normauthor':
+            wanted = author_tokens({'author': value})
+            if not wanted <= author_tokens(entry):
+                return False
+        elif isinstance(value, tuple):
+            if field not in entry:
+                return False
+            low, high = value
+            v = sort_value(entry[field])
+            if low is not None and v < sort_value(low):
+                return False
+            if high is not None and v > sort_value(high):
+                return False
+        elif entry.get(field) != value:
+            return False
+    return True
+
+class LazyEntry(dict):
+    """ Bibliographic entry with computed fields
+
+    A computed field is evaluated when it is first looked up, by indexing,
+    :func:`get` or ``in``, and stored in the entry afterwards. Until then
+    the entry behaves like a plain ``dict`` without the field, so iterating
+    over it, comparing or copying it only sees the fields evaluated so far.
+    :func:`materialize` evaluates the remaining ones, as the writers do.
+
+    A computed field raising ``KeyError``, for example since the entry has
+    no author, is treated as missing.
+
+    Args:
+        data (dict):                        fields of the entry
+        computed (Dict[str, function]):
+            unary functions computing fields from the entry by name
+
+    Example:
+        >>> entry = LazyEntry({'ID': 'a', 'author': 'Shelah, S.'},
+        ...                   {'normauthor': normalizetex.norm_author,
+        ...                    'normtitle': normalizetex.norm_title})
+        >>> entry
+        {'ID': 'a', 'author': 'Shelah, S.'}
+        >>> entry['normauthor']
+        'Shelah'
+        >>> 'normtitle' in entry
+        False
+        >>> entry.materialize()
+        {'ID': 'a', 'author': 'Shelah, S.', 'normauthor': 'Shelah'}
+    """
+
+    __slots__ = ('computed',)
+
+    def __init__(self, data, computed):
+        dict.__init__(self, data)
+        self.computed = computed
+
+    def __missing__(self, field):
+        func = self.computed.get(field)
+        if func is None:
+            raise KeyError(field)
+        try:
+            value = func(self)
+        except KeyError:
+            raise KeyError(field)
+        self[field] = value
+        return value
+
+    def __contains__(self, field):
+        try:
+            self[field]
+        except KeyError:
+            return False
+        return True
+
+    def get(self, field, default=None):
+        try:
+            return self[field]
+        except KeyError:
+            return default
+
+    def pop(self, field, *default):
+        if field in self.computed: # copies, since entries share computed
+            self.computed = {k: f for k, f in self.computed.items()
+                             if k != field}
+        return dict.pop(self, field, *default)
+
+    def materialize(self):
+        """ Evaluates all computed fields
+
+        Returns:
+            dict: plain copy of the entry
+        """
+        for field in self.computed:
+            self.get(field)
+        return dict(self)
+
+def materialize(entry):
+    """ Turns an entry into a plain ``dict`` containing all its fields
+
+    Args:
+        entry (dict): bibliographic entry, possibly a :class:`LazyEntry`
+
+    Returns:
+        dict: ``entry`` itself or a materialized copy of it
+    """
+    if isinstance(entry, LazyEntry):
+        return entry.materialize()
+    return entry
+
+class KeySpec(object):
+    """ Specification of a merge key
+
+    The key of an entry is formed out of the values of the named fields as
+    in :func:`listb.normalizetex.make_key`. Fields in :attr:`DERIVED` are
+    always computed on the fly, without storing them in the entry. Values of
+    these fields stored in the entry, e.g. read with it or added by
+    :func:`Bibliography.add_fields`, are never used, since they may be
+    stale. Missing fields are treated as empty strings.
+
+    Args:
+        fields (List[str]): names of the fields forming the key
+
+    Example:
+        >>> spec = KeySpec('normauthor', 'year')
+        >>> entry = {'author': 'Sageev, G. and Shelah, S.', 'year': '1981'}
+        >>> spec(entry)
+        'Sageev Shelah-1981'
+        >>> sorted(entry)
+        ['author', 'year']
+        >>> spec(dict(entry, normauthor='Stale'))
+        'Sageev Shelah-1981'
+    """
+
+    DERIVED = {'normauthor': normalizetex.norm_author,
+               'normtitle': normalizetex.norm_title
+              }
+    """ Fields computed from the entry if they are named in the key
+    """
+
+    def __init__(self, *fields):
+        self.fields = fields
+
+    def __call__(self, entry):
+        return '-'.join(self.values(entry))
+
+    def values(self, entry):
+        """ Returns the values forming the key of an entry
+
+        Args:
+            entry (dict): bibliographic entry
+
+        Returns:
+            List[str]: values of the fields, empty for missing fields
+
+        Example:
+            >>> KeySpec('normauthor', 'year').values({'year': '1981'})
+            ['', '1981']
+        """
+        values = []
+        for field in self.fields:
+            if field in self.DERIVED:
+                try:
+                    values.append(self.DERIVED[field](entry))
+                except KeyError:
+                    values.append('')
+            else:
+                values.append(entry.get(field, ''))
+        return values
+
+    def __repr__(self):
+        return 'KeySpec(%s)' % ', '.join(map(repr, self.fields))
+
+    def index(self, entries):
+        """ Computes the keys of entries in a single pass
+
+        Args:
+            entries (Iterable[dict]):   bibliographic entries
+
+        Returns:
+            Dict[str, dict]: entries by their keys
+
+        Raises:
+            RuntimeError: if the keys are not unique
+
+        Example:
+            >>> KeySpec('year').index([{'ID': 'a', 'year': '1981'}])
+            {'1981': {'ID': 'a', 'year': '1981'}}
+        """
+        entries = list(entries)
+        keys = [self(e) for e in entries]
+        by_key = dict(zip(keys, entries))
+        if len(by_key) < len(keys):
+            counts = collections.Counter(keys)
+            duplicates = [(k, e['ID']) for k, e in zip(keys, entries)
+                          if counts[k] > 1]
+            raise RuntimeError('The following merge keys (key, ID)'
+                               'are duplicates: %s' % duplicates)
+        return by_key
+
+def field_changes(old, new):
+    """ Compares the fields of two versions of an entry
+
+    Args:
+        old (dict):     previous version of the entry
+        new (dict):     current version of the entry
+
+    Returns:
+        Dict[str, (str, str)]:
+            previous and current values of the fields that differ, ``None``
+            stands for a missing field
+
+    Example:
+        >>> field_changes({'ID': 'a', 'year': '1981', 'note': 'x'},
+        ...               {'ID': 'a', 'year': '1982', 'url': 'y'})
+        {'year': ('1981', '1982'), 'note': ('x', None), 'url': (None, 'y')}
+    """
+    fields = list(old) + [f for f in new if f not in old]
+    return {f: (old.get(f), new.get(f)) for f in fields
+            if old.get(f) != new.get(f)}
+
+def diff_entries(old, new, key='ID'):
+    """ Compares two versions of a bibliography entry by entry
+
+    The entries of ``old`` are indexed by their keys, the entries of ``new``
+    are streamed and looked up in the index. Hence only ``old`` is held in
+    memory and the differences are reported in a single pass over ``new``.
+    The order of the fields does not matter.
+
+    Args:
+        old (Iterable[dict]):
+            entries of the previous version
+        new (Iterable[dict]):
+            entries of the current version
+        key (Optional[str or KeySpec]):
+            name of the field identifying the entries or specification of
+            the key, defaults to "ID"
+
+    Yields:
+        dict:
+            change of an entry, with the items "change" (one of "added",
+            "removed" or "changed") and "key". Added and removed entries
+            come with the item "entry", changed ones with the item
+            "fields" (see :func:`field_changes`). Added and changed
+            entries are reported in the order of ``new``, the removed ones
+            at the end.
+
+    Raises:
+        RuntimeError: if the keys of a version are not unique
+
+    Example:
+        >>> old = [{'ENTRYTYPE': 'article', 'ID': 'a', 'year': '1981'},
+        ...        {'ENTRYTYPE': 'article', 'ID': 'b'}]
+        >>> new = [{'year': '1982', 'ID': 'a', 'ENTRYTYPE': 'article'},
+        ...        {'ENTRYTYPE': 'book', 'ID': 'c'}]
+        >>> for change in diff_entries(old, new):
+        ...     print(change)
+        {'change': 'changed', 'key': 'a', 'fields': {'year': ('1981',
+        '1982')}}
+        {'change': 'added', 'key': 'c', 'entry': {'ENTRYTYPE': 'book',
+        'ID': 'c'}}
+        {'change': 'removed', 'key': 'b', 'entry': {'ENTRYTYPE': 'article',
+        'ID': 'b'}}
+    """
+    if not isinstance(key, KeySpec):
+        key = KeySpec(key)
+    remaining = key.index(old)
+    seen = set()
+    for entry in new:
+        k = key(entry)
+        if k in seen:
+            raise RuntimeError('The key %r of the entry %s is a duplicate.'
+                               % (k, entry['ID']))
+        seen.add(k)
+        previous = remaining.pop(k, None)
+        if previous is None:
+            yield {'change': 'added', 'key': k, 'entry': entry}
+        elif previous != entry:
+            yield {'change': 'changed', 'key': k,
+                   'fields': field_changes(previous, entry)}
+    for k, entry in remaining.items():
+        yield {'change': 'removed', 'key': k, 'entry': entry}
+
 class Bibliography(object):
     """ Class for handling bibliographic data
     """
 
     READERS = {'bib': bibtex_load_list,
-               'yaml': yaml.load
+               'jsonl': jsonl_load,
+               'msnbib': msnbib_load_list,
+               'yaml': yaml_load
               }
     """ Supported readers
     """
 
     WRITERS = {'bib': bibtex_dump,
-               'yaml': yaml.dump
+               'jsonl': jsonl_dump,
+               'yaml': yaml_dump
               }
     """ Supported writers
     """
@@ -179,6 +864,7 @@ class Bibliography(object):
         if not data:
             data = []
         self._data = None
+        self._indexes = {}
         self.data = data
 
     @property
@@ -226,6 +912,7 @@ class Bibliography(object):
             raise RuntimeError('Your bibliography contains duplicate '
                                'ID-s.')
         self._data = data
+        self._indexes = {}
 
     @data.deleter
     def data(self):
@@ -329,9 +1016,9 @@ class Bibliography(object):
         other.make_key('ID')
         return self.merge(other, union=True)
 
-    def merge(self, other, union=True, keep_key=False):
+    def merge(self, other, union=True, keep_key=False, key=None):
         """ Merges two bibliographies using the merge key in field
-        :attr:`MERGEKEY`
+        :attr:`MERGEKEY` or the one given by a :class:`KeySpec`
 
         Args:
             other (Bibliography):
@@ -343,40 +1030,166 @@ class Bibliography(object):
                 in it will be ignored. Defaults to ``True``
             keep_key (Optional[bool]):
                 Do you want to keep the merge key? Defaults to ``False``
+            key (Optional[KeySpec]):
+                computes the merge keys on the fly instead of reading
+                them from the field :attr:`MERGEKEY`, so neither
+                bibliography needs :func:`make_key` before
 
         Returns:
             Bibliography:
                 Bibliography containing the merged dataset
+
+        Raises:
+            RuntimeError: if ``key`` is given and the keys of one of the
+                bibliographies are not unique
+
+        Example:
+            >>> bib1 = Bibliography([{'ENTRYTYPE': 'article', 'ID': 'a',
+            ...                       'author': 'Shelah, S.'}])
+            >>> bib2 = Bibliography([{'ENTRYTYPE': 'article', 'ID': 'b',
+            ...                       'author': 'S. Shelah', 'url': 'x'}])
+            >>> bib1.merge(bib2, key=KeySpec('normauthor')).data
+            [{'ENTRYTYPE': 'article', 'ID': 'a', 'author': 'Shelah, S.',
+            'url': 'x'}]
         """
-        self_by_key = {e[self.MERGEKEY]: e for e in self}
-        other_by_key = {e[self.MERGEKEY]: e for e in other}
+        if key is None:
+            self_by_key = {e[self.MERGEKEY]: e for e in self}
+            other_by_key = {e[self.MERGEKEY]: e for e in other}
+        else:
+            self_by_key = key.index(self)
+            other_by_key = key.index(other)
         joined = copy.deepcopy(self_by_key)
 
         if union:
             joined.update(other_by_key)
             # Creates the union of both keys
 
-        for key, entry in joined.items():
-            if key in other_by_key:
-                entry.update(other_by_key[key])
-            if key in self_by_key:
-                entry.update(self_by_key[key])
+        for k, entry in joined.items():
+            if k in other_by_key:
+                entry.update(other_by_key[k])
+            if k in self_by_key:
+                entry.update(self_by_key[k])
 
-        bib = Bibliography(list(joined.values()))
+        if key is not None and keep_key:
+            # joined shares entries with other, copies keep computed fields
+            data = []
+            for k, e in joined.items():
+                e = copy.copy(e)
+                e[self.MERGEKEY] = k
+                data.append(e)
+            bib = Bibliography(data)
+        else:
+            bib = Bibliography(list(joined.values()))
 
         if not keep_key:
             bib.del_fields(self.MERGEKEY)
 
         return bib
 
-    def add_fields(self, **kargs):
+    def diff(self, other, key='ID'):
+        """ Compares this bibliography to a newer version of it
+
+        See :func:`diff_entries`.
+
+        Args:
+            other (Bibliography):
+                the newer version
+            key (Optional[str or KeySpec]):
+                name of the field identifying the entries or specification
+                of the key, defaults to "ID"
+
+        Yields:
+            dict: change of an entry
+
+        Raises:
+            RuntimeError: if the keys of a version are not unique
+
+        Example:
+            >>> old = Bibliography([{'ENTRYTYPE': 'article', 'ID': 'a'}])
+            >>> new = Bibliography([{'ENTRYTYPE': 'article', 'ID': 'a',
+            ...                      'year': '1981'}])
+            >>> list(old.diff(new))
+            [{'change': 'changed', 'key': 'a', 'fields': {'year': (None,
+            '1981')}}]
+        """
+        return diff_entries(self, other, key=key)
+
+    def dedupe(self, key='ID'):
+        """ Collapses entries with equal keys
+
+        The entries are grouped by their keys in a single pass. Each group
+        is collapsed into its first entry, the fields of the later entries
+        only fill in missing fields. This is the precedence of
+        :func:`merge`, where the left bibliography wins. Entries with a
+        missing or empty field of the key are never collapsed.
+
+        Args:
+            key (Optional[str or KeySpec]):
+                name of the field identifying duplicates or specification
+                of the key, defaults to "ID"
+
+        Returns:
+            (Bibliography, List[(str, str, List[str])]):
+                the bibliography without duplicates, in the order of the
+                first entries of the groups, and the key, the kept ID and
+                the ID-s of the collapsed entries for each group of
+                duplicates
+
+        Example:
+            >>> bib = Bibliography([
+            ...     {'ENTRYTYPE': 'article', 'ID': 'a', 'author': 'Shelah'},
+            ...     {'ENTRYTYPE': 'book', 'ID': 'b', 'author': 'S. Shelah',
+            ...      'year': '1981'},
+            ...     {'ENTRYTYPE': 'article', 'ID': 'c', 'author': 'Baldwin'},
+            ...     {'ENTRYTYPE': 'misc', 'ID': 'd'}])
+            >>> deduped, report = bib.dedupe(KeySpec('normauthor'))
+            >>> deduped.data
+            [{'ENTRYTYPE': 'article', 'ID': 'a', 'author': 'Shelah',
+            'year': '1981'}, {'ENTRYTYPE': 'article', 'ID': 'c',
+            'author': 'Baldwin'}, {'ENTRYTYPE': 'misc', 'ID': 'd'}]
+            >>> report
+            [('Shelah', 'a', ['b'])]
+        """
+        if not isinstance(key, KeySpec):
+            key = KeySpec(key)
+        groups = {}
+        for entry in self:
+            values = key.values(entry)
+            # entries with incomplete keys get a group of their own
+            k = '-'.join(values) if all(values) else object()
+            groups.setdefault(k, []).append(entry)
+
+        data = []
+        report = []
+        for k, group in groups.items():
+            entry = copy.deepcopy(group[0])
+            for other in group[1:]:
+                for field, value in other.items():
+                    if field not in entry:
+                        entry[field] = copy.deepcopy(value)
+            if len(group) > 1:
+                report.append((k, entry['ID'], [e['ID'] for e in group[1:]]))
+            data.append(entry)
+        return Bibliography(data), report
+
+    def add_fields(self, lazy=False, **kargs):
         """ Adds fields to bibliography
         For each entry of ``kargs`` a field corresponding to the key
         of the entry is added. The value of the entry must be a
         unary function accepting an entry of the bibliography as its
         argument.
 
+        With ``lazy`` the entries are replaced by :class:`LazyEntry` objects
+        computing the fields when they are first looked up. Fields of
+        entries dropped before, e.g. by :func:`select` or
+        ``merge(union=False)``, are never computed. The writers compute the
+        remaining fields when the entries are serialized. In both modes,
+        :class:`KeySpec` does not read the fields it derives itself.
+
         Args:
+            lazy (Optional[bool]):
+                Do you want to compute the fields on first access?
+                Defaults to ``False``
             kargs (Dict[str, function]):
                 Dictionary of field names and construction functions
 
@@ -403,7 +1216,22 @@ class Bibliography(object):
             >>> [e['doubleauthor'] for e in bib]
             ['Sageev, G. and Shelah, S.Sageev, G. and Shelah, S.',
             'Shelah, SaharonShelah, Saharon']
+            >>> bib.add_fields(lazy=True, normtitle=normalizetex.norm_title)
+            >>> 'normtitle' in bib.data[0].keys()
+            False
+            >>> bib.data[0]['normtitle']
+            'weakcompactnessandthestructure'
         """
+        self._indexes.clear()
+        if lazy:
+            for i, entry in enumerate(self.data):
+                for key in kargs:
+                    dict.pop(entry, key, None) # recomputed by the new function
+                if isinstance(entry, LazyEntry):
+                    entry.computed = dict(entry.computed, **kargs)
+                else:
+                    self.data[i] = LazyEntry(entry, kargs)
+            return
         for key, func in kargs.items():
             for entry in self:
                 entry.update({key: func(entry)})
@@ -437,15 +1265,19 @@ class Bibliography(object):
             'incollection', 'ID': 'MR645920'}, {'author': 'Shelah, Saharon',
             'ENTRYTYPE': 'article', 'ID': 'MR636904'}]
         """
+        self._indexes.clear()
         for e in self:
             for k in fields:
-                if k in e.keys():
-                    del e[k]
+                e.pop(k, None)
 
     def make_key(self, *keys):
         """ Creates a merge key formed out of the fields specified
         in ``keys``
 
+        The key is computed by :class:`KeySpec`, so derived fields like
+        ``normauthor`` need not be added to the entries before. Stored
+        values of these fields are not read, they are always recomputed.
+
         Args:
             keys (List[str]): List of field names
 
@@ -479,16 +1311,115 @@ class Bibliography(object):
             >>> bib.make_key('author', 'year')
             >>> [e['KEY'] for e in bib]
             ['Sageev, G. and Shelah, S.-1981', 'Shelah, Saharon-1981']
+            >>> bib.make_key('normauthor', 'year')
+            >>> [e['KEY'] for e in bib]
+            ['Sageev Shelah-1981', 'Shelah-1981']
         """
-        func = lambda r: normalizetex.make_key(r, *keys)
-        self.add_fields(**{self.MERGEKEY: func})
-        keys = [e[self.MERGEKEY] for e in self]
-        ids = [e['ID'] for e in self]
-        duplicates = [(k, i) for k, i in zip(keys, ids) if keys.count(k) > 1]
+        self._indexes.clear()
+        for key, entry in KeySpec(*keys).index(self).items():
+            entry[self.MERGEKEY] = key
 
-        if duplicates:
-            raise RuntimeError('The following merge keys (key, ID)'
-                               'are duplicates: %s' % duplicates)
+    def select(self, **criteria):
+        """ Selects the entries meeting all criteria
+
+        Each keyword names a field and gives one of the following criteria
+
+        * a string: the field must have this value,
+        * a tuple ``(low, high)``: the value of the field must be in this
+          range including its bounds, where ``None`` means unbounded. Numbers
+          are compared as numbers (see :func:`sort_value`),
+        * for the keyword ``normauthor`` a string of names: all of these
+          last names must be among the normalized authors of the entry (see
+          :func:`listb.normalizetex.norm_author`).
+
+        The queries are answered using indexes of the fields, that are built
+        when they are needed for the first time and reused by later queries.
+        The indexes are dropped whenever the bibliography is changed through
+        its methods. After changing entries directly, call
+        :func:`drop_indexes`.
+
+        Args:
+            criteria (Dict[str, Any]): criteria as described above
+
+        Returns:
+            Bibliography:
+                the matching entries in their order in this bibliography.
+                The entries are not copied.
+
+        Example:
+            >>> data = [{'year': '1981',
+            ...          'author': 'Sageev, G. and Shelah, S.',
+            ...          'ENTRYTYPE': 'incollection',
+            ...          'ID': 'MR645920'
+            ...         },
+            ...         {'year': '1995',
+            ...          'journal': 'J. Symb. Log.',
+            ...          'author': 'Shelah, Saharon',
+            ...          'ENTRYTYPE': 'article',
+            ...          'ID': 'MR1324511'
+            ...         }
+            ...        ]
+            >>> bib = Bibliography(data)
+            >>> [e['ID'] for e in bib.select(normauthor='Shelah')]
+            ['MR645920', 'MR1324511']
+            >>> [e['ID'] for e in bib.select(normauthor='Shelah',
+            ...                              year=('1990', '2000'),
+            ...                              journal='J. Symb. Log.')]
+            ['MR1324511']
+        """
+        positions = None
+        for field, value in criteria.items():
+            if field == 'normauthor':
+                index = self._index('normauthor', field)
+                found = set(range(len(self.data)))
+                for token in author_tokens({'author': value}):
+                    found &= index.get(token, set())
+            elif isinstance(value, tuple):
+                values, ranked = self._index('range', field)
+                low, high = value
+                start = (0 if low is None
+                         else bisect.bisect_left(values, sort_value(low)))
+                stop = (len(values) if high is None
+                        else bisect.bisect_right(values, sort_value(high)))
+                found = set(ranked[start:stop])
+            else:
+                found = self._index('value', field).get(value, set())
+
+            positions = found if positions is None else positions & found
+            if not positions:
+                break
+
+        if positions is None:
+            positions = range(len(self.data))
+        return Bibliography([self.data[i] for i in sorted(positions)])
+
+    def drop_indexes(self):
+        """ Drops the indexes used by :func:`select`
+        """
+        self._indexes.clear()
+
+    def _index(self, kind, field):
+        try:
+            return self._indexes[kind, field]
+        except KeyError:
+            pass
+
+        if kind == 'range':
+            pairs = sorted((sort_value(e[field]), i)
+                           for i, e in enumerate(self) if field in e)
+            index = ([v for v, _ in pairs], [i for _, i in pairs])
+        else:
+            index = {}
+            for i, e in enumerate(self):
+                if kind == 'normauthor':
+                    keys = author_tokens(e)
+                else:
+                    keys = [e[field]] if field in e else []
+                for k in keys:
+                    index.setdefault(k, set()).add(i)
+
+        self._indexes[kind, field] = index
+        return index
 
     @staticmethod
     def _test_entry(entry):
@@ -497,6 +1428,196 @@ class Bibliography(object):
 
         return 'ENTRYTYPE' in entry and 'ID' in entry
 
+class MergeState(object):
+    """ Persistable state of a merge of two bibliographies
+
+    The state consists of the content hashes of the entries of both
+    inputs indexed by the merge key and of the ID-s the merged entries
+    were given. Given new versions of the inputs, :func:`update` only
+    recomputes the entries whose hashes have changed and patches them
+    into the previous result of the merge.
+
+    Args:
+        left (Optional[Dict[str, str]]):
+            hashes of the entries of the left bibliography by merge key
+        right (Optional[Dict[str, str]]):
+            hashes of the entries of the right bibliography by merge key
+        ids (Optional[Dict[str, str]]):
+            ID-s of the merged entries by merge key
+        union (Optional[bool]):
+            see :func:`Bibliography.merge`
+        keep_key (Optional[bool]):
+            see :func:`Bibliography.merge`
+
+    Example:
+        >>> left = Bibliography([{'ENTRYTYPE': 'article', 'ID': 'a',
+        ...                       'KEY': 'k1'}])
+        >>> right = Bibliography([{'ENTRYTYPE': 'article', 'ID': 'b',
+        ...                        'KEY': 'k1', 'url': 'http://a.b'},
+        ...                       {'ENTRYTYPE': 'book', 'ID': 'c',
+        ...                        'KEY': 'k2'}])
+        >>> merged, state = MergeState.merge(left, right)
+        >>> merged.data
+        [{'ENTRYTYPE': 'article', 'ID': 'a', 'url': 'http://a.b'},
+        {'ENTRYTYPE': 'book', 'ID': 'c'}]
+        >>> right = Bibliography([{'ENTRYTYPE': 'article', 'ID': 'b',
+        ...                        'KEY': 'k1', 'url': 'http://c.d'}])
+        >>> state.update(merged, left, right).data
+        [{'ENTRYTYPE': 'article', 'ID': 'a', 'url': 'http://c.d'}]
+    """
+
+    def __init__(self, left=None, right=None, ids=None,
+                 union=True, keep_key=False):
+        self.left = left or {}
+        self.right = right or {}
+        self.ids = ids or {}
+        self.union = union
+        self.keep_key = keep_key
+
+    @classmethod
+    def merge(cls, left, right, union=True, keep_key=False):
+        """ Merges two bibliographies and records the state of the merge
+
+        Args:
+            left (Bibliography):      the left bibliography
+            right (Bibliography):     the bibliography to be merged
+            union (Optional[bool]):   see :func:`Bibliography.merge`
+            keep_key (Optional[bool]): see :func:`Bibliography.merge`
+
+        Returns:
+            (Bibliography, MergeState): the merged bibliography and its state
+        """
+        state = cls(cls.hashes(left), cls.hashes(right),
+                    union=union, keep_key=keep_key)
+        merged = left.merge(right, union=union, keep_key=True)
+        state.ids = {e[Bibliography.MERGEKEY]: e['ID'] for e in merged}
+        if not keep_key:
+            merged.del_fields(Bibliography.MERGEKEY)
+        return merged, state
+
+    @staticmethod
+    def hashes(bib):
+        """ Indexes the content hashes of a bibliography by merge key
+
+        Args:
+            bib (Bibliography): bibliography containing merge keys
+
+        Returns:
+            Dict[str, str]: hashes of the entries by merge key
+        """
+        return {e[Bibliography.MERGEKEY]: entry_hash(e) for e in bib}
+
+    @staticmethod
+    def diff(old, new):
+        """ Compares two hash indexes created by :func:`hashes`
+
+        Args:
+            old (Dict[str, str]): previous hash index
+            new (Dict[str, str]): current hash index
+
+        Returns:
+            (List[str], List[str], List[str]):
+                merge keys of the added, removed and changed entries
+
+        Example:
+            >>> MergeState.diff({'a': '1', 'b': '2', 'c': '3'},
+            ...                 {'a': '1', 'c': '4', 'd': '5'})
+            (['d'], ['b'], ['c'])
+        """
+        added = [k for k in new if k not in old]
+        removed = [k for k in old if k not in new]
+        changed = [k for k, h in new.items() if k in old and old[k] != h]
+        return added, removed, changed
+
+    def update(self, merged, left, right):
+        """ Updates a previous result of the merge to new inputs
+
+        Only the entries whose merge key was added, removed or changed
+        in one of the inputs are recomputed. All other entries of
+        ``merged`` are reused as they are. New entries are appended.
+        The state itself is updated to the new inputs.
+
+        Args:
+            merged (Bibliography):
+                previous result of the merge described by this state
+            left (Bibliography):
+                new version of the left bibliography
+            right (Bibliography):
+                new version of the right bibliography
+
+        Returns:
+            Bibliography: the updated merge result
+        """
+        new_left = self.hashes(left)
+        new_right = self.hashes(right)
+
+        affected = set()
+        for old, new in ((self.left, new_left), (self.right, new_right)):
+            for keys in self.diff(old, new):
+                affected.update(keys)
+
+        key = Bibliography.MERGEKEY
+        left_by_key = {e[key]: e for e in left if e[key] in affected}
+        right_by_key = {e[key]: e for e in right if e[key] in affected}
+        position = {e['ID']: i for i, e in enumerate(merged)}
+
+        entries = list(merged.data)
+        ids = dict(self.ids)
+        # Keeps the input order for entries that are new in the result
+        ordered = [k for k in list(left_by_key) + list(right_by_key)
+                   if k not in ids]
+        ordered += [k for k in ids if k in affected]
+        for k in ordered:
+            entry = self._merge_entry(left_by_key.get(k), right_by_key.get(k))
+            if k in ids:
+                entries[position[ids.pop(k)]] = entry
+            elif entry is not None:
+                entries.append(entry)
+            if entry is not None:
+                ids[k] = entry['ID']
+
+        self.left = new_left
+        self.right = new_right
+        self.ids = ids
+        return Bibliography([e for e in entries if e is not None])
+
+    def _merge_entry(self, left, right):
+        if left is None and (right is None or not self.union):
+            return None
+
+        entry = copy.deepcopy(left if left is not None else right)
+        if left is not None and right is not None:
+            entry.update(right)
+            entry.update(left)
+        if not self.keep_key:
+            entry.pop(Bibliography.MERGEKEY, None)
+        return entry
+
+    def load(self, handle):
+        """ Loads the state from handle
+
+        Args:
+            handle (handle): file handle of a state created by :func:`dump`
+        """
+        state = json.load(handle)
+        self.left = state['left']
+        self.right = state['right']
+        self.ids = state['ids']
+        self.union = state['union']
+        self.keep_key = state['keep_key']
+
+    def dump(self):
+        """ Serializes the state
+
+        Returns:
+            str: JSON representation of the state
+        """
+        return json.dumps({'left': self.left,
+                           'right': self.right,
+                           'ids': self.ids,
+                           'union': self.union,
+                           'keep_key': self.keep_key})
+
 if __name__ == '__main__':
     data1 = [{'ENTRYTYPE': 'article', 'ID': 'test1'},
              {'ENTRYTYPE': 'article', 'ID': 'test2'}]
@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+""" Persistent storage of bibliographies in a SQLite database
+
+Every entry is stored as a row containing its ID, its merge key, the
+normalized author and title, the year and the entry itself as JSON. ID-s,
+merge keys, normalized authors and years are indexed. Entries are streamed
+from and to the database in batches, so bibliographies larger than the
+memory can be loaded, keyed and merged.
+
+    >>> store = SQLiteBibliography() # in-memory database
+    >>> store.insert([{'ENTRYTYPE': 'article', 'ID': 'MR636904',
+    ...                'author': 'Shelah, Saharon', 'year': '1981',
+    ...                'title': 'Iterated forcing and changing cofinalities'}])
+    >>> store.make_key('normauthor', 'year')
+    >>> other = Bibliography([{'ENTRYTYPE': 'article', 'ID': 'shelah1981',
+    ...                        'author': 'Shelah, S.', 'year': '1981',
+    ...                        'url': 'http://dx.doi.org/10.1007/BF02761870'}])
+    >>> other.add_fields(normauthor=normalizetex.norm_author)
+    >>> other.make_key('normauthor', 'year')
+    >>> _ = store.merge(other)
+    >>> store.get('MR636904')['url']
+    'http://dx.doi.org/10.1007/BF02761870'
+    >>> len(store)
+    1
+"""
+
+import contextlib
+import json
+import sqlite3
+
+from . import normalizetex
+from .external import STREAM_READERS, SEPARATORS
+from .pybibtools import Bibliography, materialize
+
+class SQLiteBibliography(object):
+    """ Bibliography stored in a SQLite database
+
+    Most methods of :class:`listb.pybibtools.Bibliography` are available.
+    Unlike there, :func:`merge` and :func:`union` update the bibliography in
+    place. Every method changing the database runs in a transaction, so the
+    database is left unchanged if an error occurs. Several changes can be
+    grouped into one transaction using ``with store.transaction():``.
+
+    Args:
+        path (Optional[str]): path to the database file. Defaults to an
+                              in-memory database.
+    """
+
+    MERGEKEY = Bibliography.MERGEKEY
+    """ Name of the field used for merging in :func:`merge`
+    and created in :func:`make_key`.
+    """
+
+    NORMALIZED = {'normauthor': normalizetex.norm_author,
+                  'normtitle': normalizetex.norm_title
+                 }
+    """ Normalized fields stored in own columns
+    """
+
+    BATCH = 1000
+    """ Number of entries read or written at once
+    """
+
+    SCHEMA = '''
+        CREATE TABLE IF NOT EXISTS entries (
+            id TEXT PRIMARY KEY,
+            key TEXT,
+            normauthor TEXT,
+            normtitle TEXT,
+            year TEXT,
+            data TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS entries_key ON entries (key);
+        CREATE INDEX IF NOT EXISTS entries_normauthor ON entries (normauthor);
+        CREATE INDEX IF NOT EXISTS entries_year ON entries (year);
+    '''
+
+    def __init__(self, path=':memory:'):
+        self.connection = sqlite3.connect(path)
+        self.connection.executescript(self.SCHEMA)
+        self._savepoints = 0
+
+    @contextlib.contextmanager
+    def transaction(self):
+        """ Runs the enclosed changes in a transaction
+
+        The changes are committed when the block is left and rolled back if
+        an error occurs. Within another transaction, a savepoint is used
+        instead, so only the changes of the block are rolled back and
+        nothing is committed before the outermost block is left.
+
+        Example:
+            >>> store = SQLiteBibliography()
+            >>> with store.transaction():
+            ...     store.insert([{'ENTRYTYPE': 'book', 'ID': 'b'}])
+            ...     store.insert([{'ENTRYTYPE': 'book', 'ID': 'b'}])
+            Traceback (most recent call last):
+              ...
+            RuntimeError: Your bibliography contains duplicate ID-s.
+            >>> len(store)
+            0
+        """
+        if not self.connection.in_transaction:
+            self.connection.execute('BEGIN')
+            try:
+                yield
+            except BaseException:
+                self.connection.rollback()
+                raise
+            self.connection.commit()
+            return
+
+        self._savepoints += 1
+        name = 'savepoint%d' % self._savepoints
+        self.connection.execute('SAVEPOINT %s' % name)
+        try:
+            yield
+        except BaseException:
+            self.connection.execute('ROLLBACK TO %s' % name)
+            raise
+        finally:
+            self.connection.execute('RELEASE %s' % name)
+            self._savepoints -= 1
+
+    def _row(self, entry):
+        if not Bibliography._test_entry(entry):
+            raise RuntimeError('There is something wrong with your data. '
+                               'Either one of your entries is not a '
+                               'dictionary or does not contain both '
+                               'keys "ENTRYTYPE" and "ID".')
+        data = dict(materialize(entry))
+        key = data.pop(self.MERGEKEY, None)
+        normauthor, normtitle = [self._normalize(f, entry)
+                                 for f in ('normauthor', 'normtitle')]
+        return (entry['ID'], key, normauthor, normtitle, entry.get('year'),
+                json.dumps(data, ensure_ascii=False))
+
+    def _normalize(self, field, entry):
+        try:
+            return self.NORMALIZED[field](entry)
+        except KeyError:
+            return None
+
+    def _entry(self, key, data):
+        entry = json.loads(data)
+        if key is not None:
+            entry[self.MERGEKEY] = key
+        return entry
+
+    def _insert(self, entries):
+        sql = 'INSERT INTO entries VALUES (?, ?, ?, ?, ?, ?)'
+        try:
+            self.connection.executemany(sql, map(self._row, entries))
+        except sqlite3.IntegrityError:
+            raise RuntimeError('Your bibliography contains duplicate ID-s.')
+
+    def _rows(self, columns):
+        """ Yields batches of rows without keeping a cursor open """
+        last = 0
+        sql = ('SELECT rowid, %s FROM entries WHERE rowid > ? '
+               'ORDER BY rowid LIMIT ?' % columns)
+        while True:
+            rows = self.connection.execute(sql, (last, self.BATCH)).fetchall()
+            if not rows:
+                return
+            last = rows[-1][0]
+            yield [row[1:] for row in rows]
+
+    def insert(self, entries):
+        """ Adds entries to the bibliography
+
+        Args:
+            entries (Iterable[dict]): bibliographic entries
+
+        Raises:
+            RuntimeError: if an entry is malformed or its ID already exists
+        """
+        with self.transaction():
+            self._insert(entries)
+
+    def load(self, handle, reader='yaml'):
+        """ Replaces the bibliography by the entries streamed from handle
+
+        Args:
+            handle (handle):        file handle of biblography
+            reader (Optional[str]): name of reader (see
+                                    :const:`listb.external.STREAM_READERS`)
+        """
+        with self.transaction():
+            self.connection.execute('DELETE FROM entries')
+            self._insert(STREAM_READERS[reader](handle))
+
+    def dump(self, writer='yaml'):
+        """ Serializes the bibliography using one of the writers in
+        :const:`listb.pybibtools.Bibliography.WRITERS`
+
+        Args:
+            writer (Optional[str]): name of one of the predefined writers
+
+        Returns:
+            str: representation of the bibliography as a string
+        """
+        return Bibliography.WRITERS[writer](list(self))
+
+    def write(self, handle, writer='yaml'):
+        """ Writes the bibliography to handle in batches of :const:`BATCH`
+
+        Args:
+            handle (handle):        handle the data is written to
+            writer (Optional[str]): name of one of the predefined writers
+        """
+        for i, rows in enumerate(self._rows('key, data')):
+            if i:
+                handle.write(SEPARATORS[writer])
+            handle.write(Bibliography.WRITERS[writer](
+                [self._entry(*row) for row in rows]))
+
+    @property
+    def data(self):
+        """ List of all entries of the bibliography
+        """
+        return list(self)
+
+    def __iter__(self):
+        for rows in self._rows('key, data'):
+            for row in rows:
+                yield self._entry(*row)
+
+    def __len__(self):
+        return self.connection.execute('SELECT COUNT(*) FROM entries'
+                                      ).fetchone()[0]
+
+    def get(self, ID):
+        """ Looks up an entry by its ID
+
+        Args:
+            ID (str): ID of the entry
+
+        Returns:
+            Optional[dict]: the entry or ``None`` if there is no such entry
+        """
+        row = self.connection.execute('SELECT key, data FROM entries '
+                                      'WHERE id = ?', (ID,)).fetchone()
+        return self._entry(*row) if row else None
+
+    def find(self, key):
+        """ Looks up entries by their merge key
+
+        Args:
+            key (str): merge key
+
+        Returns:
+            List[dict]: entries with this merge key
+        """
+        rows = self.connection.execute('SELECT key, data FROM entries '
+                                       'WHERE key = ? ORDER BY rowid', (key,))
+        return [self._entry(*row) for row in rows]
+
+    def make_key(self, *keys):
+        """ Creates a merge key formed out of the fields specified
+        in ``keys``
+
+        The fields in :const:`NORMALIZED` are read from their columns.
+
+        Args:
+            keys (List[str]): List of field names
+
+        Raises:
+            RuntimeError: if the merge keys are not unique
+        """
+        with self.transaction():
+            columns = 'id, normauthor, normtitle, data'
+            for rows in self._rows(columns):
+                updates = []
+                for ID, normauthor, normtitle, data in rows:
+                    record = json.loads(data)
+                    if normauthor is not None:
+                        record['normauthor'] = normauthor
+                    if normtitle is not None:
+                        record['normtitle'] = normtitle
+                    updates.append((normalizetex.make_key(record, *keys), ID))
+                self.connection.executemany('UPDATE entries SET key = ? '
+                                            'WHERE id = ?', updates)
+
+            duplicates = self.connection.execute(
+                'SELECT key, id FROM entries WHERE key IN '
+                '(SELECT key FROM entries GROUP BY key HAVING COUNT(*) > 1) '
+                'ORDER BY rowid').fetchall()
+            if duplicates:
+                raise RuntimeError('The following merge keys (key, ID)'
+                                   'are duplicates: %s' % duplicates)
+
+    def del_key(self):
+        """ Deletes the merge keys
+        """
+        with self.transaction():
+            self.connection.execute('UPDATE entries SET key = NULL')
+
+    def merge(self, other, union=True, keep_key=False):
+        """ Merges a bibliography into this one using the merge key in field
+        :attr:`MERGEKEY`
+
+        Fields of this bibliography take precedence as in
+        :func:`listb.pybibtools.Bibliography.merge`.
+
+        Args:
+            other (Iterable[dict]):
+                The bibliography to be merged, for example a
+                :class:`listb.pybibtools.Bibliography`
+            union (Optional[bool]):
+                Do you want to add entries not contained in this
+                bibliography? Defaults to ``True``
+            keep_key (Optional[bool]):
+                Do you want to keep the merge key? Defaults to ``False``
+
+        Returns:
+            SQLiteBibliography: this bibliography
+        """
+        with self.transaction():
+            self._merge(other, 'key', lambda e: e[self.MERGEKEY], union)
+            if not keep_key:
+                self.del_key()
+        return self
+
+    def union(self, other):
+        """ Adds the entries of another bibliography with new ID-s
+
+        This is a special case of :func:`merge` were the merge key is just
+        the field 'ID'.
+
+        Args:
+            other (Iterable[dict]): bibliography to be joined
+
+        Returns:
+            SQLiteBibliography: this bibliography
+        """
+        self._merge(other, 'id', lambda e: e['ID'], True)
+        return self
+
+    def _merge(self, other, column, key, union):
+        select = 'SELECT id, data FROM entries WHERE %s = ?' % column
+        update = ('UPDATE entries SET normauthor = ?, normtitle = ?, '
+                  'year = ?, data = ? WHERE id = ?')
+        with self.transaction():
+            for entry in other:
+                row = self.connection.execute(select,
+                                              (key(entry),)).fetchone()
+                if row is None:
+                    if union:
+                        self._insert([entry])
+                    continue
+
+                ID, data = row
+                merged = json.loads(data)
+                for field, value in entry.items():
+                    if field != self.MERGEKEY:
+                        merged.setdefault(field, value)
+                _, _, normauthor, normtitle, year, data = self._row(merged)
+                self.connection.execute(update, (normauthor, normtitle, year,
+                                                 data, ID))
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod(optionflags=doctest.NORMALIZE_WHITESPACE)
@@ -3,12 +3,19 @@
 """ Small command line tools for accessing bibliographic data from 'MathSciNet'.
 """
 
-import requests
-import yaml
+import os.path
 
 import click
 
+import listb.compress as compress
+import listb.external as ext
+import listb.mrset as mrset
 import listb.mrtools as mrtools
+import listb.pipeline as pipeline_
+import listb.pybibtools as bibtools
+
+READERS = bibtools.Bibliography.READERS.keys()
+WRITERS = bibtools.Bibliography.WRITERS.keys()
 
 def chunk_list(l, n):
     """ Chops a list into tuples (chunks) of maximal size `n`
@@ -33,6 +40,54 @@ def chunk_list(l, n):
         l_.append(tuple(l[-(nl % n):]))
     return l_
 
+def crawl_cached(url, cache):
+    """ Crawls URL and stores the crawled pages in a cache file
+
+    Args:
+        url (str):              URL pointing to MathSciNet search result
+        cache (Optional[str]):  path to the cache file
+
+    Returns:
+        (List[str], List[str]): List of page source codes and list of URLs
+    """
+    if not cache:
+        return mrtools.crawl(url)
+
+    page_cache = mrtools.PageCache()
+    if os.path.exists(cache):
+        with open(cache, 'r') as handle:
+            page_cache.load(handle)
+
+    result = mrtools.crawl(url, cache=page_cache)
+
+    with open(cache, 'w') as handle:
+        handle.write(page_cache.dump())
+    return result
+
+def load_numbers(fil):
+    """ Reads MR-numbers from a set file, a yaml file or a text file
+
+    Args:
+        fil (str): path to the file, see :func:`listb.mrset.load`
+
+    Returns:
+        List[int]: MR-numbers
+    """
+    with compress.open(fil, 'rb') as handle:
+        return mrset.load(handle)
+
+def write_numbers(numbers, o):
+    """ Writes a set of MR-numbers to a set file or prints them
+
+    Args:
+        numbers (Iterable[int]):        MR-numbers
+        o (Optional[click.File]):       binary file handle for output
+    """
+    if o:
+        mrset.dump(numbers, o)
+    else:
+        click.echo('\n'.join(map(mrset.to_str, sorted(numbers))))
+
 @click.group()
 def cli():
     """ Small command line tool for crawling search pages on
@@ -45,13 +100,19 @@ def cli():
 @click.option('--url',
               prompt='Please enter URL',
               help='URL pointing to MathSciNet search result')
-def crawl(url):
+@click.option('--cache',
+              type=click.Path(dir_okay=False),
+              help='path to cache file for revalidating crawled pages')
+def crawl(url, cache):
     """ Prints the URL and all suceeding URLs.
     
     If the search result is split into 5 pages and the URL to page
     3 is passed then the URLs of pages 3, 4, and 5 are printed.
+
+    With `--cache` the pages are only downloaded again if they changed since
+    the last run.
     """
-    _, urls = mrtools.crawl(url)
+    _, urls = crawl_cached(url, cache)
     click.echo('\n'.join(urls))
 
 @click.command('mrnumbers',
@@ -63,46 +124,124 @@ def crawl(url):
               default=False,
               help='Crawl page and return all MR-numbers')
 @click.option('--dump',
-              type=click.File('w'),
+              type=compress.click_file('w'),
               help='path to yaml file for output')
-def mrnumbers(url, crawl, dump):
+@click.option('--set', 'set_',
+              type=click.File('wb'),
+              help='path to compact set file for output')
+@click.option('--cache',
+              type=click.Path(dir_okay=False),
+              help='path to cache file for revalidating crawled pages')
+def mrnumbers(url, crawl, dump, set_, cache):
+    """ Prints the MR-numbers of the entries of a search result.
+
+    With `--set` the distinct MR-numbers are stored in a compact binary
+    file, which `bib`, `union`, `intersection` and `difference` read.
+    """
     if crawl:
-        sites, _ = mrtools.crawl(url)
+        sites, _ = crawl_cached(url, cache)
     else:
-        req = requests.get(url)
-        sites = [req.text]
+        sites = [mrtools.fetch(url)]
     
     mmrn = [mrtools.msn_to_mrnumbers(s) for s in sites]
     mmrn = [n for sublist in mmrn for n in sublist] # flattens the list
     
+    if set_:
+        mrset.dump(mmrn, set_)
     if dump:
         mrtools.yaml_dumps(mmrn, dump)
-    else:
+    elif not set_:
         click.echo('\n'.join(mmrn))
 
+@click.command('extract',
+               short_help='Prints the MR-numbers of saved search pages')
+@click.option('-o',
+              type=compress.click_file('w'),
+              help='path to file for output')
+@click.option('--set', 'set_',
+              type=click.File('wb'),
+              help='path to compact set file for output')
+@click.option('-j', '--jobs',
+              type=click.IntRange(min=0),
+              default=0,
+              help='number of processes, 0 for one per CPU')
+@click.argument('pages', nargs=-1, required=True)
+def extract(o, set_, jobs, pages):
+    """ Prints the MR-numbers of search pages saved to disk.
+
+    PAGES are saved pages, directories of saved pages (*.html or *.htm,
+    possibly compressed) or glob patterns. The pages are parsed in parallel
+    and each MR-number is printed once, in the order of the pages.
+    """
+    try:
+        paths = mrtools.saved_pages(pages)
+    except ValueError as err:
+        raise click.BadParameter(str(err))
+
+    numbers = []
+    for n in mrtools.pages_to_mrnumbers(paths, jobs=jobs or None):
+        if set_:
+            numbers.append(n)
+        if o:
+            o.write(n + '\n')
+        elif not set_:
+            click.echo(n)
+    if set_:
+        mrset.dump(numbers, set_)
+
 @click.command('bib',
                 short_help='Retrieves BibTeX file for MR-numbers')
 @click.option('--load',
-               type=click.File('r'),
-               help='path to yaml file storing the MR-numbers')
+               type=click.Path(exists=True, dir_okay=False),
+               help='path to set or yaml file storing the MR-numbers')
 @click.option('--dump',
-              type=click.File('w'),
+              type=compress.click_file('w'),
               help='Path to BibTeX file for output')
+@click.option('--exclude',
+              type=click.Path(exists=True, dir_okay=False),
+              help='path to bibliography whose MR-numbers are skipped')
+@click.option('-f',
+              type=click.Choice(READERS),
+              help='file format of the excluded bibliography')
 @click.argument('mrnumbers',
                 nargs=-1)
-def bib(load, dump, mrnumbers):
+def bib(load, dump, exclude, f, mrnumbers):
     """ Fetches BibTeX entries for MR-numbers from MathSciNet.
     
     If both `--load` and `mrnumbers` are specified, only the numbers
-    stored in the yaml file are used.
+    stored in the set or yaml file are used. Each MR-number is fetched
+    once.
+
+    With `--exclude` the MR-numbers found in the MRNUMBER fields of an
+    existing bibliography are not fetched again.
     """
     if load:
-        mrnumbers = yaml.load(load)
+        mrnumbers = load_numbers(load)
     elif mrnumbers:
-        pass
+        try:
+            mrnumbers = [mrset.to_int(n) for n in mrnumbers]
+        except ValueError as err:
+            raise click.BadParameter(str(err))
     else:
         raise click.UsageError('Please specify yaml file or mrnumbers.')
-    
+
+    skip = set()
+    if exclude:
+        if not f:
+            f = compress.extension(exclude)
+            if f not in READERS:
+                raise click.UsageError('Cannot deduce the reader of the '
+                                       'excluded bibliography, please '
+                                       'specify "-f".')
+        with compress.open(exclude, 'r') as handle:
+            skip = mrset.from_entries(ext.STREAM_READERS[f](handle))
+
+    # distinct numbers in the order given
+    mrnumbers = [mrset.to_str(n) for n in dict.fromkeys(mrnumbers)
+                 if n not in skip]
+    if not mrnumbers:
+        return
+
     chunks = chunk_list(mrnumbers, 20)
     with click.progressbar(chunks) as bar:
         bibs = [mrtools.get_bibtex_from_msn(c) for c in bar]
@@ -119,9 +258,152 @@ def bib(load, dump, mrnumbers):
     else:
         click.echo('\n'.join(bibs))
 
+@click.command('pipeline',
+               short_help='Merges a search result into a bibliography')
+@click.option('--url',
+              prompt='Please enter URL',
+              help='URL pointing to MathSciNet search result')
+@click.option('--crawl/--no-crawl',
+              default=True,
+              help='Crawl page and merge the entries of all pages')
+@click.option('--target',
+              type=click.Path(exists=True, dir_okay=False),
+              help='path to the bibliography the entries are merged into')
+@click.option('-f',
+              type=click.Choice(READERS),
+              help='file format of the target bibliography')
+@click.option('-t',
+              type=click.Choice(WRITERS),
+              help='to file format')
+@click.option('-o',
+              type=compress.click_file('w'),
+              help='path to file for output')
+@click.option('-k',
+              type=click.STRING,
+              multiple=True,
+              help=('name of field for key creation, defaults to '
+                    'normauthor, year and normtitle'))
+@click.option('--union/--left',
+              default=True,
+              help=('Do you want the union of entries or '
+                    'just update the target bibliography?'))
+@click.option('--keep-key/--del-key',
+              default=False,
+              help='Do you want to keep the merge key?')
+@click.option('--workers',
+              type=click.IntRange(min=1),
+              default=4,
+              help='number of parallel requests for BibTeX')
+def pipeline(url, crawl, target, f, t, o, k, union, keep_key, workers):
+    """ Merges the BibTeX entries of a search result into a bibliography.
+
+    The pages are crawled, their MR-numbers are passed on to concurrent
+    requests for BibTeX and the fetched entries are merged into the target
+    bibliography as they arrive. Fields of the target take precedence.
+    """
+    if not f and target:
+        f = compress.extension(target)
+        if f not in READERS:
+            raise click.UsageError('Cannot deduce the reader of the target, '
+                                   'please specify "-f".')
+    if not t:
+        t = compress.extension(o.name) if o else 'bib'
+        if t not in WRITERS:
+            raise click.UsageError('Cannot deduce the writer, please '
+                                   'specify "-t".')
+
+    bib = None
+    if target:
+        bib = bibtools.Bibliography()
+        with compress.open(target, 'r') as handle:
+            bib.load(handle, reader=f)
+
+    kargs = dict(union=union, keep_key=keep_key, all_pages=crawl,
+                 workers=workers)
+    if k:
+        kargs['keys'] = k
+
+    error = None
+    try:
+        bib = pipeline_.pipeline(url, bib, **kargs)
+    except pipeline_.PipelineError as err:
+        error = err
+        bib = err.bib
+    except RuntimeError as err:
+        raise click.ClickException(str(err))
+
+    datastring = bib.dump(writer=t)
+    if o:
+        o.write(datastring)
+    else:
+        click.echo(datastring)
+
+    if error:
+        raise click.ClickException(str(error))
+
+@click.command('union',
+               short_help='Union of sets of MR-numbers')
+@click.option('-o',
+              type=click.File('wb'),
+              help='path to set file for output')
+@click.argument('files', nargs=-1, required=True,
+                type=click.Path(exists=True, dir_okay=False))
+def union(o, files):
+    """ Writes the MR-numbers contained in any of the files.
+
+    The files are set, yaml or text files of MR-numbers. Without `-o` the
+    numbers are printed.
+    """
+    numbers = set()
+    for fil in files:
+        numbers.update(load_numbers(fil))
+    write_numbers(numbers, o)
+
+@click.command('intersection',
+               short_help='Intersection of sets of MR-numbers')
+@click.option('-o',
+              type=click.File('wb'),
+              help='path to set file for output')
+@click.argument('files', nargs=-1, required=True,
+                type=click.Path(exists=True, dir_okay=False))
+def intersection(o, files):
+    """ Writes the MR-numbers contained in all of the files.
+
+    The files are set, yaml or text files of MR-numbers. Without `-o` the
+    numbers are printed.
+    """
+    numbers = set(load_numbers(files[0]))
+    for fil in files[1:]:
+        numbers.intersection_update(load_numbers(fil))
+    write_numbers(numbers, o)
+
+@click.command('difference',
+               short_help='Difference of sets of MR-numbers')
+@click.option('-o',
+              type=click.File('wb'),
+              help='path to set file for output')
+@click.argument('files', nargs=-1, required=True,
+                type=click.Path(exists=True, dir_okay=False))
+def difference(o, files):
+    """ Writes the MR-numbers of the first file contained in none of the
+    others.
+
+    The files are set, yaml or text files of MR-numbers. Without `-o` the
+    numbers are printed.
+    """
+    numbers = set(load_numbers(files[0]))
+    for fil in files[1:]:
+        numbers.difference_update(load_numbers(fil))
+    write_numbers(numbers, o)
+
 cli.add_command(crawl)
 cli.add_command(mrnumbers)
+cli.add_command(extract)
 cli.add_command(bib)
+cli.add_command(pipeline)
+cli.add_command(union)
+cli.add_command(intersection)
+cli.add_command(difference)
 
 if __name__ == '__main__':
     cli()
\ No newline at end of file
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+""" Thin client sending commands to ``pybibtools.py serve``
+
+The arguments are the same as for ``pybibtools.py``. The socket is given by
+``-s``/``--socket`` in front of the command or by the environment variable
+``PYBIBTOOLS_SOCKET``. ``--stop`` stops the server.
+
+    $ pybibtools.py serve -s /tmp/pybibtools.sock &
+    $ pybibclient.py -s /tmp/pybibtools.sock make-key -k year -o out.bib in.bib
+    $ pybibclient.py -s /tmp/pybibtools.sock --stop
+
+The client only imports the standard library, so it starts quickly.
+"""
+
+import os
+import sys
+
+import listb.daemon as daemon
+
+USAGE = 'Usage: pybibclient.py [-s SOCKET] (--stop | COMMAND [ARGS]...)\n'
+
+def main(argv):
+    """ Sends a command line to the server and reports its result
+
+    Args:
+        argv (List[str]): command line arguments without the program name
+
+    Returns:
+        int: exit code of the command
+    """
+    path = os.environ.get('PYBIBTOOLS_SOCKET')
+    if argv[:1] in (['-s'], ['--socket']) and len(argv) > 1:
+        path, argv = argv[1], argv[2:]
+    if not path or not argv:
+        sys.stderr.write(USAGE)
+        return 2
+
+    args = None if argv == ['--stop'] else argv
+    try:
+        code, out, err = daemon.request(path, args)
+    except OSError as exc:
+        sys.stderr.write('Cannot reach server at %s: %s\n' % (path, exc))
+        return 1
+    sys.stdout.write(out)
+    sys.stderr.write(err)
+    return code
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -4,34 +4,147 @@
 """
 
 
+from concurrent.futures import Future, ProcessPoolExecutor
+import copy
 from functools import reduce
+import json
+import os
 import os.path
-import requests
-import yaml
+import sys
 
 import click
-import bibtexparser
 
-import listb.normalizetex as normalizetex
+import listb.compress as compress
+import listb.daemon as daemon
+import listb.external as ext
+import listb.parallel as parallel
+import listb.parsecache as parsecache
 import listb.pybibtools as bibtools
 
 READERS = bibtools.Bibliography.READERS.keys()
 WRITERS = bibtools.Bibliography.WRITERS.keys()
 
-def load(reader, fil):
+def parse(fil, reader, jobs=1):
+    """ Parses a file, in parallel if possible
+
+    Args:
+        fil (str):              path to input file
+        reader (str):           name of reader
+        jobs (Optional[int]):
+            number of processes used for parsing BibTeX. If 0, the number
+            of CPUs is used.
+
+    Returns:
+        List[dict]: entry list of bibliography
+    """
+    if jobs != 1 and reader in parallel.READERS:
+        return parallel.load_list(fil, reader, jobs=jobs or None)
+    with compress.open(fil, 'r') as handle:
+        return bibtools.Bibliography.READERS[reader](handle)
+
+def load(reader, fil, jobs=1):
     """ Common interface for loading with all readers
+
+    If ``load.CACHE`` is a dictionary, the parsed entries are cached in it
+    and reused as long as the modification time and size of the file are
+    unchanged. If ``load.PARSECACHE`` is a
+    :class:`listb.parsecache.ParseCache`, it is used for parsing.
     
     Args:
         reader (str):   name of reader
         fil (str):      path to input file
+        jobs (Optional[int]):
+            number of processes used for parsing, see :func:`parse`
     
     Returns:
         (Bibliography): :class:`Bibliography`-object
     """
+    if load.CACHE is not None:
+        key, version = _cache_key(reader, fil)
+        cached = load.CACHE.get(key)
+        if cached and cached[0] == version:
+            return bibtools.Bibliography(copy.deepcopy(cached[1]))
+
     bib = bibtools.Bibliography()
-    with open(fil, 'r') as handle:
-        bib.load(handle, reader=reader)
+    if load.PARSECACHE is not None:
+        bib.data = load.PARSECACHE.load(fil, reader,
+                                        lambda f, r: parse(f, r, jobs))
+    else:
+        bib.data = parse(fil, reader, jobs)
+
+    if load.CACHE is not None:
+        load.CACHE[key] = (version, copy.deepcopy(bib.data))
     return bib
+load.CACHE = None
+load.PARSECACHE = None
+
+def _cache_key(reader, fil):
+    stat = os.stat(fil)
+    return (reader, os.path.abspath(fil)), (stat.st_mtime_ns, stat.st_size)
+
+def _load_in_worker(reader, fil, parsecache):
+    # Pool processes do not share the caches of the parent, whether they
+    # are forked or spawned
+    load.CACHE = None
+    load.PARSECACHE = parsecache
+    return load(reader, fil)
+
+def load_all(reader, files, jobs=1):
+    """ Loads multiple files, possibly in parallel
+
+    The bibliographies are yielded in the order of ``files``, each one as
+    soon as it and all its predecessors are loaded. A single file is
+    parsed in chunks instead (see :func:`parse`).
+
+    The caches of :func:`load` are used with any number of processes:
+    ``load.PARSECACHE`` is handed to the processes, while ``load.CACHE`` is
+    looked up and filled here.
+
+    Args:
+        reader (str):           name of reader
+        files (List[str]):      paths to input files
+        jobs (Optional[int]):
+            number of processes used for loading. If 0, the number of
+            CPUs is used.
+
+    Yields:
+        (Bibliography): :class:`Bibliography`-object
+    """
+    if len(files) == 1:
+        # A single BibTeX file is split into chunks instead
+        yield load(reader, files[0], jobs=jobs)
+        return
+
+    if not jobs:
+        jobs = os.cpu_count() or 1
+    jobs = min(jobs, len(files))
+
+    if jobs <= 1:
+        for fil in files:
+            yield load(reader, fil)
+        return
+
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        pending = []
+        for fil in files:
+            key = version = None
+            if load.CACHE is not None:
+                key, version = _cache_key(reader, fil)
+                cached = load.CACHE.get(key)
+                if cached and cached[0] == version:
+                    future = Future()
+                    future.set_result(load(reader, fil))
+                    pending.append((None, None, future))
+                    continue
+            future = pool.submit(_load_in_worker, reader, fil,
+                                 load.PARSECACHE)
+            pending.append((key, version, future))
+
+        for key, version, future in pending:
+            bib = future.result()
+            if key is not None:
+                load.CACHE[key] = (version, copy.deepcopy(bib.data))
+            yield bib
 
 def get_formats(f, t, o, files):
     """ Chooses reader and writer based on user options
@@ -49,7 +162,7 @@ def get_formats(f, t, o, files):
         raise click.UsageError('At least one file must be specified.')
 
     if not f:
-        exts_f = [os.path.splitext(fil)[-1].replace('.', '') for fil in files]
+        exts_f = [compress.extension(fil) for fil in files]
         ext_f = exts_f[0]
         if not all(map(lambda x: x == ext_f, exts_f)):
             raise click.UsageError('You did not explicitely specify a reader '
@@ -70,8 +183,7 @@ def get_formats(f, t, o, files):
             raise click.UsageError('Cannot implicitely deduce writer. '
                                    'specify writer "-t" or output file "-o".')
 
-        fn_o = o.name
-        ext_t = os.path.splitext(fn_o)[-1].replace('.', '')
+        ext_t = compress.extension(o.name)
         if not ext_t in WRITERS:
             raise click.UsageError('I implicitely deduced that you want to '
                                    'use the %s writer. Unfortunately, this '
@@ -83,12 +195,93 @@ def get_formats(f, t, o, files):
 
     return f, t
 
+def merge_incremental(f, t, union, keep_key, state, previous, files):
+    """ Merges two bibliographies reusing a previous result if possible
+
+    Args:
+        f (str):                name of reader
+        t (str):                name of writer, used to read ``previous``
+        union (bool):           see :func:`listb.pybibtools.Bibliography.merge`
+        keep_key (bool):        see :func:`listb.pybibtools.Bibliography.merge`
+        state (str):            path to merge state, gets (over)written
+        previous (str):         path to previous result of the merge or None
+        files (List[str]):      paths to the two input files
+
+    Returns:
+        (Bibliography): :class:`Bibliography`-object
+    """
+    left, right = [load(f, fin) for fin in files]
+
+    mstate = bibtools.MergeState()
+    if previous and os.path.exists(state):
+        with open(state, 'r') as handle:
+            mstate.load(handle)
+
+    if (previous and mstate.ids and mstate.union == union
+            and mstate.keep_key == keep_key):
+        bib = mstate.update(load(t, previous), left, right)
+    else:
+        bib, mstate = bibtools.MergeState.merge(left, right, union=union,
+                                                keep_key=keep_key)
+
+    with open(state, 'w') as handle:
+        handle.write(mstate.dump())
+    return bib
+
+def parse_criterion(criterion):
+    """ Parses a criterion of the form "FIELD=VALUE" or "FIELD=LOW..HIGH"
+
+    Args:
+        criterion (str):    criterion, either bound of a range may be empty
+
+    Returns:
+        (str, str or tuple):
+            field and criterion as in
+            :func:`listb.pybibtools.Bibliography.select`
+    """
+    field, sep, value = criterion.partition('=')
+    if not sep or not field:
+        raise click.BadParameter('Expected FIELD=VALUE or FIELD=LOW..HIGH '
+                                 'got "%s".' % criterion)
+    if '..' in value:
+        low, high = value.split('..', 1)
+        value = (low or None, high or None)
+    return field, value
+
+def key_spec(keys):
+    """ Creates a key specification from the values of ``-k`` options
+
+    Args:
+        keys (List[str]):   names of fields, each value may name several
+                            fields separated by commas
+
+    Returns:
+        listb.pybibtools.KeySpec: specification of the merge key
+    """
+    fields = [f.strip() for k in keys for f in k.split(',') if f.strip()]
+    return bibtools.KeySpec(*fields)
+
 @click.group()
-def cli():
+@click.option('--cache-dir',
+              type=click.Path(file_okay=False),
+              envvar='PYBIBTOOLS_CACHE',
+              help=('directory for caching parsed input files, '
+                    'defaults to $PYBIBTOOLS_CACHE'))
+@click.option('--cache-size',
+              type=click.IntRange(min=0),
+              default=256,
+              help='maximal size of the cache in MB')
+def cli(cache_dir, cache_size):
     """ Small command line tool for combining and converting
     bibliographic data
+
+    Files ending in .gz, .bz2, .xz or .zst are (de)compressed on the fly.
+    Their format is deduced from the extension in front, as in msn.bib.gz.
     """
-    pass
+    load.PARSECACHE = None
+    if cache_dir:
+        load.PARSECACHE = parsecache.ParseCache(cache_dir,
+                                                cache_size * 2**20)
 
 @click.command('union',
                short_help='creates the union of multiple databases')
@@ -99,11 +292,22 @@ def cli():
               type=click.Choice(WRITERS),
               help='to file format')
 @click.option('-o',
-              type=click.File('w'),
+              type=compress.click_file('w'),
               help='path to file for output')
+@click.option('--external/--in-memory',
+              default=False,
+              help='Do you want to merge shard by shard with bounded memory?')
+@click.option('--shards',
+              type=click.IntRange(min=1),
+              default=16,
+              help='number of shards for external merging')
+@click.option('-j', '--jobs',
+              type=click.IntRange(min=0),
+              default=1,
+              help='number of processes for loading, 0 uses all CPUs')
 @click.argument('files', nargs=-1,
                 type=click.Path(exists=True))
-def union(f, t, o, files):
+def union(f, t, o, external, shards, jobs, files):
     """ Creates the union of multiple bibliograhpies
     
     If some IDs/cite keys are contained in both bibliographies data from the
@@ -111,10 +315,14 @@ def union(f, t, o, files):
     """
     f, t = get_formats(f, t, o, files)
 
-    with click.progressbar(files, label='Loading bibliographies') as ff:
-        bibs = [load(f, fin) for fin in ff]
-    
-    with click.progressbar(bibs, label='Unioning bibliographies') as bb:
+    if external:
+        out = o if o else sys.stdout
+        ext.external_merge(files, f, t, out, key='ID', shards=shards)
+        return
+
+    bibs = load_all(f, files, jobs=jobs)
+    with click.progressbar(bibs, length=len(files),
+                           label='Unioning bibliographies') as bb:
         bib = reduce(bibtools.Bibliography.union, bb)
 
     datastring = bib.dump(writer=t)
@@ -132,7 +340,7 @@ def union(f, t, o, files):
               type=click.Choice(WRITERS),
               help='to file format')
 @click.option('-o',
-              type=click.File('w'),
+              type=compress.click_file('w'),
               help='path to file for output')
 @click.option('--union/--left',
               default=True,
@@ -141,19 +349,74 @@ def union(f, t, o, files):
 @click.option('--keep-key/--del-key',
               default=False,
               help='Do you want to keep the merge key?')
+@click.option('--state',
+              type=click.Path(dir_okay=False),
+              help='path to merge state for incremental merging')
+@click.option('--previous',
+              type=click.Path(exists=True, dir_okay=False),
+              help='path to previous result of the merge')
+@click.option('--external/--in-memory',
+              default=False,
+              help='Do you want to merge shard by shard with bounded memory?')
+@click.option('--shards',
+              type=click.IntRange(min=1),
+              default=16,
+              help='number of shards for external merging')
+@click.option('-j', '--jobs',
+              type=click.IntRange(min=0),
+              default=1,
+              help='number of processes for loading, 0 uses all CPUs')
+@click.option('-k',
+              type=click.STRING,
+              multiple=True,
+              help='name of field for computing the merge key on the fly')
 @click.argument('files', nargs=-1,
                 type=click.Path(exists=True))
-def merge(f, t, o, union, keep_key, files):
+def merge(f, t, o, union, keep_key, state, previous, external, shards, jobs,
+          k, files):
     """ Merges multiple bibliographies
+
+    With `--state` the state of merging two bibliographies is stored. If the
+    state file exists and the previous result is passed with `--previous`,
+    only the entries that changed since then are merged again.
+
+    With `--external` the entries are partitioned into temporary shard files
+    by their merge key and merged shard by shard. The output is then ordered
+    by shards.
+
+    With `-k` the merge key is formed out of the given fields as in
+    `make-key`, without adding it to the files first.
     """
     f, t = get_formats(f, t, o, files)
+    spec = key_spec(k) if k else None
 
-    with click.progressbar(files, label='Loading bibliographies') as ff:
-        bibs = [load(f, fin) for fin in ff]
-    
-    f = lambda b1, b2 : b1.merge(b2, union=union, keep_key=keep_key)
-    with click.progressbar(bibs, label='Merging bibliographies') as bb:
-        bib = reduce(f, bb)
+    if external:
+        if state:
+            raise click.UsageError('Incremental merging is not supported '
+                                   'with --external.')
+        out = o if o else sys.stdout
+        ext.external_merge(files, f, t, out, union=union,
+                           keep_key=keep_key, key=spec, shards=shards)
+        return
+
+    if state:
+        if spec:
+            raise click.UsageError('Incremental merging is not supported '
+                                   'with -k.')
+        if len(files) != 2:
+            raise click.UsageError('Incremental merging requires exactly '
+                                   'two files.')
+        bib = merge_incremental(f, t, union, keep_key, state, previous, files)
+    else:
+        bibs = load_all(f, files, jobs=jobs)
+        # The merge key is needed until the last bibliography is merged
+        f = lambda b1, b2 : b1.merge(b2, union=union, keep_key=True,
+                                     key=spec)
+        with click.progressbar(bibs, length=len(files),
+                               label='Merging bibliographies') as bb:
+            bib = reduce(f, bb)
+        if not keep_key:
+            bib.del_fields(bibtools.Bibliography.MERGEKEY)
 
     datastring = bib.dump(writer=t)
     if o:
@@ -171,32 +434,200 @@ def merge(f, t, o, union, keep_key, files):
               type=click.Choice(WRITERS),
               help='to file format')
 @click.option('-o',
-              type=click.File('w'),
+              type=compress.click_file('w'),
               help='path to file for output')
 @click.option('-k',
               type=click.STRING,
               multiple=True,
               help='name of field for key creation')
+@click.option('-j', '--jobs',
+              type=click.IntRange(min=0),
+              default=1,
+              help='number of processes for parsing, 0 uses all CPUs')
 @click.argument('fil', nargs=1, metavar='FILE',
                 type=click.Path(exists=True))
-def make_key(k, f, t, o, fil):
+def make_key(k, f, t, o, jobs, fil):
     """ Adds a merge key to your database
     """
     f, t = get_formats(f, t, o, [fil])
 
-    bib = load(f, fil)
+    bib = load(f, fil, jobs=jobs)
+    # normauthor and normtitle are computed on the fly
+    bib.make_key(*k)
+    bib.del_fields(*[field for field in k
+                     if field in bibtools.KeySpec.DERIVED])
 
-    if 'normauthor' in k:
-        bib.add_fields(normauthor=normalizetex.norm_author)
-    if 'normtitle' in k:
-        bib.add_fields(normtitle=normalizetex.norm_title)
+    datastring = bib.dump(writer=t)
+    if o:
+        o.write(datastring)
+    else:
+        click.echo(datastring)
 
-    bib.make_key(*k)
+@click.command('select',
+               short_help='select entries matching criteria')
+@click.option('-f',
+              type=click.Choice(READERS),
+              help='from file format')
+@click.option('-t',
+              type=click.Choice(WRITERS),
+              help='to file format')
+@click.option('-o',
+              type=compress.click_file('w'),
+              help='path to file for output')
+@click.option('-w', '--where',
+              type=click.STRING,
+              multiple=True,
+              help='criterion FIELD=VALUE or FIELD=LOW..HIGH')
+@click.option('-a', '--author',
+              type=click.STRING,
+              multiple=True,
+              help='last name of an author')
+@click.argument('files', nargs=-1,
+                type=click.Path(exists=True))
+def select(f, t, o, where, author, files):
+    """ Selects the entries matching all criteria
+
+    The entries are streamed, so the bibliographies need not fit into
+    memory. For example
+
+    \b
+        pybibtools.py select -a Shelah -w year=1990..2000
+        -w "journal=J. Symb. Log." -t yaml shelah.bib
+
+    Each field may appear in one criterion only, ``-a`` counts as a
+    criterion on ``normauthor``.
+    """
+    f, t = get_formats(f, t, o, files)
+
+    criteria = {}
+    if author:
+        criteria['normauthor'] = ' and '.join(author)
+    for field, value in map(parse_criterion, where):
+        if field in criteria:
+            raise click.BadParameter('Criterion on "%s" given more than once.'
+                                     % field)
+        criteria[field] = value
+
+    out = o if o else sys.stdout
+    ext.select(files, f, t, out, criteria)
+
+@click.command('split',
+               short_help='split databases into shards')
+@click.option('-f',
+              type=click.Choice(READERS),
+              help='from file format')
+@click.option('-t',
+              type=click.Choice(WRITERS),
+              help='to file format, defaults to the one of the input')
+@click.option('-k',
+              type=click.STRING,
+              multiple=True,
+              default=['ID'],
+              show_default=True,
+              help='name(s) of field(s) forming the key')
+@click.option('-n', '--shards',
+              type=click.IntRange(min=1),
+              default=16,
+              show_default=True,
+              help='number of shards')
+@click.option('-p', '--prefix',
+              type=click.Path(dir_okay=False),
+              help='prefix of the shard files, defaults to the first file '
+                   'without extension')
+@click.argument('files', nargs=-1,
+                type=click.Path(exists=True))
+def split(f, t, k, shards, prefix, files):
+    """ Splits bibliographies into shards by a stable hash of a key
+
+    The entries are streamed into the files PREFIX-0.EXT, PREFIX-1.EXT, ...
+    compressed like the first input file.
+    Entries with equal keys always end up in shards with the same number.
+    So bibliographies split by the same key into the same number of shards
+    can be merged shard by shard, for example on different machines:
+
+    \b
+        pybibtools.py split -k normauthor,year,normtitle -n 4 -p a a.bib
+        pybibtools.py split -k normauthor,year,normtitle -n 4 -p b b.bib
+        pybibtools.py merge -k normauthor,year,normtitle -o m-0.bib
+        a-0.bib b-0.bib
+        ...
+        pybibtools.py gather -o merged.bib m-0.bib m-1.bib m-2.bib m-3.bib
+    """
+    f, _ = get_formats(f, 'bib', None, files)
+    if not t:
+        t = f if f in WRITERS else 'bib'
+    if not prefix:
+        prefix = os.path.splitext(compress.strip(files[0]))[0]
+
+    # the shards are compressed like the first file
+    suffix = t + compress.compression(files[0])
+    paths = ['%s-%d.%s' % (prefix, i, suffix) for i in range(shards)]
+    ext.split(files, f, t, paths, key_spec(k))
+
+@click.command('gather',
+               short_help='join shards into one database')
+@click.option('-f',
+              type=click.Choice(READERS),
+              help='from file format')
+@click.option('-t',
+              type=click.Choice(WRITERS),
+              help='to file format')
+@click.option('-o',
+              type=compress.click_file('w'),
+              help='path to file for output')
+@click.argument('files', nargs=-1,
+                type=click.Path(exists=True))
+def gather(f, t, o, files):
+    """ Joins shards, e.g. created by `split`, into one database
+
+    The entries are streamed, so the result need not fit into memory. The
+    shards must not share ID-s.
+    """
+    f, t = get_formats(f, t, o, files)
+
+    out = o if o else sys.stdout
+    ext.gather(files, f, t, out)
+
+@click.command('dedupe',
+               short_help='collapse duplicate entries')
+@click.option('-f',
+              type=click.Choice(READERS),
+              help='from file format')
+@click.option('-t',
+              type=click.Choice(WRITERS),
+              help='to file format')
+@click.option('-o',
+              type=compress.click_file('w'),
+              help='path to file for output')
+@click.option('-k',
+              type=click.STRING,
+              multiple=True,
+              help='name(s) of field(s) identifying duplicates, '
+                   'defaults to ID')
+@click.option('--report',
+              type=compress.click_file('w'),
+              help='path to file for the report, defaults to stderr')
+@click.option('-j', '--jobs',
+              type=click.IntRange(min=0),
+              default=1,
+              help='number of processes for parsing, 0 uses all CPUs')
+@click.argument('fil', nargs=1, metavar='FILE',
+                type=click.Path(exists=True))
+def dedupe(f, t, o, k, report, jobs, fil):
+    """ Collapses entries sharing a key
+
+    Each group of entries with the same key is collapsed into its first
+    entry. Fields of the later entries only fill in missing fields, as in
+    `merge`. Entries lacking a field of the key are kept as they are. The
+    report has a line "KEY<TAB>KEPT-ID<TAB>COLLAPSED-IDS" per group.
+    """
+    f, t = get_formats(f, t, o, [fil])
+
+    bib, groups = load(f, fil, jobs=jobs).dedupe(key_spec(k) if k else 'ID')
 
-    if 'normauthor' in k:
-        bib.del_fields('normauthor')
-    if 'normtitle' in k:
-        bib.del_fields('normtitle')
+    out = report if report else sys.stderr
+    for key, kept, ids in groups:
+        out.write('%s\t%s\t%s\n' % (key, kept, ' '.join(ids)))
 
     datastring = bib.dump(writer=t)
     if o:
@@ -204,9 +635,115 @@ def make_key(k, f, t, o, fil):
     else:
         click.echo(datastring)
 
+def format_change(change):
+    """ Formats a change reported by :func:`listb.pybibtools.diff_entries`
+
+    Args:
+        change (dict): change of an entry
+
+    Returns:
+        str: line "+ KEY" or "- KEY" for added or removed entries and
+        "~ KEY" followed by a line per changed field otherwise
+
+    Example:
+        >>> print(format_change({'change': 'changed', 'key': 'a',
+        ...                      'fields': {'year': ('1981', None)}}))
+        ~ a
+            year: '1981' -> None
+    """
+    if change['change'] == 'added':
+        return '+ %s' % change['key']
+    if change['change'] == 'removed':
+        return '- %s' % change['key']
+    lines = ['~ %s' % change['key']]
+    for field, (old, new) in change['fields'].items():
+        lines.append('    %s: %r -> %r' % (field, old, new))
+    return '\n'.join(lines)
+
+@click.command('diff',
+               short_help='compare two versions of a database')
+@click.option('-f',
+              type=click.Choice(READERS),
+              help='from file format')
+@click.option('-o',
+              type=compress.click_file('w'),
+              help='path to file for the report')
+@click.option('-k',
+              type=click.STRING,
+              multiple=True,
+              help='name(s) of field(s) identifying the entries, '
+                   'defaults to ID')
+@click.option('--json/--text', 'as_json',
+              default=False,
+              help='Do you want the report as JSON lines?')
+@click.option('--external/--in-memory',
+              default=False,
+              help='Do you want to compare shard by shard with bounded '
+                   'memory?')
+@click.option('--shards',
+              type=click.IntRange(min=1),
+              default=16,
+              help='number of shards for external comparison')
+@click.argument('old', type=click.Path(exists=True))
+@click.argument('new', type=click.Path(exists=True))
+def diff(f, o, k, as_json, external, shards, old, new):
+    """ Reports the entries added, removed and changed from OLD to NEW
+
+    The entries are matched by their keys and compared field by field, the
+    order of the fields does not matter. With `--external` both versions
+    are split into shards and only shards with different digests are
+    compared.
+    """
+    f, _ = get_formats(f, 'yaml', None, [old, new])
+    spec = key_spec(k) if k else 'ID'
+
+    if external:
+        changes = ext.diff([old], [new], f, key=spec, shards=shards)
+    else:
+        changes = load(f, old).diff(load(f, new), key=spec)
+
+    out = o if o else sys.stdout
+    try:
+        for change in changes:
+            if as_json:
+                out.write(json.dumps(change, ensure_ascii=False) + '\n')
+            else:
+                out.write(format_change(change) + '\n')
+    except RuntimeError as err:
+        raise click.ClickException(str(err))
+
+@click.command('serve',
+               short_help='serve commands from memory')
+@click.option('-s', '--socket', 'path',
+              type=click.Path(dir_okay=False),
+              required=True,
+              help='path to the Unix socket')
+def serve(path):
+    """ Serves the commands of this script on a Unix socket
+
+    The server keeps the parsed input files in memory and reuses them as
+    long as they are unchanged. Send commands with `pybibclient.py`, which
+    also stops the server.
+    """
+    if load.CACHE is not None:
+        raise click.UsageError('The server is already running.')
+    load.CACHE = {}
+    try:
+        daemon.serve(path, cli, prog_name='pybibtools.py')
+    except RuntimeError as err:
+        raise click.UsageError(str(err))
+    finally:
+        load.CACHE = None
+
 cli.add_command(union)
 cli.add_command(merge)
 cli.add_command(make_key)
+cli.add_command(select)
+cli.add_command(split)
+cli.add_command(gather)
+cli.add_command(dedupe)
+cli.add_command(diff)
+cli.add_command(serve)
 
 if __name__ == '__main__':
     cli()
\ No newline at end of file
@@ -14,6 +14,7 @@ setup(name='listb',
       license='MIT',
       packages=['listb'],
       scripts=[join('scripts', 'mrtools.py'),
+               join('scripts', 'pybibclient.py'),
                join('scripts', 'pybibtools.py')],
       test_suite='nose.collector',
       tests_require=['nose'],
@@ -0,0 +1,42 @@
+import os.path
+import tempfile
+import unittest
+
+from listb import compress
+from listb.external import STREAM_READERS
+from listb.parallel import load_list
+from listb.pybibtools import Bibliography
+
+DATA = [{'ENTRYTYPE': 'article', 'ID': 'a%d' % n, 'title': 'Gödel %d' % n,
+         'year': str(1990 + n)} for n in range(20)]
+
+class TestCompress(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_round_trip(self):
+        for ext in ('', '.gz', '.bz2', '.xz'):
+            for fmt in Bibliography.WRITERS:
+                path = os.path.join(self.tmp.name, 'bib.' + fmt + ext)
+                with compress.open(path, 'w', encoding='utf-8') as handle:
+                    handle.write(Bibliography(DATA).dump(writer=fmt))
+                self.assertEqual(compress.extension(path), fmt)
+
+                with compress.open(path, 'r', encoding='utf-8') as handle:
+                    streamed = list(STREAM_READERS[fmt](handle))
+                self.assertEqual(sorted(streamed, key=lambda e: e['ID']),
+                                 sorted(DATA, key=lambda e: e['ID']), path)
+
+    def test_parallel(self):
+        path = os.path.join(self.tmp.name, 'bib.bib.gz')
+        with compress.open(path, 'w') as handle:
+            handle.write(Bibliography(DATA).dump(writer='bib'))
+        self.assertEqual(len(load_list(path, jobs=2, min_chunk=10)),
+                         len(DATA))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+import os
+import os.path
+import tempfile
+import threading
+import time
+import unittest
+
+import listb.daemon as daemon
+from scripts import pybibtools as script
+
+BIB = """@article{a1, author = {Shelah, Saharon}, year = {1995}}
+@article{a2, author = {Baldwin, John T.}, year = {%s}}
+"""
+
+class TestDaemon(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'pybibtools.sock')
+        self.thread = threading.Thread(target=script.serve.main,
+                                       args=(['-s', self.path],),
+                                       kwargs={'standalone_mode': False})
+        self.thread.daemon = True
+        self.thread.start()
+        for _ in range(100):
+            if os.path.exists(self.path):
+                break
+            time.sleep(0.05)
+
+    def tearDown(self):
+        daemon.request(self.path, None)
+        self.thread.join(5)
+        self.tmp.cleanup()
+
+    def write(self, year):
+        with open(os.path.join(self.tmp.name, 'in.bib'), 'w') as handle:
+            handle.write(BIB % year)
+
+    def test_make_key(self):
+        self.write('996')
+        args = ['make-key', '-k', 'year', '-t', 'bib', 'in.bib']
+        expected = daemon.run(script.cli, args, cwd=self.tmp.name)
+        self.assertEqual(expected[0], 0)
+
+        self.assertEqual(daemon.request(self.path, args, self.tmp.name),
+                         expected)
+        self.assertEqual(len(script.load.CACHE), 1)
+        # the cached entries are not changed by the command
+        self.assertEqual(daemon.request(self.path, args, self.tmp.name),
+                         expected)
+
+        self.write('1995')
+        code, out, err = daemon.request(self.path, args, self.tmp.name)
+        self.assertEqual(code, 1)
+        self.assertIn('duplicates', err)
+
+    def test_usage_error(self):
+        code, out, err = daemon.request(self.path, ['merge', 'missing.bib'],
+                                        self.tmp.name)
+        self.assertEqual(code, 2)
+        self.assertIn('does not exist', err)
+
+if __name__ == '__main__':
+    unittest.main()
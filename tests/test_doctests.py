@@ -2,19 +2,49 @@ import doctest
 import unittest
 import os.path
 
+import listb.aiomrtools
+import listb.compress
+import listb.daemon
+import listb.external
 import listb.mrtools
+import listb.mrset
+import listb.msnhttp
 import listb.normalizetex
+import listb.parallel
+import listb.parsecache
+import listb.pipeline
 import listb.pybibtools
+import listb.store
 
 suite = unittest.TestSuite()
 
 flags = doctest.NORMALIZE_WHITESPACE
+suite.addTest(doctest.DocTestSuite(listb.aiomrtools,
+                                   optionflags=flags))
+suite.addTest(doctest.DocTestSuite(listb.compress,
+                                   optionflags=flags))
+suite.addTest(doctest.DocTestSuite(listb.daemon,
+                                   optionflags=flags))
+suite.addTest(doctest.DocTestSuite(listb.external,
+                                   optionflags=flags))
 suite.addTest(doctest.DocTestSuite(listb.mrtools,
                                    optionflags=flags))
+suite.addTest(doctest.DocTestSuite(listb.mrset,
+                                   optionflags=flags))
+suite.addTest(doctest.DocTestSuite(listb.msnhttp,
+                                   optionflags=flags))
 suite.addTest(doctest.DocTestSuite(listb.normalizetex,
                                    optionflags=flags))
+suite.addTest(doctest.DocTestSuite(listb.parallel,
+                                   optionflags=flags))
+suite.addTest(doctest.DocTestSuite(listb.parsecache,
+                                   optionflags=flags))
+suite.addTest(doctest.DocTestSuite(listb.pipeline,
+                                   optionflags=flags))
 suite.addTest(doctest.DocTestSuite(listb.pybibtools,
                                    optionflags=flags))
+suite.addTest(doctest.DocTestSuite(listb.store,
+                                   optionflags=flags))
 
 runner = unittest.TextTestRunner(verbosity=2)
 runner.run(suite)
\ No newline at end of file
@@ -0,0 +1,120 @@
+import copy
+import io
+import os.path
+import tempfile
+import unittest
+from functools import reduce
+
+import yaml
+
+from listb.external import *
+from listb.pybibtools import Bibliography, KeySpec
+
+class TestExternal(unittest.TestCase):
+
+    def setUp(self):
+        self.data = [[{'ENTRYTYPE': 'article', 'ID': 'f%d-%d' % (i, n),
+                       'KEY': 'k%d' % n, 'note%d' % i: str(n)}
+                      for n in range(i, 60, i + 1)]
+                     for i in range(3)]
+
+    def merge_in_memory(self, union):
+        bibs = [Bibliography(copy.deepcopy(d)) for d in self.data]
+        f = lambda b1, b2: b1.merge(b2, union=union, keep_key=True)
+        bib = reduce(f, bibs)
+        bib.del_fields(Bibliography.MERGEKEY)
+        return bib.data
+
+    def merge_external(self, union):
+        files = [io.StringIO(Bibliography(copy.deepcopy(d)).dump('bib'))
+                 for d in self.data]
+        out = io.StringIO()
+        external_merge(files, 'bib', 'yaml', out, union=union, shards=5)
+        return yaml.safe_load(out.getvalue())
+
+    def test_external_merge(self):
+        by_id = lambda e: e['ID']
+        for union in (True, False):
+            self.assertEqual(sorted(self.merge_external(union), key=by_id),
+                             sorted(self.merge_in_memory(union), key=by_id))
+
+    def test_external_merge_key_spec(self):
+        for d in self.data:
+            for e in d:
+                e['year'] = e.pop('KEY')
+        spec = KeySpec('year')
+        files = [io.StringIO(Bibliography(copy.deepcopy(d)).dump('bib'))
+                 for d in self.data]
+        out = io.StringIO()
+        external_merge(files, 'bib', 'yaml', out, key=spec, shards=5)
+
+        bibs = [Bibliography(copy.deepcopy(d)) for d in self.data]
+        f = lambda b1, b2: b1.merge(b2, key=spec)
+        by_id = lambda e: e['ID']
+        self.assertEqual(sorted(yaml.safe_load(out.getvalue()), key=by_id),
+                         sorted(reduce(f, bibs).data, key=by_id))
+
+    def test_split_gather(self):
+        spec = KeySpec('KEY')
+        with tempfile.TemporaryDirectory() as tmp:
+            shards = []
+            for i, d in enumerate(self.data):
+                paths = [os.path.join(tmp, '%d-%d.yaml' % (i, s))
+                         for s in range(3)]
+                bib = io.StringIO(Bibliography(copy.deepcopy(d)).dump('bib'))
+                split([bib], 'bib', 'yaml', paths, spec, batch=4)
+                shards.append(paths)
+
+            merged = []
+            for paths in zip(*shards):
+                bibs = [Bibliography() for _ in paths]
+                for bib, path in zip(bibs, paths):
+                    with open(path) as handle:
+                        bib.data = list(iter_yaml(handle))
+                f = lambda b1, b2: b1.merge(b2, keep_key=True, key=spec)
+                bib = reduce(f, bibs)
+                bib.del_fields(Bibliography.MERGEKEY)
+                merged.append(io.StringIO(bib.dump('yaml')))
+            out = io.StringIO()
+            gather(merged, 'yaml', 'yaml', out, batch=5)
+
+        by_id = lambda e: e['ID']
+        self.assertEqual(sorted(yaml.safe_load(out.getvalue()), key=by_id),
+                         sorted(self.merge_in_memory(True), key=by_id))
+
+    def test_diff(self):
+        old = [e for d in self.data for e in d]
+        new = copy.deepcopy(old[::-1])
+        del new[3]
+        new[5]['note0'] = 'changed'
+        new[7]['url'] = 'added'
+        new.append({'ENTRYTYPE': 'book', 'ID': 'new', 'title': 'T'})
+        key = lambda c: c['key']
+
+        expected = list(Bibliography(old).diff(Bibliography(new)))
+        self.assertEqual(sorted(c['change'] for c in expected),
+                         ['added', 'changed', 'changed', 'removed'])
+        files = [io.StringIO(Bibliography(d).dump('bib')) for d in (old, new)]
+        changes = diff(files[:1], files[1:], 'bib', shards=7)
+        self.assertEqual(sorted(changes, key=key), sorted(expected, key=key))
+
+    def test_split_yaml(self):
+        s_yaml = yaml.dump([{'ID': 'a', 'title': 'multi\nline'},
+                            {'ID': 'b'}], default_flow_style=False)
+        chunks = list(split_yaml(io.StringIO(s_yaml)))
+        self.assertEqual(len(chunks), 2)
+        self.assertEqual(list(iter_yaml(io.StringIO(s_yaml), batch=1)),
+                         yaml.safe_load(s_yaml))
+
+    def test_strings_across_batches(self):
+        source = '@string{jsl = {J. Symb. Log.}}\n' + ''.join(
+            '@article{a%d, journal = jsl, year = {%d}}\n' % (n, n)
+            for n in range(1500))
+        for reader in ('bib', 'msnbib'):
+            entries = list(STREAM_READERS[reader](io.StringIO(source)))
+            self.assertEqual(len(entries), 1500)
+            self.assertEqual({e['journal'] for e in entries},
+                             {'J. Symb. Log.'})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+import io
+import os.path
+import random
+import tempfile
+import unittest
+
+from listb.mrset import *
+from scripts import mrtools as script
+
+class TestMrset(unittest.TestCase):
+
+    def test_round_trip(self):
+        rnd = random.Random(0)
+        for size in (0, 1, 10, 3000):
+            numbers = [rnd.randrange(4 * 10**6) for _ in range(size)]
+            numbers += [2**40, 0][:size]
+            data = encode(numbers)
+            self.assertEqual(decode(data), sorted(set(numbers)))
+            with self.assertRaises(ValueError):
+                decode(data[:-1] if size else b'MRSET')
+
+    def test_text_files(self):
+        from listb.mrtools import yaml_dumps
+        text = io.StringIO()
+        yaml_dumps(['3549381', '0241312'], text)
+        self.assertEqual(load(io.BytesIO(text.getvalue().encode('utf-8'))),
+                         [3549381, 241312])
+        text = (b'MR3549381 (2017a:03001)\r\n  0241312 Shelah, 1969\n'
+                b'\n# 12 comments are skipped\nmr0000005\n')
+        self.assertEqual(load(io.BytesIO(text)), [3549381, 241312, 5])
+
+    def test_set_operations(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            paths = [os.path.join(tmp, n) for n in ('a', 'b.yaml', 'c')]
+            with open(paths[0], 'wb') as handle:
+                dump(['0000001', '0000002', '0000003'], handle)
+            with open(paths[1], 'w') as handle:
+                handle.write("- '0000002'\n- '0000003'\n- '0000004'\n")
+            with open(paths[2], 'w') as handle:
+                handle.write('MR0000003\n0000005\n')
+
+            results = {}
+            for command in ('union', 'intersection', 'difference'):
+                out = os.path.join(tmp, command)
+                getattr(script, command).main(['-o', out] + paths,
+                                              standalone_mode=False)
+                with open(out, 'rb') as handle:
+                    results[command] = load(handle)
+        self.assertEqual(results, {'union': [1, 2, 3, 4, 5],
+                                   'intersection': [3],
+                                   'difference': [1]})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,224 @@
+import asyncio
+import io
+import os
+import os.path
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import listb.aiomrtools as aiomrtools
+import listb.compress as compress
+import listb.mrtools as mrtools
+import listb.pipeline as pipeline
+from listb.pybibtools import Bibliography
+
+PAGE = """<html><body>
+<div class="matches">Matches: %d</div>
+<div class="headlineText">
+  <a class="mrnum" href="[...]"><strong>MR%s</strong></a>
+</div>
+%s
+</body></html>"""
+
+BIB = """<html><body><div class="doc">%s</div></body></html>"""
+
+ENTRY = """<pre>@article {MR%s,
+    TITLE = {Title %s},
+     YEAR = {2000},
+}</pre>"""
+
+class StubHandler(BaseHTTPRequestHandler):
+    """ Serves ``server.pages`` linked search pages at /search?pg=N and
+    BibTeX for MR-numbers at /bib?b=...
+    """
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        self.server.requests.append(self.path)
+
+        etag = None
+        if url.path == '/search':
+            pg = int(query['pg'][0])
+            pages = self.server.pages
+            etag = '"%d-%d"' % (pages, pg)
+            if self.headers.get('If-None-Match') == etag:
+                self.send_response(304)
+                self.end_headers()
+                return
+            link = ('<a href="search?pg=%d">Next</a>' % (pg + 1)
+                    if pg < pages else '')
+            body = PAGE % (pages, pg, link)
+        elif url.path == '/bib':
+            body = BIB % ''.join(ENTRY % (n, n) for n in query['b'])
+        else:
+            self.send_error(404)
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html')
+        if etag:
+            self.send_header('ETag', etag)
+        self.end_headers()
+        self.wfile.write(body.encode('utf-8'))
+
+    def log_message(self, *args):
+        pass
+
+class StubServer(object):
+    """ Runs a :class:`StubHandler` in a background thread """
+
+    def __init__(self, handler=StubHandler):
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+        self.httpd.requests = []
+        self.httpd.pages = 3
+        self.url = 'http://127.0.0.1:%d/' % self.httpd.server_port
+        self.thread = threading.Thread(target=self.httpd.serve_forever)
+        self.thread.daemon = True
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+class TestMrtools(unittest.TestCase):
+
+    def setUp(self):
+        self.base_url = mrtools.BASE_URL
+        self.bibtex_url = mrtools.BIBTEX_URL
+
+    def tearDown(self):
+        mrtools.BASE_URL = self.base_url
+        mrtools.BIBTEX_URL = self.bibtex_url
+
+    def test_crawl(self):
+        with StubServer() as server:
+            mrtools.BASE_URL = server.url + '%s'
+            sites, urls = mrtools.crawl(server.url + 'search?pg=1')
+        self.assertEqual(urls, [server.url + 'search?pg=1',
+                                'search?pg=2', 'search?pg=3'])
+        self.assertEqual([n for s in sites
+                          for n in mrtools.msn_to_mrnumbers(s)],
+                         ['1', '2', '3'])
+
+    def test_crawl_cached(self):
+        cache = mrtools.PageCache()
+        with StubServer() as server:
+            mrtools.BASE_URL = server.url + '%s'
+            url = server.url + 'search?pg=1'
+            first = mrtools.crawl(url, cache=cache)
+            self.assertEqual(len(server.httpd.requests), 3)
+
+            cache.load(io.StringIO(cache.dump()))
+            second = mrtools.crawl(url, cache=cache)
+            self.assertEqual(second, first)
+            self.assertEqual(len(server.httpd.requests), 4)
+
+            server.httpd.pages = 4
+            sites, urls = mrtools.crawl(url, cache=cache)
+            self.assertEqual(len(server.httpd.requests), 8)
+        self.assertEqual(urls[-1], 'search?pg=4')
+
+    def test_async_mrnumbers(self):
+        async def collect(url):
+            return [n async for n in aiomrtools.mrnumbers(url)]
+
+        with StubServer() as server:
+            mrtools.BASE_URL = server.url + '%s'
+            mrnumbers = asyncio.run(collect(server.url + 'search?pg=2'))
+        self.assertEqual(mrnumbers, ['2', '3'])
+
+    def test_async_bibtex(self):
+        async def collect(mrnumbers):
+            return [r async for r in aiomrtools.bibtex(mrnumbers, size=2,
+                                                        concurrency=2)]
+
+        with StubServer() as server:
+            mrtools.BIBTEX_URL = server.url + 'bib'
+            results = asyncio.run(collect(['1', '2', '3']))
+            bib = mrtools.get_bibtex_from_msn(['1', '2'])
+        self.assertEqual([c for c, _ in results], [['1', '2'], ['3']])
+        self.assertIn('@article {MR3,', results[1][1])
+        self.assertEqual(results[0][1], bib)
+
+    def test_bib_exclude(self):
+        from scripts import mrtools as script
+        with tempfile.TemporaryDirectory() as tmp:
+            numbers = os.path.join(tmp, 'numbers.yaml')
+            with open(numbers, 'w') as handle:
+                handle.write("- '0000003'\n- '0000001'\n- '0000003'\n"
+                             "- '0000002'\n")
+            existing = os.path.join(tmp, 'existing.bib')
+            with open(existing, 'w') as handle:
+                handle.write('@article{MR1, mrnumber = {0000001}}\n')
+            out = os.path.join(tmp, 'out.bib')
+
+            with StubServer() as server:
+                mrtools.BIBTEX_URL = server.url + 'bib'
+                script.bib.main(['--load', numbers, '--exclude', existing,
+                                 '--dump', out], standalone_mode=False)
+            with open(out) as handle:
+                bib = handle.read()
+        self.assertEqual([parse_qs(urlparse(r).query)['b']
+                          for r in server.httpd.requests],
+                         [['0000003', '0000002']])
+        self.assertIn('@article {MR0000002,', bib)
+
+    def test_extract(self):
+        from scripts import mrtools as script
+        with tempfile.TemporaryDirectory() as tmp:
+            pages = os.path.join(tmp, 'pages')
+            os.mkdir(pages)
+            for name, n in [('p1.html', '2'), ('p2.html.gz', '1'),
+                            ('p3.htm', '2'), ('notes.txt', '3')]:
+                with compress.open(os.path.join(pages, name), 'w') as handle:
+                    handle.write(PAGE % (1, n, ''))
+            self.assertEqual(list(mrtools.pages_to_mrnumbers(
+                mrtools.saved_pages([pages]), jobs=2)), ['2', '1'])
+
+            out = os.path.join(tmp, 'out.txt')
+            script.extract.main(['-o', out, os.path.join(pages, 'p[23]*'),
+                                 pages], standalone_mode=False)
+            with open(out) as handle:
+                self.assertEqual(handle.read(), '1\n2\n')
+
+    def test_pipeline(self):
+        target = Bibliography([{'ENTRYTYPE': 'book', 'ID': 'mine',
+                                'title': 'Title 2', 'note': 'kept'}])
+        with StubServer() as server:
+            mrtools.BASE_URL = server.url + '%s'
+            mrtools.BIBTEX_URL = server.url + 'bib'
+            bib = pipeline.pipeline(server.url + 'search?pg=1', target,
+                                    keys=['title'], size=1, workers=2)
+            left = pipeline.pipeline(server.url + 'search?pg=1', target,
+                                     keys=['title'], union=False)
+        self.assertEqual(sorted(e['ID'] for e in bib), ['MR1', 'MR3', 'mine'])
+        mine = [e for e in bib if e['ID'] == 'mine'][0]
+        self.assertEqual(mine, {'ENTRYTYPE': 'book', 'ID': 'mine',
+                                'title': 'Title 2', 'note': 'kept',
+                                'year': '2000'})
+        self.assertEqual(left.data, [mine])
+        self.assertNotIn('KEY', target.data[0])
+
+    def test_pipeline_duplicate_keys(self):
+        target = Bibliography([{'ENTRYTYPE': 'book', 'ID': 'mine',
+                                'title': 'Title 2'},
+                               {'ENTRYTYPE': 'book', 'ID': 'copy',
+                                'title': 'Title 2'}])
+        with StubServer() as server:
+            mrtools.BASE_URL = server.url + '%s'
+            mrtools.BIBTEX_URL = server.url + 'bib'
+            with self.assertRaises(RuntimeError) as cm:
+                pipeline.pipeline(server.url + 'search?pg=1', target,
+                                  keys=['title'])
+        self.assertNotIsInstance(cm.exception, pipeline.PipelineError)
+        self.assertIn("('Title 2', 'copy')", str(cm.exception))
+        self.assertEqual(server.httpd.requests, [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler
+
+import requests
+
+from listb.msnhttp import *
+from tests.test_mrtools import StubServer
+
+class FaultHandler(BaseHTTPRequestHandler):
+    """ Answers with the faults in ``server.faults`` one request after
+    another and with "ok" once they are exhausted
+    """
+
+    def do_GET(self):
+        with self.server.lock:
+            fault = self.server.faults.pop(0) if self.server.faults else None
+            self.server.times.append(time.monotonic())
+
+        if fault == 'hang':
+            time.sleep(1)
+        elif fault == 'close':
+            self.close_connection = True
+            return
+        elif fault is not None:
+            self.send_response(fault[0])
+            for header, value in fault[1:]:
+                self.send_header(header, value)
+            self.end_headers()
+            return
+
+        try:
+            self.send_response(200)
+            self.end_headers()
+            self.wfile.write(b'ok')
+        except OSError:
+            pass
+
+    def log_message(self, *args):
+        pass
+
+class TestClient(unittest.TestCase):
+
+    def serve(self, *faults):
+        server = StubServer(FaultHandler)
+        server.httpd.faults = list(faults)
+        server.httpd.times = []
+        server.httpd.lock = threading.Lock()
+        return server
+
+    def client(self, **kargs):
+        kargs.setdefault('timeout', (1, 0.2))
+        kargs.setdefault('backoff', 0.01)
+        return Client(**kargs)
+
+    def test_retries_server_errors(self):
+        with self.serve((503,), (500,), 'close') as server:
+            response = self.client().get(server.url)
+        self.assertEqual(response.text, 'ok')
+        self.assertEqual(len(server.httpd.times), 4)
+
+    def test_read_timeout(self):
+        with self.serve('hang') as server:
+            response = self.client().get(server.url)
+        self.assertEqual(response.text, 'ok')
+
+    def test_gives_up(self):
+        with self.serve(*[(502,)] * 3) as server:
+            with self.assertRaises(requests.HTTPError):
+                self.client(retries=2).get(server.url)
+        self.assertEqual(len(server.httpd.times), 3)
+
+    def test_client_errors_are_not_retried(self):
+        with self.serve((404,)) as server:
+            response = self.client().get(server.url)
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(len(server.httpd.times), 1)
+
+    def test_retry_after(self):
+        with self.serve((503, ('Retry-After', '1'))) as server:
+            response = self.client(backoff=0).get(server.url)
+        self.assertEqual(response.text, 'ok')
+        first, second = server.httpd.times
+        self.assertGreaterEqual(second - first, 0.9)
+
+    def test_circuit_breaker_pauses_all_workers(self):
+        breaker = CircuitBreaker(threshold=2, cooldown=0.5)
+        client = self.client(backoff=0, breaker=breaker)
+        with self.serve((503,), (503,)) as server:
+            client.get(server.url)
+            # The breaker opened after the second failure
+            self.assertGreaterEqual(server.httpd.times[2]
+                                    - server.httpd.times[1], 0.45)
+
+            breaker.failure()
+            breaker.failure()
+            start = time.monotonic()
+            threads = [threading.Thread(target=client.get,
+                                        args=(server.url,))
+                       for _ in range(3)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        times = server.httpd.times[3:]
+        self.assertEqual(len(times), 3)
+        self.assertTrue(all(t - start >= 0.45 for t in times))
+        self.assertFalse(breaker.is_open())
+
+if __name__ == '__main__':
+    unittest.main()
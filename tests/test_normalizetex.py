@@ -0,0 +1,92 @@
+import random
+import unittest
+
+import unicodedata
+
+import bibtexparser.customization as bc
+from bibtexparser.latexenc import latex_to_unicode
+
+from listb.normalizetex import _norm_author, latex_to_ascii, norm_author
+
+# Author fields in the styles of MathSciNet and listb
+CORPUS = [
+    'Shelah, Saharon',
+    'Baldwin, John T. and Larson, Paul B. and Shelah, Saharon',
+    'Sageev, G. and Shelah, S.',
+    'Siegfried Fischbacher and Uwe Ludwig Horn',
+    'Avraham (Abraham), Uri and Ihoda (Haim Judah), Jaime',
+    'François Augiéras',
+    r'Bartoszy\'nski, Tomek and Ros\l anowski, Andrzej',
+    r'G\"obel, R\"udiger and Shelah, Saharon',
+    r'Kojman, Menachem and Shelah, Saharon and {\v{S}}uppe, D.',
+    '{Uwe Ludwig} Horn and {van der Waerden}, B. L.',
+    'Ludwig van Beethoven and Jean de la Fontaine',
+    'Martin, D. A. and Steel, J. R. and Smith, Jr., John',
+    'John Smith jr and Smith, jr, John',
+    'M. Magidor and S.Shelah and J.-P. Serre',
+    'Shelah,Saharon and  Spinas ,  Otmar',
+    '{Unmatched brace and }other{ one and {a}b}c',
+    '} Closing first and a {b} c and x{y z}',
+    'A and B. C. and  and ',
+    '} S.  } {a b}la la  É  ',
+    '}a {b} c and }x y} and {p}} q',
+    'Thomas\nJech and Kunen,\nKenneth',
+]
+
+NAMES = ['Shelah', 'Saharon', 'S.', 'van', 'der', 'de', 'la', 'jr',
+         'junior', r'G\"obel', '{de Bruijn}', 'Ros\\l anowski', 'J.-P.',
+         '(Abraham)', 'Ihoda', 'Uri']
+
+def reference(record):
+    """ norm_author as implemented with bibtexparser's getnames """
+    authors = record['author'].split(' and ')
+    authors = bc.getnames(authors)
+    authors = [a.split(',')[0] for a in authors]
+    authors = list(map(_norm_author, authors))
+    authors.sort()
+    return ' '.join(authors)
+
+def reference_ascii(tex):
+    """ latex_to_ascii without its shortcut for plain text """
+    for pat, sub in latex_to_ascii.dict.items():
+        tex = tex.replace(pat, sub)
+    uni = latex_to_unicode(tex)
+    asc = unicodedata.normalize('NFD', uni)
+    return asc.encode('ascii', 'ignore').decode('utf-8')
+
+def outcome(func, record):
+    try:
+        return func(record)
+    except IndexError:
+        return IndexError
+
+class TestNormalizetex(unittest.TestCase):
+
+    def test_corpus(self):
+        for author in CORPUS:
+            record = {'author': author}
+            self.assertEqual(outcome(norm_author, record),
+                             outcome(reference, record), author)
+
+    def test_random_names(self):
+        rnd = random.Random(0)
+        for _ in range(2000):
+            names = []
+            for _ in range(rnd.randint(1, 3)):
+                words = rnd.sample(NAMES, rnd.randint(1, 4))
+                if rnd.random() < 0.5:
+                    words.insert(rnd.randint(1, len(words)), ',')
+                names.append(' '.join(words).replace(' ,', ','))
+            record = {'author': ' and '.join(names)}
+            self.assertEqual(outcome(norm_author, record),
+                             outcome(reference, record), record['author'])
+
+    def test_latex_to_ascii(self):
+        rnd = random.Random(0)
+        glyphs = list('aZ }~-.$') + ['é', 'e\u0301', 'ø', 'ß', 'ﬁ', '\\"o']
+        for _ in range(5000):
+            tex = ''.join(rnd.choice(glyphs) for _ in range(rnd.randint(0, 8)))
+            self.assertEqual(latex_to_ascii(tex), reference_ascii(tex), tex)
+
+if __name__ == '__main__':
+    unittest.main()
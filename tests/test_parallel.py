@@ -0,0 +1,105 @@
+import os.path
+import tempfile
+import unittest
+
+from listb.parallel import load_list
+from listb.pybibtools import bibtex_load_list, msnbib_load_list
+
+ENTRIES = ["@article{e%d,\n author = {Author%d, A.},\n KEY = {k%d}\n}\r\n",
+           "@book{b%d, title = {A\n@inner{x%d, y}\n B%d}}\n",
+           "@comment{c%d%d%d}\n",
+           "@article {MR%d,\n    TITLE = {Title {X} %d},\n     YEAR = {%d},\n}\n"]
+
+class TestParallel(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'in.bib')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, text):
+        with open(self.path, 'wb') as handle:
+            handle.write(text if isinstance(text, bytes)
+                         else text.encode('utf-8'))
+
+    def serial(self, reader):
+        with open(self.path, 'r') as handle:
+            return reader(handle)
+
+    def test_same_as_serial(self):
+        self.write(''.join(ENTRIES[i % 4] % (i, i, i) for i in range(400)))
+        expected = self.serial(bibtex_load_list)
+        self.assertEqual(load_list(self.path, jobs=3, min_chunk=500),
+                         expected)
+        self.assertEqual(load_list(self.path, 'msnbib', jobs=3,
+                                   min_chunk=500),
+                         self.serial(msnbib_load_list))
+        self.assertEqual(expected[0]['KEY'], 'k0')
+
+        # an unbalanced brace prevents all later boundaries
+        self.write('@article{bad, title = {A}\n'
+                   + ''.join(ENTRIES[0] % (i, i, i) for i in range(100)))
+        self.assertEqual(load_list(self.path, jobs=3, min_chunk=500),
+                         self.serial(bibtex_load_list))
+
+    def test_string(self):
+        self.write('@string{jsl = {J. Symb. Log.}}\n'
+                   + ''.join('@article{a%d, journal = jsl}\n' % i
+                             for i in range(100)))
+        entries = load_list(self.path, jobs=3, min_chunk=500)
+        self.assertEqual(len(entries), 100)
+        self.assertEqual(entries[-1]['journal'], 'J. Symb. Log.')
+
+    def test_error(self):
+        self.write(''.join(ENTRIES[0] % (i, i, i)
+                           for i in range(100)).encode('utf-8')
+                   + b'@article{x, title = {\xff}}\n')
+        with self.assertRaises(UnicodeDecodeError) as cm:
+            load_list(self.path, jobs=3, min_chunk=500)
+        if hasattr(cm.exception, '__notes__'):
+            self.assertRegex(cm.exception.__notes__[0],
+                             r'lines \d+-\d* of .*in\.bib')
+
+    def test_load_all(self):
+        from listb.parsecache import ParseCache
+        from scripts import pybibtools as script
+        paths = []
+        for i in range(3):
+            paths.append(os.path.join(self.tmp.name, 'in%d.bib' % i))
+            with open(paths[-1], 'w') as handle:
+                handle.write(''.join(
+                    '@article{f%d-%d, KEY = {k%d}, note = {%d}, n%d = {x}}\n'
+                    % (i, n, n, i, i) for n in range(i, 12, i + 1)))
+
+        def run(*args):
+            out = os.path.join(self.tmp.name, 'out.yaml')
+            args[0].main(list(args[1:]) + ['-o', out] + paths,
+                         standalone_mode=False)
+            with open(out) as handle:
+                return handle.read()
+
+        for args in [(script.merge, '--del-key'), (script.merge, '--keep-key'),
+                     (script.merge, '--left', '--del-key'), (script.union,)]:
+            serial = run(*args, '-j', '1')
+            self.assertEqual(run(*args, '-j', '3'), serial)
+        # the leftmost file wins, later files only add fields
+        self.assertIn("  ID: f0-5\n  n0: x\n  n1: x\n  n2: x\n  note: '0'\n",
+                      run(script.merge, '-j', '3'))
+
+        try:
+            script.load.CACHE = {}
+            script.load.PARSECACHE = ParseCache(os.path.join(self.tmp.name,
+                                                             'cache'))
+            self.assertEqual(run(script.union, '-j', '3'), serial)
+            self.assertEqual(len(script.load.CACHE), 3)
+            # the pickles written by the processes are found here
+            for path in paths:
+                script.load.PARSECACHE.load(path, 'bib')
+            self.assertEqual(script.load.PARSECACHE.hits, 3)
+        finally:
+            script.load.CACHE = script.load.PARSECACHE = None
+
+if __name__ == '__main__':
+    unittest.main()
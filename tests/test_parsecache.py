@@ -0,0 +1,67 @@
+import os
+import os.path
+import tempfile
+import unittest
+
+from listb.parsecache import ParseCache
+
+BIB = """@article{a%d, title = {Title %s}}
+"""
+
+class TestParseCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache_dir = os.path.join(self.tmp.name, 'cache')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, name, n, tag='x'):
+        path = os.path.join(self.tmp.name, name)
+        with open(path, 'w') as handle:
+            handle.write(''.join(BIB % (i, tag) for i in range(n)))
+        return path
+
+    def test_hits(self):
+        path = self.write('a.bib', 3)
+        data = ParseCache(self.cache_dir).load(path, 'bib')
+
+        cache = ParseCache(self.cache_dir)
+        self.assertEqual(cache.load(path, 'bib'), data)
+        self.assertEqual((cache.hits, cache.misses), (1, 0))
+
+        # same content under a new modification time
+        os.utime(path, ns=(0, 0))
+        self.assertEqual(cache.load(path, 'bib'), data)
+        self.assertEqual((cache.hits, cache.misses), (2, 0))
+
+        path = self.write('a.bib', 4)
+        self.assertEqual(len(cache.load(path, 'bib')), 4)
+        self.assertEqual((cache.hits, cache.misses), (2, 1))
+        self.assertEqual(len(cache.load(path, 'msnbib')), 4)
+        self.assertEqual((cache.hits, cache.misses), (2, 2))
+
+    def test_evict(self):
+        paths = [self.write('%d.bib' % i, 2, str(i)) for i in range(4)]
+        cache = ParseCache(self.cache_dir)
+        cache.load(paths[0], 'bib')
+        size = sum(e.stat().st_size for e in os.scandir(self.cache_dir)
+                   if e.name.endswith('.pickle'))
+
+        cache.max_size = 3 * size
+        for path in paths[1:]:
+            cache.load(paths[0], 'bib') # paths[0] is used most recently
+            cache.load(path, 'bib')
+        pickles = [e for e in os.scandir(self.cache_dir)
+                   if e.name.endswith('.pickle')]
+        self.assertLessEqual(sum(e.stat().st_size for e in pickles),
+                             cache.max_size)
+
+        cache.hits = cache.misses = 0
+        cache.load(paths[0], 'bib')
+        cache.load(paths[1], 'bib')
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,3 +1,5 @@
+import copy
+import io
 import unittest
 
 from listb.pybibtools import *
@@ -79,5 +81,292 @@ class TestPybibtools(unittest.TestCase):
         self.assertEqual(bib1.data, data1_c)
         self.assertEqual(bib2.data, data2_c)
 
+    def test_incremental_merge(self):
+        import copy
+
+        def bib(data):
+            b = Bibliography(copy.deepcopy(data))
+            b.make_key('title')
+            return b
+
+        left = [{'ENTRYTYPE': 'article', 'ID': 'l1', 'title': 'A'},
+                {'ENTRYTYPE': 'article', 'ID': 'l2', 'title': 'B'},
+                {'ENTRYTYPE': 'article', 'ID': 'l3', 'title': 'C'}]
+        right = [{'ENTRYTYPE': 'book', 'ID': 'r1', 'title': 'A',
+                  'year': '2001'},
+                 {'ENTRYTYPE': 'book', 'ID': 'r2', 'title': 'B'},
+                 {'ENTRYTYPE': 'book', 'ID': 'r4', 'title': 'D'}]
+
+        for union in (True, False):
+            merged, state = MergeState.merge(bib(left), bib(right),
+                                             union=union)
+            handle = io.StringIO(state.dump())
+            state = MergeState()
+            state.load(handle)
+
+            new_left = left[1:] + [{'ENTRYTYPE': 'article', 'ID': 'l5',
+                                    'title': 'E'}]
+            new_right = copy.deepcopy(right)
+            new_right[1]['year'] = '2002'
+            new_right.append({'ENTRYTYPE': 'book', 'ID': 'r6',
+                              'title': 'F'})
+
+            updated = state.update(merged, bib(new_left), bib(new_right))
+            expected = bib(new_left).merge(bib(new_right), union=union)
+            by_id = lambda e: e['ID']
+            self.assertEqual(sorted(updated.data, key=by_id),
+                             sorted(expected.data, key=by_id))
+
+    def test_bibtex_dumper(self):
+        from bibtexparser.bwriter import BibTexWriter
+        from bibtexparser.bibdatabase import BibDatabase
+
+        data = [{'ENTRYTYPE': 'book', 'ID': 'b', 'year': '2016',
+                 'title': 'Rigidity', 'author': 'Shelah, Saharon'},
+                {'ENTRYTYPE': 'article', 'ID': 'A', 'title': 'Forcing'},
+                {'ENTRYTYPE': 'article', 'ID': 'c'}]
+        db = BibDatabase()
+        db.entries = data
+
+        for display_order in ([], ['year', 'title']):
+            writer = BibTexWriter()
+            writer.display_order = display_order
+            dumper = BibTexDumper(display_order=display_order)
+            self.assertEqual(dumper.dumps(data), writer.write(db))
+
+            writer.order_entries_by = None
+            dumper = BibTexDumper(display_order=display_order,
+                                  preserve_order=True)
+            handle = io.StringIO()
+            dumper.dump(data, handle)
+            self.assertEqual(handle.getvalue(), writer.write(db))
+
+    def test_load_msnbib(self):
+        s_bibtex = """
+@article {MR0241312,
+    AUTHOR = {Shelah, Saharon},
+     TITLE = {Note on a min-max problem of {L}eo {M}oser},
+   JOURNAL = {J. Combinatorial Theory},
+      YEAR = {1969},
+       KEY = {Shelah-1969},
+}
+
+@book {MR1,
+      NOTE = {spanning
+              lines},
+}
+@comment{something}
+@misc {MR2,
+     TITLE = { Spaces },
+  MRNUMBER = {2}
+}
+@foo {MR3,
+     TITLE = {Nonstandard},
+}
+@article{lower, title = {Lowercase}}
+        """
+
+        with io.StringIO(s_bibtex) as handle:
+            expected = bibtex_load_list(handle)
+        with io.StringIO(s_bibtex) as handle:
+            self.assertEqual(msnbib_load_list(handle), expected)
+        self.assertEqual([e['ID'] for e in expected],
+                         ['MR0241312', 'MR1', 'MR2', 'lower'])
+        self.assertEqual(expected[0]['KEY'], 'Shelah-1969')
+
+    def test_load_msnbib_edge_cases(self):
+        entries = ['@article {MR1,\n     TITLE = {{}},\n      YEAR = {1},\n}',
+                   '@article {MR2,\n     TITLE = {a\tb},\n}',
+                   '@article {MR3,\n\t    TITLE = {\tTabs},\n}',
+                   '@article {MR4,\n}',
+                   '@article {MR5,\n     TITLE = {{}x},\n}']
+        for source in entries + ['\n'.join(entries)]:
+            with io.StringIO(source) as handle:
+                expected = bibtex_load_list(handle)
+            with io.StringIO(source) as handle:
+                self.assertEqual(msnbib_load_list(handle), expected, source)
+        self.assertEqual(expected[0]['title'], '')
+        self.assertEqual([e['ID'] for e in expected],
+                         ['MR1', 'MR2', 'MR3', 'MR5'])
+
+    def test_select(self):
+        authors = ['Shelah, Saharon', 'Larson, Paul B. and Shelah, S.',
+                   'Baldwin, John T.']
+        data = [{'ENTRYTYPE': 'article', 'ID': 'e%d' % n,
+                 'author': authors[n % 3], 'year': str(1985 + n % 20),
+                 'journal': 'J%d' % (n % 4)}
+                for n in range(60)]
+        del data[5]['year']
+        bib = Bibliography(data)
+        queries = [{'normauthor': 'Shelah'},
+                   {'normauthor': 'Shelah and Larson', 'journal': 'J1'},
+                   {'year': ('1990', '2000')},
+                   {'year': (None, '1989'), 'normauthor': 'Baldwin'},
+                   {'journal': 'J2', 'year': ('2000', None)},
+                   {'journal': 'none'},
+                   {}]
+        for criteria in queries:
+            expected = [e for e in data if match(e, **criteria)]
+            self.assertEqual(bib.select(**criteria).data, expected)
+
+        # the indexes are rebuilt after changes
+        bib.add_fields(journal=lambda e: 'J')
+        self.assertEqual(len(bib.select(journal='J').data), len(data))
+        self.assertEqual(bib.select(journal='J2').data, [])
+
+    def test_select_repeated_criteria(self):
+        import os.path
+        import tempfile
+        import click
+        from scripts import pybibtools as script
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'in.bib')
+            with open(path, 'w') as handle:
+                handle.write('@article{a, year = {1995}}\n')
+            for args in (['-w', 'year=1990..', '-w', 'year=..2000'],
+                         ['-a', 'Shelah', '-w', 'normauthor=Larson']):
+                with self.subTest(args=args):
+                    with self.assertRaises(click.BadParameter):
+                        script.select.main(args + ['-o', os.path.join(
+                            tmp, 'out.bib'), path], standalone_mode=False)
+
+    def test_key_spec(self):
+        import copy
+        authors = ['Shelah, Saharon', 'S. Shelah', 'Larson, Paul B.']
+        data = [[{'ENTRYTYPE': 'article', 'ID': 'f%d-%d' % (i, n),
+                  'author': authors[(n + i) % 3], 'year': str(n),
+                  'note%d' % i: str(n)}
+                 for n in range(i, 30, i + 1)]
+                for i in range(2)]
+        del data[0][3]['author']
+        keys = ('normauthor', 'year')
+
+        # the old way: materialize the derived field around make_key
+        bibs = [Bibliography(copy.deepcopy(d)) for d in data]
+        for bib in bibs:
+            bib.add_fields(normauthor=lambda e: normalizetex.norm_author(e)
+                           if 'author' in e else '')
+            bib.make_key(*keys)
+            bib.del_fields('normauthor')
+        expected = bibs[0].merge(bibs[1], keep_key=True).data
+
+        bibs = [Bibliography(copy.deepcopy(d)) for d in data]
+        spec = KeySpec(*keys)
+        merged = bibs[0].merge(bibs[1], keep_key=True, key=spec)
+        self.assertEqual(merged.data, expected)
+        for e in bibs[0].data + bibs[1].data:
+            self.assertNotIn('normauthor', e)
+            self.assertNotIn('KEY', e)
+
+        bibs[0].make_key(*keys)
+        self.assertEqual([e['KEY'] for e in bibs[0]],
+                         [spec(e) for e in data[0]])
+        self.assertNotIn('normauthor', bibs[0].data[0])
+
+        bibs[1].data.append(dict(data[1][0], ID='dup'))
+        with self.assertRaises(RuntimeError):
+            bibs[0].merge(bibs[1], key=spec)
+
+    def test_key_spec_stale_fields(self):
+        import os.path
+        import tempfile
+        from scripts import pybibtools as script
+        data = [{'ENTRYTYPE': 'article', 'ID': 'a', 'author': 'Shelah, S.',
+                 'title': 'New', 'normauthor': 'Stale', 'normtitle': 'old'}]
+        spec = KeySpec('normauthor', 'normtitle')
+        self.assertEqual(spec(data[0]), 'Shelah-new')
+
+        with tempfile.TemporaryDirectory() as tmp:
+            paths = [os.path.join(tmp, n) for n in ('in.bib', 'out.bib')]
+            with open(paths[0], 'w') as handle:
+                handle.write(Bibliography(data).dump('bib'))
+            script.make_key.main(['-k', 'normauthor', '-k', 'normtitle',
+                                  '-o', paths[1], paths[0]],
+                                 standalone_mode=False)
+            with open(paths[1]) as handle:
+                bib = Bibliography()
+                bib.load(handle, reader='bib')
+        self.assertEqual(bib.data, [{'ENTRYTYPE': 'article', 'ID': 'a',
+                                     'author': 'Shelah, S.', 'title': 'New',
+                                     'KEY': 'Shelah-new'}])
+
+    def test_dedupe(self):
+        from functools import reduce
+        data = [{'ENTRYTYPE': 'article', 'ID': 'e%d' % n,
+                 'year': str(n % 7), 'note%d' % (n % 3): str(n)}
+                for n in range(40)]
+        spec = KeySpec('year')
+        bib, report = Bibliography(data).dedupe(spec)
+
+        expected = []
+        for year in sorted({e['year'] for e in data}, key=int):
+            group = [Bibliography([e]) for e in data if e['year'] == year]
+            f = lambda b1, b2: b1.merge(b2, keep_key=True, key=spec)
+            merged = reduce(f, group)
+            merged.del_fields('KEY')
+            expected.extend(merged.data)
+        self.assertEqual(bib.data, expected)
+        self.assertEqual(report[0], ('0', 'e0', ['e7', 'e14', 'e21',
+                                                 'e28', 'e35']))
+        self.assertEqual(len(report), 7)
+        self.assertEqual(len(data), 40)
+
+    def test_dedupe_incomplete_keys(self):
+        data = [{'ENTRYTYPE': 'book', 'ID': 'b', 'author': 'Shelah, S.'},
+                {'ENTRYTYPE': 'misc', 'ID': 'c', 'year': '1981'},
+                {'ENTRYTYPE': 'article', 'ID': 'd', 'doi': '',
+                 'author': 'S. Shelah'},
+                {'ENTRYTYPE': 'article', 'ID': 'e', 'doi': 'x'},
+                {'ENTRYTYPE': 'article', 'ID': 'f', 'doi': 'x',
+                 'year': '1982'}]
+        bib, report = Bibliography(data).dedupe(KeySpec('doi'))
+        self.assertEqual(report, [('x', 'e', ['f'])])
+        self.assertEqual([e['ID'] for e in bib], ['b', 'c', 'd', 'e'])
+        self.assertEqual(bib.data[:3], data[:3])
+
+        bib, report = Bibliography(data).dedupe(KeySpec('normauthor',
+                                                         'year'))
+        self.assertEqual(report, [])
+        self.assertEqual(len(bib.data), 5)
+
+    def test_lazy_fields(self):
+        import copy
+        calls = []
+        def normtitle(entry):
+            calls.append(entry['ID'])
+            return normalizetex.norm_title(entry)
+        data = [[{'ENTRYTYPE': 'article', 'ID': 'e%d' % n,
+                  'title': 'Title %d' % n, 'author': 'Shelah, S.',
+                  'note': str(i)}
+                 for n in range(i * 5, 10 + i * 20)]
+                for i in range(2)]
+
+        results = []
+        for lazy in (False, True):
+            del calls[:]
+            bibs = [Bibliography(copy.deepcopy(d)) for d in data]
+            for bib in bibs:
+                bib.add_fields(lazy=lazy, normtitle=normtitle,
+                               normauthor=normalizetex.norm_author)
+                bib.make_key('ID')
+            merged = bibs[1].merge(bibs[0], union=False)
+            self.assertEqual(len(calls), 0 if lazy else 35)
+            results.append([merged.dump(w) for w in ('bib', 'jsonl')])
+        # only the kept entries were normalized, by the writers
+        self.assertEqual(len(calls), 25)
+        self.assertEqual(results[0], results[1])
+
+    def test_lazy_fields_make_key(self):
+        data = [{'ENTRYTYPE': 'article', 'ID': 'a', 'author': 'Shelah, S.',
+                 'year': '1'}]
+        keys = []
+        for lazy in (False, True):
+            bib = Bibliography(copy.deepcopy(data))
+            bib.add_fields(lazy=lazy, normauthor=lambda e: 'CUSTOM')
+            bib.make_key('normauthor', 'year')
+            keys.append(bib.data[0]['KEY'])
+            self.assertEqual(bib.data[0]['normauthor'], 'CUSTOM')
+        self.assertEqual(keys, ['Shelah-1', 'Shelah-1'])
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,78 @@
+import os
+import os.path
+import subprocess
+import sys
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY = {'bibtexparser', 'bs4', 'requests', 'yaml'}
+""" Packages that must not be imported before a command needs them
+"""
+
+BUDGET = os.environ.get('LISTB_STARTUP_BUDGET')
+""" Maximal import time of the modules of a script in seconds, checked only
+when set since wall-clock timings depend on the machine
+"""
+
+def env():
+    """ Returns the environment for running a subprocess on this checkout
+    """
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join([ROOT, env.get('PYTHONPATH', '')])
+    return env
+
+def imported(module):
+    """ Imports a module in a fresh interpreter and returns the names of
+    the top-level packages it left in ``sys.modules``
+    """
+    code = ('import sys, %s\n'
+            'print("\\n".join(sys.modules))' % module)
+    proc = subprocess.run([sys.executable, '-c', code],
+                          stdout=subprocess.PIPE, universal_newlines=True,
+                          env=env(), check=True)
+    return {n.split('.')[0] for n in proc.stdout.splitlines()}
+
+def import_times(script, *args):
+    """ Runs a script with ``-X importtime`` and returns the cumulative
+    import time in seconds of each top-level import
+    """
+    proc = subprocess.run([sys.executable, '-X', 'importtime',
+                           os.path.join(ROOT, 'scripts', script)] + list(args),
+                          stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                          universal_newlines=True, env=env(), check=True)
+    times = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line.split('|')
+        times[name.rstrip()] = int(cumulative) / 1e6
+    return times
+
+class TestStartup(unittest.TestCase):
+
+    def check(self, script, *args):
+        times = import_times(script, *args)
+        modules = {n.strip().split('.')[0] for n in times}
+        self.assertFalse(HEAVY & modules)
+
+        if BUDGET:
+            own = sum(t for n, t in times.items()
+                      if n.split('.')[0] in ('click', 'listb'))
+            self.assertLess(own, float(BUDGET))
+
+    def test_modules(self):
+        for module in ('listb.pybibtools', 'listb.mrtools'):
+            with self.subTest(module=module):
+                self.assertFalse(HEAVY & imported(module))
+
+    def test_pybibtools(self):
+        self.check('pybibtools.py', '--help')
+        self.check('pybibtools.py', 'merge', '--help')
+
+    def test_mrtools(self):
+        self.check('mrtools.py', '--help')
+        self.check('mrtools.py', 'pipeline', '--help')
+
+if __name__ == '__main__':
+    unittest.main()
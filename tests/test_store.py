@@ -0,0 +1,88 @@
+import copy
+import io
+import os.path
+import tempfile
+import unittest
+
+from listb.pybibtools import Bibliography
+from listb.store import SQLiteBibliography
+
+class TestStore(unittest.TestCase):
+
+    def setUp(self):
+        self.left = [{'ENTRYTYPE': 'article', 'ID': 'l%d' % n,
+                      'KEY': 'k%d' % n, 'note': 'left %d' % n}
+                     for n in range(0, 30, 2)]
+        self.right = [{'ENTRYTYPE': 'book', 'ID': 'r%d' % n,
+                       'KEY': 'k%d' % n, 'note': 'right %d' % n,
+                       'year': str(n)}
+                      for n in range(0, 30, 3)]
+
+    def store(self, data):
+        store = SQLiteBibliography()
+        store.BATCH = 4
+        store.insert(copy.deepcopy(data))
+        return store
+
+    def test_merge(self):
+        by_id = lambda e: e['ID']
+        for union in (True, False):
+            expected = Bibliography(copy.deepcopy(self.left)).merge(
+                Bibliography(copy.deepcopy(self.right)), union=union)
+            store = self.store(self.left)
+            store.merge(Bibliography(copy.deepcopy(self.right)), union=union)
+            self.assertEqual(sorted(store, key=by_id),
+                             sorted(expected, key=by_id))
+
+    def test_union(self):
+        store = self.store(self.left)
+        store.union(self.store(self.left + self.right))
+        self.assertEqual(len(store), len(self.left) + len(self.right))
+        self.assertEqual(store.get('l0')['note'], 'left 0')
+
+    def test_make_key(self):
+        store = self.store(self.right)
+        store.make_key('year', 'ENTRYTYPE')
+        self.assertEqual(store.find('3-book')[0]['ID'], 'r3')
+
+        store.insert([{'ENTRYTYPE': 'book', 'ID': 'other', 'year': '3'}])
+        with self.assertRaises(RuntimeError):
+            store.make_key('year', 'ENTRYTYPE')
+        # the failed transaction is rolled back
+        self.assertEqual(store.get('other').get('KEY'), None)
+
+    def test_grouped_changes(self):
+        store = self.store(self.left)
+        before = list(store)
+        with self.assertRaises(RuntimeError):
+            with store.transaction():
+                store.merge(Bibliography(copy.deepcopy(self.right)))
+                store.insert([{'ENTRYTYPE': 'book', 'ID': 'new'}])
+                store.insert([{'ENTRYTYPE': 'book', 'ID': 'l0'}])
+        self.assertEqual(list(store), before)
+
+        with store.transaction():
+            store.insert([{'ENTRYTYPE': 'book', 'ID': 'new'}])
+            with self.assertRaises(RuntimeError):
+                store.make_key('ENTRYTYPE')
+        self.assertEqual(len(store), len(before) + 1)
+        self.assertIsNone(store.get('new').get('KEY'))
+        self.assertFalse(store.connection.in_transaction)
+
+    def test_persistence(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'bib.sqlite')
+            store = SQLiteBibliography(path)
+            store.load(io.StringIO(Bibliography(self.left).dump('bib')),
+                       'bib')
+            with self.assertRaises(RuntimeError):
+                store.insert([{'ENTRYTYPE': 'misc', 'ID': 'l0'}])
+            store.connection.close()
+
+            store = SQLiteBibliography(path)
+            self.assertEqual(store.dump('bib'),
+                             Bibliography(self.left).dump('bib'))
+            store.connection.close()
+
+if __name__ == '__main__':
+    unittest.main()